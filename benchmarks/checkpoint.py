@@ -0,0 +1,95 @@
+"""Benchmark checkpoint size and restore time of MetaEstimator.
+
+Compares a plain pickle of the estimator with the checkpoint format of
+``MetaEstimator.save``/``load``, for several window sizes.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+
+from river import datasets, linear_model, preprocessing, tree
+
+from kappaml_core import meta
+
+
+def make_model(window_size, mfe_backend):
+    return meta.MetaRegressor(
+        models=[
+            preprocessing.StandardScaler() | linear_model.LinearRegression(),
+            preprocessing.StandardScaler() | tree.HoeffdingTreeRegressor(),
+        ],
+        window_size=window_size,
+        mfe_backend=mfe_backend,
+    )
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def run(window_size, mfe_backend, n_samples, repeat):
+    model = make_model(window_size, mfe_backend)
+    for x, y in datasets.synth.Friedman(seed=42).take(n_samples):
+        model.learn_one(x, y)
+
+    results = {"window_size": window_size, "mfe_backend": mfe_backend}
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path = os.path.join(tmp, "model.pkl")
+
+        def dump():
+            with open(pickle_path, "wb") as f:
+                pickle.dump(model, f)
+
+        def restore():
+            with open(pickle_path, "rb") as f:
+                return pickle.load(f)
+
+        _, results["Pickle save in s"] = timed(dump, repeat)
+        _, results["Pickle load in s"] = timed(restore, repeat)
+        results["Pickle size in Mb"] = os.path.getsize(pickle_path) / 1024**2
+
+        path = os.path.join(tmp, "checkpoint")
+        _, results["Checkpoint save in s"] = timed(lambda: model.save(path), repeat)
+        _, results["Checkpoint load in s"] = timed(
+            lambda: meta.MetaRegressor.load(path), repeat
+        )
+        _, results["Checkpoint load without mmap in s"] = timed(
+            lambda: meta.MetaRegressor.load(path, mmap=False), repeat
+        )
+        results["Checkpoint size in Mb"] = directory_size(path) / 1024**2
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-samples", type=int, default=5_000)
+    parser.add_argument(
+        "--window-sizes", type=int, nargs="+", default=[200, 1_000, 5_000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="checkpoint.json")
+    args = parser.parse_args()
+
+    results = []
+    for window_size in args.window_sizes:
+        for mfe_backend in ["pymfe", "streaming"]:
+            res = run(window_size, mfe_backend, args.n_samples, args.repeat)
+            results.append(res)
+            print(f"\nwindow_size={window_size} mfe_backend={mfe_backend}")
+            for k, v in res.items():
+                if k not in ["window_size", "mfe_backend"]:
+                    print(f"  {k}: {v:.4f}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
@@ -0,0 +1,97 @@
+"""Benchmark the import time of kappaml-core entry points.
+
+Imports each target in a fresh interpreter with ``-X importtime`` and reports
+the median time spent importing the target and its dependencies, leaving out
+the interpreter startup, with the packages taking the most of it. With
+``--budget``, exits with an error if any target takes longer, to guard against
+an eager import sneaking back in.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+TARGETS = {
+    "kappaml_core": "import kappaml_core",
+    "kappaml_core.cli": "import kappaml_core.cli",
+    "kappaml_core.meta": "import kappaml_core.meta",
+    "kappaml_core.meta.MetaRegressor": "from kappaml_core.meta import MetaRegressor",
+    "kappaml-core --version": (
+        "from kappaml_core.cli import main\n"
+        "try:\n"
+        "    main(['--version'])\n"
+        "except SystemExit:\n"
+        "    pass"
+    ),
+}
+
+
+def import_times(code):
+    """Self import time of each module imported, in µs, in import order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if not line.startswith("import time:") or not fields[1].strip().isdigit():
+            continue
+        times[fields[2].strip()] = int(fields[0].split(":")[1])
+    return times
+
+
+def run(name, code, n_runs, n_top=5):
+    # Modules imported by the interpreter itself are not part of the target
+    startup = set(import_times("pass"))
+    totals, packages = [], {}
+    for _ in range(n_runs):
+        times = import_times(code)
+        totals.append(sum(t for m, t in times.items() if m not in startup))
+        by_package = {}
+        for module, t in times.items():
+            if module not in startup:
+                package = module.split(".")[0]
+                by_package[package] = by_package.get(package, 0) + t
+        for package, t in by_package.items():
+            packages.setdefault(package, []).append(t)
+    heaviest = sorted(
+        ((p, statistics.median(t)) for p, t in packages.items()), key=lambda i: -i[1]
+    )[:n_top]
+    return {
+        "target": name,
+        "Import time in ms": statistics.median(totals) / 1e3,
+        "Heaviest packages in ms": {p: t / 1e3 for p, t in heaviest},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=None)
+    parser.add_argument("--n-runs", type=int, default=5)
+    parser.add_argument(
+        "--budget", type=float, default=None, help="Maximum import time in ms"
+    )
+    parser.add_argument("--output", default="import_time.json")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.targets or TARGETS:
+        res = run(name, TARGETS[name], args.n_runs)
+        results.append(res)
+        heaviest = ", ".join(
+            f"{m} {t:.0f}" for m, t in res["Heaviest packages in ms"].items()
+        )
+        print(f"{name:<34} {res['Import time in ms']:8.1f} ms  ({heaviest})")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
+
+    if args.budget is not None:
+        over = [r["target"] for r in results if r["Import time in ms"] > args.budget]
+        if over:
+            sys.exit(f"Over the {args.budget} ms import budget: {', '.join(over)}")
@@ -0,0 +1,78 @@
+"""Benchmark the latency of meta-learners as their history grows.
+
+Trains a ``HoeffdingTreeClassifier`` and a ``NearestNeighborMetaLearner`` on
+synthetic meta-feature vectors labelled with the best model of clustered
+regions, then reports the mean ``learn_one`` and ``predict_one`` latencies and
+the accuracy on held-out vectors.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from river import tree
+
+from kappaml_core import meta
+
+
+def synthetic_history(n_samples, n_features, n_models, seed=42):
+    """Meta-features drawn around one center per model, on mixed scales."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_models, n_features))
+    scales = 10.0 ** rng.integers(-2, 4, size=n_features)
+    labels = rng.integers(n_models, size=n_samples)
+    X = (centers[labels] + 2.0 * rng.normal(size=(n_samples, n_features))) * scales
+    names = [f"mf{j}" for j in range(n_features)]
+    return [dict(zip(names, row.tolist())) for row in X], labels.tolist()
+
+
+def make_learner(name, n_samples):
+    if name == "hoeffding_tree":
+        return tree.HoeffdingTreeClassifier()
+    return meta.NearestNeighborMetaLearner(max_size=n_samples)
+
+
+def run(name, n_samples, n_features, n_models, n_queries=500):
+    X, y = synthetic_history(n_samples + n_queries, n_features, n_models)
+    learner = make_learner(name, n_samples)
+    start = time.perf_counter()
+    for x, label in zip(X[:n_samples], y[:n_samples]):
+        learner.learn_one(x, label)
+    learn_time = (time.perf_counter() - start) / n_samples
+
+    start = time.perf_counter()
+    y_pred = [learner.predict_one(x) for x in X[n_samples:]]
+    predict_time = (time.perf_counter() - start) / n_queries
+    return {
+        "learner": name,
+        "n_samples": n_samples,
+        "n_features": n_features,
+        "learn_one in µs": 1e6 * learn_time,
+        "predict_one in µs": 1e6 * predict_time,
+        "Accuracy": float(np.mean(np.array(y_pred) == np.array(y[n_samples:]))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-samples", type=int, nargs="+", default=[100, 1_000, 5_000])
+    parser.add_argument("--n-features", type=int, default=40)
+    parser.add_argument("--n-models", type=int, default=5)
+    parser.add_argument("--output", default="meta_learners.json")
+    args = parser.parse_args()
+
+    results = []
+    for n_samples in args.n_samples:
+        for name in ("hoeffding_tree", "nearest_neighbor"):
+            res = run(name, n_samples, args.n_features, args.n_models)
+            results.append(res)
+            print(
+                f"n_samples={n_samples:<6} {name:<16} "
+                f"learn_one {res['learn_one in µs']:8.1f} µs  "
+                f"predict_one {res['predict_one in µs']:8.1f} µs  "
+                f"accuracy {res['Accuracy']:.3f}"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
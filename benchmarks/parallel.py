@@ -0,0 +1,71 @@
+"""Benchmark the execution backends of MetaEstimator.learn_one.
+
+Measures the throughput of ``serial``, ``thread`` and ``process`` execution as
+the number of base models grows.
+"""
+
+import argparse
+import json
+import time
+
+from river import datasets, preprocessing, tree
+
+from kappaml_core import meta
+
+BACKENDS = ["serial", "thread", "process"]
+
+
+def make_models(n_models):
+    return [
+        preprocessing.StandardScaler()
+        | tree.HoeffdingTreeRegressor(grace_period=50 + 10 * i)
+        for i in range(n_models)
+    ]
+
+
+def run(n_models, backend, n_samples, n_workers):
+    model = meta.MetaRegressor(
+        models=make_models(n_models),
+        execution_backend=backend,
+        n_workers=n_workers,
+    )
+    data = list(datasets.synth.Friedman(seed=42).take(n_samples))
+    start = time.perf_counter()
+    for x, y in data:
+        model.predict_one(x)
+        model.learn_one(x, y)
+    elapsed = time.perf_counter() - start
+    model.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-samples", type=int, default=2_000)
+    parser.add_argument("--n-models", type=int, nargs="+", default=[2, 4, 8, 16])
+    parser.add_argument("--n-workers", type=int, default=None)
+    parser.add_argument("--output", default="parallel.json")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'models':>6} {'backend':>8} {'time (s)':>9} {'samples/s':>10} speedup")
+    for n_models in args.n_models:
+        serial_time = None
+        for backend in BACKENDS:
+            elapsed = run(n_models, backend, args.n_samples, args.n_workers)
+            serial_time = serial_time or elapsed
+            res = {
+                "n_models": n_models,
+                "backend": backend,
+                "Time in s": elapsed,
+                "Samples per s": args.n_samples / elapsed,
+                "Speedup": serial_time / elapsed,
+            }
+            results.append(res)
+            print(
+                f"{n_models:>6} {backend:>8} {elapsed:>9.3f} "
+                f"{res['Samples per s']:>10.1f} {res['Speedup']:>6.2f}x"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
@@ -0,0 +1,213 @@
+"""Throughput and latency micro-benchmarks of the meta estimators.
+
+Runs ``MetaRegressor`` on synthetic streams and sweeps, one at a time around a
+default configuration, the number of base models, ``window_size``,
+``meta_update_frequency``, ``mfe_groups`` and the number of features. Each
+configuration runs in a fresh process so that its peak RSS is isolated.
+
+Results are saved as a JSON baseline that can be compared with a previous one
+to catch performance regressions between versions:
+
+    python perf.py --output new.json --compare baseline.json
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from river import linear_model, optim, preprocessing
+
+from kappaml_core import __version__, meta
+
+DEFAULTS = {
+    "n_models": 4,
+    "window_size": 200,
+    "meta_update_frequency": 50,
+    "mfe_groups": ["general"],
+    "n_features": 10,
+}
+
+SWEEPS = {
+    "n_models": [2, 4, 8, 16],
+    "window_size": [100, 200, 500, 1000],
+    "meta_update_frequency": [10, 50, 200],
+    "mfe_groups": [["general"], ["general", "statistical"]],
+    "n_features": [5, 10, 50, 100],
+}
+
+# Metrics compared with the baseline, and whether higher is better
+METRICS = {
+    "Samples per s": True,
+    "learn_one p50 in us": False,
+    "learn_one p99 in us": False,
+    "predict_one p50 in us": False,
+    "predict_one p99 in us": False,
+    "Peak RSS in Mb": False,
+}
+
+
+def synthetic_stream(n_samples, n_features, seed=42):
+    """Linear regression stream with an abrupt concept change halfway."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, n_features))
+    weights = rng.normal(size=(2, n_features))
+    concept = (np.arange(n_samples) >= n_samples // 2).astype(int)
+    y = np.einsum("ij,ij->i", X, weights[concept]) + rng.normal(size=n_samples)
+    names = [f"x{j}" for j in range(n_features)]
+    for xi, yi in zip(X, y):
+        yield dict(zip(names, xi.tolist())), float(yi)
+
+
+def make_model(config):
+    models = [
+        preprocessing.StandardScaler()
+        | linear_model.LinearRegression(optimizer=optim.SGD(lr=0.005 * (i + 1)))
+        for i in range(config["n_models"])
+    ]
+    return meta.MetaRegressor(
+        models=models,
+        window_size=config["window_size"],
+        meta_update_frequency=config["meta_update_frequency"],
+        mfe_groups=config["mfe_groups"],
+    )
+
+
+def run_config(config, n_samples):
+    model = make_model(config)
+    data = list(synthetic_stream(n_samples, config["n_features"]))
+
+    learn_times = np.empty(n_samples)
+    predict_times = np.empty(n_samples)
+    clock = time.perf_counter
+    start = clock()
+    for i, (x, y) in enumerate(data):
+        t0 = clock()
+        model.predict_one(x)
+        t1 = clock()
+        model.learn_one(x, y)
+        t2 = clock()
+        predict_times[i] = t1 - t0
+        learn_times[i] = t2 - t1
+    elapsed = clock() - start
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss /= 1024**2 if sys.platform == "darwin" else 1024
+
+    us = 1e6
+    return {
+        "Samples per s": n_samples / elapsed,
+        "learn_one p50 in us": float(np.percentile(learn_times, 50) * us),
+        "learn_one p99 in us": float(np.percentile(learn_times, 99) * us),
+        "predict_one p50 in us": float(np.percentile(predict_times, 50) * us),
+        "predict_one p99 in us": float(np.percentile(predict_times, 99) * us),
+        "Peak RSS in Mb": peak_rss,
+    }
+
+
+def list_configs(sweeps):
+    """Configurations varying one parameter at a time around the defaults."""
+    configs = [("default", DEFAULTS)]
+    for param in sweeps:
+        for value in SWEEPS[param]:
+            if value != DEFAULTS[param]:
+                configs.append((param, {**DEFAULTS, param: value}))
+    return configs
+
+
+def config_id(sweep, config):
+    value = config[sweep] if sweep != "default" else ""
+    if isinstance(value, list):
+        value = "+".join(value)
+    return f"{sweep}={value}" if value != "" else sweep
+
+
+def compare(results, baseline, tolerance):
+    """Print the relative change of each metric, returns the regressions."""
+    previous = {r["id"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"\nComparison with baseline {baseline['meta']['version']}:")
+    for res in results:
+        old = previous.get(res["id"])
+        if old is None:
+            continue
+        changes = []
+        for metric, higher_is_better in METRICS.items():
+            change = (res[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = " !"
+                regressions.append((res["id"], metric, change))
+            changes.append(f"{metric} {change:+.1%}{flag}")
+        print(f"  {res['id']}: " + ", ".join(changes))
+    return regressions
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--n-samples", type=int, default=2_000)
+    parser.add_argument(
+        "--sweeps",
+        nargs="+",
+        choices=list(SWEEPS),
+        default=list(SWEEPS),
+        help="Parameters to sweep",
+    )
+    parser.add_argument("--output", default="perf.json")
+    parser.add_argument("--compare", help="Baseline JSON file to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative degradation reported as a regression",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    results = []
+    for sweep, config in list_configs(args.sweeps):
+        # A fresh process per configuration isolates its peak RSS
+        with mp.Pool(processes=1, maxtasksperchild=1) as pool:
+            res = pool.apply(run_config, (config, args.n_samples))
+        res = {"id": config_id(sweep, config), "config": config, **res}
+        results.append(res)
+        print(
+            f"{res['id']:<40} {res['Samples per s']:>9.1f} samples/s  "
+            f"learn p50/p99 {res['learn_one p50 in us']:.0f}/"
+            f"{res['learn_one p99 in us']:.0f} us  "
+            f"predict p50/p99 {res['predict_one p50 in us']:.0f}/"
+            f"{res['predict_one p99 in us']:.0f} us  "
+            f"RSS {res['Peak RSS in Mb']:.1f} Mb"
+        )
+
+    baseline = {
+        "meta": {
+            "version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "n_samples": args.n_samples,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(baseline, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}")
+            sys.exit(1)
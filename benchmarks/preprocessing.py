@@ -0,0 +1,68 @@
+"""Benchmark sharing the preprocessing prefix of the base pipelines.
+
+Compares ``MetaRegressor`` on pipelines that each scale the features with
+their own ``StandardScaler``, and on the same models sharing a single scaler
+split with ``split_shared_prefix``, as the number of base models grows.
+"""
+
+import argparse
+import json
+import time
+
+from river import datasets, linear_model, optim, preprocessing
+
+from kappaml_core import meta
+
+
+def make_models(n_models):
+    return [
+        preprocessing.StandardScaler()
+        | linear_model.LinearRegression(optimizer=optim.SGD(lr=0.005 * (i + 1)))
+        for i in range(n_models)
+    ]
+
+
+def run(n_models, shared, n_samples):
+    models, preprocessor = make_models(n_models), None
+    if shared:
+        preprocessor, models = meta.split_shared_prefix(models)
+    model = meta.MetaRegressor(
+        models=models, mfe_backend="streaming", preprocessor=preprocessor
+    )
+    data = list(datasets.synth.Friedman(seed=42).take(n_samples))
+    start = time.perf_counter()
+    for x, y in data:
+        model.predict_one(x)
+        model.learn_one(x, y)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-samples", type=int, default=2_000)
+    parser.add_argument("--n-models", type=int, nargs="+", default=[2, 8, 32, 64])
+    parser.add_argument("--output", default="preprocessing.json")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'models':>6} {'prefix':>9} {'time (s)':>9} {'samples/s':>10} speedup")
+    for n_models in args.n_models:
+        pipeline_time = None
+        for shared in (False, True):
+            elapsed = run(n_models, shared, args.n_samples)
+            pipeline_time = pipeline_time or elapsed
+            res = {
+                "n_models": n_models,
+                "prefix": "shared" if shared else "pipeline",
+                "Time in s": elapsed,
+                "Samples per s": args.n_samples / elapsed,
+                "Speedup": pipeline_time / elapsed,
+            }
+            results.append(res)
+            print(
+                f"{n_models:>6} {res['prefix']:>9} {elapsed:>9.3f} "
+                f"{res['Samples per s']:>10.1f} {res['Speedup']:>6.2f}x"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
@@ -1,7 +1,21 @@
+"""Run the benchmark tracks.
+
+Every (track, dataset, model) combination is an independent job. Jobs are
+spread over a pool of processes and the results of each job are written to
+their own file in the results directory as soon as it finishes, so that an
+interrupted run resumes where it stopped. The results of all the jobs are
+then consolidated into a single JSON file.
+"""
+
+import argparse
 import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from river import (
     datasets,
+    drift,
     dummy,
     evaluate,
     linear_model,
@@ -15,7 +29,7 @@ from tqdm import tqdm
 from kappaml_core import meta
 
 TRACKS = {
-    "Regression": {
+    "Regression": [
         evaluate.RegressionTrack(),
         # evaluate.Track(
         #     name="Regression - Synthetic datasets",
@@ -25,11 +39,11 @@ TRACKS = {
         #     ],
         #     metric=metrics.MAE(),
         # )
-    },
-    "Classification": {
+    ],
+    "Classification": [
         evaluate.BinaryClassificationTrack(),
-    },
-    "Forecasting": {
+    ],
+    "Forecasting": [
         evaluate.Track(
             name="Forecasting",
             datasets=[
@@ -37,7 +51,7 @@ TRACKS = {
             ],
             metric=metrics.MAE(),
         )
-    },
+    ],
 }
 
 MODELS = {
@@ -49,6 +63,22 @@ MODELS = {
                 preprocessing.StandardScaler() | tree.HoeffdingTreeRegressor(),
             ],
         ),
+        "KappaML - MetaRegressor (drift scheduled)": meta.MetaRegressor(
+            models=[
+                preprocessing.StandardScaler() | linear_model.LinearRegression(),
+                preprocessing.StandardScaler() | tree.HoeffdingTreeRegressor(),
+            ],
+            scheduler=meta.DriftScheduler(
+                drift.ADWIN(), min_interval=50, max_interval=1000
+            ),
+        ),
+        "KappaML - MetaRegressor (top-2 blend)": meta.MetaRegressor(
+            models=[
+                preprocessing.StandardScaler() | linear_model.LinearRegression(),
+                preprocessing.StandardScaler() | tree.HoeffdingTreeRegressor(),
+            ],
+            top_k=2,
+        ),
     },
     "Classification": {
         "BASELINE": dummy.NoChangeClassifier(),
@@ -61,43 +91,85 @@ MODELS = {
 }
 
 
-def run_track(track, models):
-    results = {}
-    for dataset in track:
-        results[dataset.__class__.__name__] = {}
-        for key, model in models.items():
-            results[dataset.__class__.__name__][key] = []
-            time = 0.0
-            for i in tqdm(
-                track.run(model, dataset),
-                total=10,
-                desc=f"{key} on {dataset.__class__.__name__}",
-            ):
-                time += i["Time"].total_seconds()
-                res = {
-                    "step": i["Step"],
-                    "track": track.name,
-                    "model": key,
-                    "dataset": dataset.__class__.__name__,
-                }
-                for k, v in i.items():
-                    if isinstance(v, metrics.base.Metric):
-                        res[k] = v.get()
-                res["Memory in Mb"] = i["Memory"] / 1024**2
-                res["Time in s"] = time
-                results[dataset.__class__.__name__][key].append(res)
+def run_job(track_type, track_name, dataset_name, model_key):
+    """Run a single model on a single dataset of a track."""
+    track = next(t for t in TRACKS[track_type] if t.name == track_name)
+    dataset = next(d for d in track if d.__class__.__name__ == dataset_name)
+    model = MODELS[track_type][model_key]
+
+    results = []
+    time = 0.0
+    for i in tqdm(
+        track.run(model, dataset),
+        total=10,
+        desc=f"{model_key} on {dataset_name}",
+        leave=False,
+    ):
+        time += i["Time"].total_seconds()
+        res = {
+            "step": i["Step"],
+            "track": track.name,
+            "model": model_key,
+            "dataset": dataset_name,
+        }
+        for k, v in i.items():
+            if isinstance(v, metrics.base.Metric):
+                res[k] = v.get()
+        res["Memory in Mb"] = i["Memory"] / 1024**2
+        res["Time in s"] = time
+        res["Samples per s"] = i["Step"] / time if time else 0.0
+        results.append(res)
     return results
 
 
-if __name__ == "__main__":
-    """Run all benchmark tracks."""
-    results = {}
+def list_jobs(tracks=None, datasets=None, models=None):
+    """All the (track type, track, dataset, model) jobs matching the filters."""
+    jobs = []
     for track_type in TRACKS:
-        results[track_type] = {}
         for track in TRACKS[track_type]:
-            results[track_type][track.name] = run_track(track, MODELS[track_type])
+            if tracks and track_type not in tracks and track.name not in tracks:
+                continue
+            for dataset in track:
+                dataset_name = dataset.__class__.__name__
+                if datasets and dataset_name not in datasets:
+                    continue
+                for model_key in MODELS[track_type]:
+                    if models and model_key not in models:
+                        continue
+                    jobs.append((track_type, track.name, dataset_name, model_key))
+    return jobs
+
+
+def job_path(results_dir, job):
+    name = "__".join(re.sub(r"[^\w.-]+", "_", part) for part in job)
+    return os.path.join(results_dir, f"{name}.json")
+
+
+def save_job(results_dir, job, results):
+    """Write the results of a job atomically."""
+    path = job_path(results_dir, job)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"job": job, "results": results}, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def consolidate(results_dir, jobs):
+    """Gather the results of the jobs in the nested format of results.json."""
+    results = {}
+    for job in jobs:
+        path = job_path(results_dir, job)
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            job_results = json.load(f)["results"]
+        track_type, track_name, dataset_name, model_key = job
+        sets = results.setdefault(track_type, {}).setdefault(track_name, {})
+        sets.setdefault(dataset_name, {})[model_key] = job_results
+    return results
+
 
-    # Print overview of final results
+def print_overview(results):
+    """Print overview of final results."""
     print("\nBenchmark Results Overview:")
     print("=" * 80)
 
@@ -121,5 +193,71 @@ if __name__ == "__main__":
                         if metric not in ["step", "track", "model", "dataset"]:
                             print(f"      {metric}: {value:.4f}")
 
-    with open("results.json", "w") as f:
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark tracks.")
+    parser.add_argument(
+        "--tracks",
+        nargs="+",
+        help="Track types or track names to run, e.g. Regression",
+    )
+    parser.add_argument("--datasets", nargs="+", help="Dataset class names to run")
+    parser.add_argument("--models", nargs="+", help="Model names to run")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--results-dir",
+        default="results",
+        help="Directory of the per-job results, used to resume interrupted runs",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun the jobs that already have results",
+    )
+    parser.add_argument("--output", default="results.json")
+    parser.add_argument(
+        "--list", action="store_true", help="List the matching jobs and exit"
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    """Run all benchmark tracks."""
+    args = parse_args()
+    jobs = list_jobs(args.tracks, args.datasets, args.models)
+
+    if args.list:
+        for job in jobs:
+            print(" / ".join(job))
+        raise SystemExit
+
+    os.makedirs(args.results_dir, exist_ok=True)
+    pending = [
+        job
+        for job in jobs
+        if args.force or not os.path.exists(job_path(args.results_dir, job))
+    ]
+    print(f"{len(jobs) - len(pending)} of {len(jobs)} jobs already done")
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(run_job, *job): job for job in pending}
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Benchmark jobs"
+        ):
+            job = futures[future]
+            try:
+                save_job(args.results_dir, job, future.result())
+            except Exception as e:
+                print(f"Job {' / '.join(job)} failed: {e}")
+
+    results = consolidate(args.results_dir, jobs)
+    print_overview(results)
+
+    with open(args.output, "w") as f:
         json.dump(results, f)
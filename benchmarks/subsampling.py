@@ -0,0 +1,99 @@
+"""Benchmark meta-feature subsampling as the number of features grows.
+
+Runs ``MetaRegressor`` with the ``general`` and ``statistical`` PyMFE groups on
+synthetic linear streams of increasing width, without subsampling and with
+each ``WindowSubsampler`` method. Reports the mean meta-feature extraction
+time, the throughput and the prequential MAE, i.e. the speed/accuracy
+tradeoff of each method.
+"""
+
+import argparse
+import json
+
+import numpy as np
+from river import linear_model, metrics, optim, preprocessing, tree
+
+from kappaml_core import meta
+
+METHODS = ["none", "projection", "hash", "rows"]
+
+
+def synthetic_stream(n_samples, n_features, seed=42):
+    """Sparse linear stream with an abrupt concept change halfway."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, n_features))
+    weights = rng.normal(size=(2, n_features)) * (rng.random((2, n_features)) < 0.2)
+    # Keep the variance of the target independent of the number of features
+    weights /= np.sqrt(0.2 * n_features)
+    concept = (np.arange(n_samples) >= n_samples // 2).astype(int)
+    y = np.einsum("ij,ij->i", X, weights[concept]) + rng.normal(size=n_samples)
+    names = [f"x{j}" for j in range(n_features)]
+    for xi, yi in zip(X, y):
+        yield dict(zip(names, xi.tolist())), float(yi)
+
+
+def make_model(method, n_features, n_components, n_rows):
+    subsampler = None
+    if method != "none":
+        subsampler = meta.WindowSubsampler(
+            method, n_components=n_components, n_rows=n_rows
+        )
+    return meta.MetaRegressor(
+        models=[
+            # Learning rates scaled so that SGD is stable on wide streams
+            preprocessing.StandardScaler()
+            | linear_model.LinearRegression(optimizer=optim.SGD(lr=0.5 / n_features)),
+            preprocessing.StandardScaler()
+            | linear_model.LinearRegression(optimizer=optim.SGD(lr=0.05 / n_features)),
+            preprocessing.StandardScaler() | tree.HoeffdingTreeRegressor(),
+        ],
+        mfe_groups=["general", "statistical"],
+        window_size=200,
+        meta_update_frequency=50,
+        profile=True,
+        mfe_subsampler=subsampler,
+    )
+
+
+def run(n_features, method, n_samples, n_components, n_rows):
+    model = make_model(method, n_features, n_components, n_rows)
+    metric = metrics.MAE()
+    for x, y in synthetic_stream(n_samples, n_features):
+        metric.update(y, model.predict_one(x))
+        model.learn_one(x, y)
+
+    phases = model.profiler.to_dict()
+    return {
+        "n_features": n_features,
+        "method": method,
+        "Meta-features in ms": 1e3 * phases["meta_features"]["mean_seconds"],
+        "Samples per s": n_samples / phases["learn_one"]["total_seconds"],
+        "MAE": metric.get(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-samples", type=int, default=2_000)
+    parser.add_argument("--n-features", type=int, nargs="+", default=[10, 50, 100, 300])
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--n-components", type=int, default=32)
+    parser.add_argument("--n-rows", type=int, default=100)
+    parser.add_argument("--output", default="subsampling.json")
+    args = parser.parse_args()
+
+    results = []
+    for n_features in args.n_features:
+        for method in args.methods:
+            res = run(
+                n_features, method, args.n_samples, args.n_components, args.n_rows
+            )
+            results.append(res)
+            print(
+                f"n_features={n_features:<4} {method:<10} "
+                f"meta-features {res['Meta-features in ms']:8.1f} ms  "
+                f"{res['Samples per s']:8.1f} samples/s  MAE {res['MAE']:.4f}"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
@@ -0,0 +1,98 @@
+"""Benchmark hosting many streams with a ``TenantManager``.
+
+Feeds interleaved streams, one per tenant, with Zipf-distributed traffic so
+that some tenants are hot and most are cold, either to independent clones of a
+``MetaRegressor`` or to a ``TenantManager`` holding all the tenants, or only
+some of them with the others offloaded to disk. Reports the mean time per
+sample, i.e. the routing overhead on top of ``learn_one``, and the memory
+used per tenant, including its share of the shared components.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+from river import datasets, linear_model, optim, preprocessing
+
+from kappaml_core import meta
+from kappaml_core.meta.memory import deep_sizeof
+
+
+def make_template(n_models):
+    return meta.MetaRegressor(
+        models=[
+            preprocessing.StandardScaler()
+            | linear_model.LinearRegression(optimizer=optim.SGD(lr=lr))
+            for lr in [0.001 * 2**k for k in range(n_models)]
+        ],
+        window_size=100,
+        meta_update_frequency=50,
+    )
+
+
+def run(setup, n_tenants, n_models, n_samples, max_resident=None):
+    data = list(datasets.synth.Friedman(seed=42).take(n_samples))
+    rng = np.random.default_rng(42)
+    routes = ((rng.zipf(1.5, size=n_samples) - 1) % n_tenants).tolist()
+    template = make_template(n_models)
+    if setup == "independent":
+        estimators = [template.clone() for _ in range(n_tenants)]
+        start = time.perf_counter()
+        for tenant_id, (x, y) in zip(routes, data):
+            estimators[tenant_id].learn_one(x, y)
+        elapsed = time.perf_counter() - start
+        footprint = deep_sizeof(estimators)
+        n_offloaded = 0
+    else:
+        tenants = meta.TenantManager(
+            template,
+            max_resident=max_resident or n_tenants,
+            offload_dir=tempfile.mkdtemp(prefix="kappaml-tenants-"),
+        )
+        start = time.perf_counter()
+        for tenant_id, (x, y) in zip(routes, data):
+            tenants.learn_one(tenant_id, x, y)
+        elapsed = time.perf_counter() - start
+        memory = tenants.memory_footprint()
+        footprint = memory["shared"] + sum(memory["tenants"].values())
+        n_offloaded = tenants.n_offloaded
+        tenants.close()
+    return {
+        "setup": setup,
+        "n_tenants": n_tenants,
+        "max_resident": max_resident or n_tenants,
+        "Time per sample in µs": 1e6 * elapsed / n_samples,
+        "Memory per tenant in KiB": footprint / n_tenants / 1024,
+        "Offloads": n_offloaded,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n-tenants", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--n-models", type=int, default=4)
+    parser.add_argument("--n-samples", type=int, default=20_000)
+    parser.add_argument("--output", default="tenants.json")
+    args = parser.parse_args()
+
+    results = []
+    for n_tenants in args.n_tenants:
+        for setup, max_resident in [
+            ("independent", None),
+            ("manager", None),
+            ("manager", max(1, n_tenants // 10)),
+        ]:
+            res = run(setup, n_tenants, args.n_models, args.n_samples, max_resident)
+            results.append(res)
+            print(
+                f"n_tenants={n_tenants:<5} {setup:<12} "
+                f"resident={res['max_resident']:<5} "
+                f"{res['Time per sample in µs']:8.1f} µs/sample  "
+                f"{res['Memory per tenant in KiB']:8.1f} KiB/tenant  "
+                f"offloads {res['Offloads']}"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f)
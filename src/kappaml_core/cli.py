@@ -4,17 +4,17 @@ console script.
 """
 
 import argparse
+import asyncio
+import csv
+import json
 import logging
+import os
 import sys
 
-from river import compose, datasets, facto, metrics, optim, preprocessing
-from river.evaluate import progressive_val_score
-from river.linear_model import LinearRegression
-from river.model_selection import GreedyRegressor
-from river.reco import Baseline, BiasedMF, FunkMF
-from river.tree import HoeffdingTreeClassifier
+from kappaml_core import __version__
 
-from kappaml_core import __version__, meta
+# River, pandas and the meta package take seconds to import, so they are only
+# imported by the commands using them, not by ``--help`` or ``--version``
 
 __author__ = "Alex Imbrea"
 __copyright__ = "Alex Imbrea"
@@ -40,6 +40,9 @@ def fib(n):
 
 
 def evaluate(model):
+    from river import datasets, metrics
+    from river.evaluate import progressive_val_score
+
     X_y = datasets.Phishing()
     metric = metrics.MAE() + metrics.RMSE()
     return progressive_val_score(
@@ -48,6 +51,9 @@ def evaluate(model):
 
 
 def evaluate_classifier(model):
+    from river import datasets, metrics
+    from river.evaluate import progressive_val_score
+
     X_y = datasets.Elec2()
     metric = metrics.Accuracy()
     return progressive_val_score(
@@ -66,10 +72,24 @@ MODEL_CHOICES = [
 ]
 
 
-def demo(demo_name):
-    """Demo all the KappaML models"""
-    if demo_name == "baseline":
-        print("Baseline model")
+def make_model(name):
+    """Build one of the demo models
+
+    Args:
+      name (str): one of :obj:`MODEL_CHOICES`
+
+    Returns:
+      river.base.Estimator: the untrained model
+    """
+    from river import compose, facto, optim, preprocessing
+    from river.linear_model import LinearRegression
+    from river.model_selection import GreedyRegressor
+    from river.reco import Baseline, BiasedMF, FunkMF
+    from river.tree import HoeffdingTreeClassifier
+
+    from kappaml_core import meta
+
+    if name == "baseline":
         baseline_params = {
             "optimizer": optim.SGD(0.025),
             "l2": 0.0,
@@ -79,9 +99,8 @@ def demo(demo_name):
         model = preprocessing.PredClipper(
             regressor=Baseline(**baseline_params), y_min=1, y_max=5
         )
-        evaluate(model)
-    elif demo_name == "funk_mf":
-        print("FunkMF model")
+        return model
+    elif name == "funk_mf":
         funk_mf_params = {
             "n_factors": 10,
             "optimizer": optim.SGD(0.05),
@@ -92,8 +111,8 @@ def demo(demo_name):
         model = preprocessing.PredClipper(
             regressor=FunkMF(**funk_mf_params), y_min=1, y_max=5
         )
-        evaluate(model)
-    elif demo_name == "biased_mf":
+        return model
+    elif name == "biased_mf":
         biased_mf_params = {
             "n_factors": 10,
             "bias_optimizer": optim.SGD(0.025),
@@ -107,9 +126,8 @@ def demo(demo_name):
         model = preprocessing.PredClipper(
             regressor=BiasedMF(**biased_mf_params), y_min=1, y_max=5
         )
-        evaluate(model)
-    elif demo_name == "fm":
-        print("Facto Machine")
+        return model
+    elif name == "fm":
         fm_params = {
             "n_factors": 10,
             "weight_optimizer": optim.SGD(0.025),
@@ -129,9 +147,8 @@ def demo(demo_name):
         regressor |= facto.FMRegressor(**fm_params)
 
         model = preprocessing.PredClipper(regressor=regressor, y_min=1, y_max=5)
-        evaluate(model)
-    elif demo_name == "greedy":
-        print("Greedy model selection")
+        return model
+    elif name == "greedy":
         models = [
             preprocessing.PredClipper(
                 LinearRegression(optimizer=optim.SGD(lr=lr)),
@@ -142,9 +159,8 @@ def demo(demo_name):
         ]
 
         model = GreedyRegressor(models=models)
-        evaluate(model)
-    elif demo_name == "meta_regressor":
-        print("Meta regressor model selection")
+        return model
+    elif name == "meta_regressor":
         models = [
             preprocessing.PredClipper(
                 LinearRegression(optimizer=optim.SGD(lr=lr)),
@@ -155,14 +171,164 @@ def demo(demo_name):
         ]
 
         model = meta.MetaRegressor(models=models)
-        evaluate(model)
-    elif demo_name == "meta_classifier":
-        print("Meta classifier model selection")
+        return model
+    elif name == "meta_classifier":
         models = [HoeffdingTreeClassifier(max_depth=depth) for depth in range(1, 5)]
 
         model = meta.MetaClassifier(models=models)
+        return model
+    raise ValueError(f"Unknown model {name!r}, expected one of {MODEL_CHOICES}")
+
+
+DEMO_TITLES = {
+    "baseline": "Baseline model",
+    "funk_mf": "FunkMF model",
+    "biased_mf": "BiasedMF model",
+    "fm": "Facto Machine",
+    "greedy": "Greedy model selection",
+    "meta_regressor": "Meta regressor model selection",
+    "meta_classifier": "Meta classifier model selection",
+}
+
+
+def demo(demo_name):
+    """Demo all the KappaML models"""
+    print(DEMO_TITLES[demo_name])
+    model = make_model(demo_name)
+    if demo_name == "meta_classifier":
         evaluate_classifier(model)
-    pass
+    else:
+        evaluate(model)
+
+
+DATASET_CHOICES = ["phishing", "elec2", "movielens100k", "movielens25m"]
+
+# Models predicting from the ``user`` and ``item`` features, and the datasets
+# that have them
+RECO_MODELS = ["baseline", "funk_mf", "biased_mf", "fm"]
+RECO_DATASETS = ["movielens100k", "movielens25m"]
+
+
+def default_dataset(model_names):
+    """Dataset used by :func:`evaluate_models` when none is given
+
+    Args:
+      model_names (List[str]): names of the models, from :obj:`MODEL_CHOICES`
+
+    Returns:
+      str: ``movielens100k`` if any of the models is a recommender, else
+      ``phishing``
+    """
+    if any(name in RECO_MODELS for name in model_names):
+        return "movielens100k"
+    return "phishing"
+
+
+def make_dataset(name):
+    """Build one of the datasets of :func:`evaluate_models`
+
+    Args:
+      name (str): one of :obj:`DATASET_CHOICES`
+
+    Returns:
+      river.datasets.base.Dataset: the dataset
+    """
+    from river import datasets
+
+    if name == "phishing":
+        return datasets.Phishing()
+    elif name == "elec2":
+        return datasets.Elec2()
+    elif name == "movielens100k":
+        return datasets.MovieLens100K()
+    elif name == "movielens25m":
+        from kappaml_core.datasets import MovieLens25M
+
+        return MovieLens25M()
+    raise ValueError(f"Unknown dataset {name!r}, expected one of {DATASET_CHOICES}")
+
+
+def make_metric(name):
+    """Metrics of the demo models, as used by :func:`demo`"""
+    from river import metrics
+
+    if name == "meta_classifier":
+        return metrics.Accuracy()
+    return metrics.MAE() + metrics.RMSE()
+
+
+def evaluate_models(
+    model_names,
+    dataset_name=None,
+    n_workers=None,
+    step=100,
+    n_samples=None,
+    output=None,
+):
+    """Prequential evaluation of several demo models in parallel processes
+
+    The dataset is decoded once and shared with the worker processes, each of
+    which evaluates one model.
+
+    Args:
+      model_names (List[str]): names of the models, from :obj:`MODEL_CHOICES`
+      dataset_name (str): name of the dataset, from :obj:`DATASET_CHOICES`,
+          defaults to :func:`default_dataset`
+      n_workers (int): number of worker processes, defaults to the number of CPUs
+      step (int): number of samples between two checkpoints of the metrics
+      n_samples (int): only evaluate on the first ``n_samples`` samples
+      output (str): path of the consolidated results, written as CSV if it ends
+          with ``.csv`` and as JSON otherwise
+
+    Returns:
+      dict: the checkpoints of each model that did not fail
+    """
+    from kappaml_core.evaluation import evaluate_parallel
+
+    if dataset_name is None:
+        dataset_name = default_dataset(model_names)
+    reco = [name for name in model_names if name in RECO_MODELS]
+    if reco and dataset_name not in RECO_DATASETS:
+        raise ValueError(
+            f"Models {reco} need the user and item features of {RECO_DATASETS}, "
+            f"which {dataset_name!r} does not have"
+        )
+
+    candidates = {name: (make_model(name), make_metric(name)) for name in model_names}
+    results, errors = evaluate_parallel(
+        candidates,
+        make_dataset(dataset_name),
+        n_workers=n_workers,
+        step=step,
+        n_samples=n_samples,
+    )
+
+    for name in model_names:
+        if name in errors:
+            print(f"{name}: failed with {errors[name]}")
+            continue
+        final = results[name][-1]
+        scores = ", ".join(
+            f"{k}: {v:.4f}" for k, v in final.items() if k not in ["model", "step"]
+        )
+        print(f"{name}: {scores}")
+
+    if output:
+        if os.path.splitext(output)[1] == ".csv":
+            rows = [row for checkpoints in results.values() for row in checkpoints]
+            fields = list(dict.fromkeys(k for row in rows for k in row))
+            with open(output, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            with open(output, "w") as f:
+                json.dump(
+                    {"dataset": dataset_name, "results": results, "errors": errors},
+                    f,
+                    indent=2,
+                )
+    return results
 
 
 # ---- CLI ----
@@ -192,6 +358,59 @@ def parse_args(args):
         type=str,
         choices=MODEL_CHOICES,
     )
+    evaluate_parser = subparsers.add_parser(
+        "evaluate", help="Evaluate several models in parallel on the same stream"
+    )
+    evaluate_parser.add_argument(
+        "models",
+        help="Names of the models to evaluate",
+        nargs="+",
+        choices=MODEL_CHOICES,
+    )
+    evaluate_parser.add_argument(
+        "--dataset",
+        help="Name of the dataset, movielens100k for recommenders else phishing",
+        choices=DATASET_CHOICES,
+        default=None,
+    )
+    evaluate_parser.add_argument(
+        "-j", "--jobs", help="Number of worker processes", type=int, default=None
+    )
+    evaluate_parser.add_argument(
+        "--step", help="Samples between two checkpoints", type=int, default=100
+    )
+    evaluate_parser.add_argument(
+        "--n-samples", help="Only use the first samples", type=int, default=None
+    )
+    evaluate_parser.add_argument(
+        "-o", "--output", help="Results file, CSV if it ends with .csv else JSON"
+    )
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve a trained model over a local socket"
+    )
+    serve_parser.add_argument(
+        "model", help="Checkpoint directory or pickle file of the model"
+    )
+    serve_parser.add_argument("--host", help="Host to listen on", default="127.0.0.1")
+    serve_parser.add_argument(
+        "--port", help="Port to listen on", type=int, default=8765
+    )
+    serve_parser.add_argument("--socket", help="Listen on a Unix socket instead")
+    serve_parser.add_argument(
+        "--max-batch-size", help="Maximum samples per batch", type=int, default=64
+    )
+    serve_parser.add_argument(
+        "--max-latency-ms",
+        help="Maximum wait of a prediction for its batch to fill up",
+        type=float,
+        default=5.0,
+    )
+    serve_parser.add_argument(
+        "--snapshot-every",
+        help="Learned samples between two refreshes of the prediction snapshot",
+        type=int,
+        default=100,
+    )
 
     parser.add_argument(
         "--version",
@@ -238,8 +457,9 @@ def setup_logging(loglevel):
 
 
 def main(args):
-    """Wrapper allowing :func:`fib` and :func:`demo` to be called with string arguments
-    in a CLI fashion
+    """Wrapper allowing :func:`fib`, :func:`demo`, :func:`evaluate_models` and
+    :func:`~kappaml_core.serving.serve` to be called with string arguments in a CLI
+    fashion
 
     Args:
       args (List[str]): command line parameters as list of strings
@@ -258,6 +478,35 @@ def main(args):
         _logger.debug("Starting demo...")
         demo(args.demo_name)
         _logger.info("Done.")
+    elif args.command == "evaluate":
+        _logger.debug("Starting evaluation...")
+        evaluate_models(
+            args.models,
+            args.dataset,
+            n_workers=args.jobs,
+            step=args.step,
+            n_samples=args.n_samples,
+            output=args.output,
+        )
+        _logger.info("Done.")
+    elif args.command == "serve":
+        _logger.debug("Starting server...")
+        from kappaml_core.serving import serve
+
+        try:
+            asyncio.run(
+                serve(
+                    args.model,
+                    host=args.host,
+                    port=args.port,
+                    socket_path=args.socket,
+                    max_batch_size=args.max_batch_size,
+                    max_latency=args.max_latency_ms / 1000,
+                    snapshot_every=args.snapshot_every,
+                )
+            )
+        except KeyboardInterrupt:
+            _logger.info("Stopped.")
 
 
 def run():
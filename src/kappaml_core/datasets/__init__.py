@@ -3,7 +3,7 @@
 This module extends the dataset classes from the `river` package.
 
 """
-from .MovieLens25M import MovieLens25M
+from .movielens25M import MovieLens25M
 
 __all__ = [
     "MovieLens25M",
@@ -1,37 +1,194 @@
-from river import stream
+import os
+import pathlib
+import shutil
+import zipfile
+from urllib import request
+
+import numpy as np
+import pandas as pd
 from river.datasets import base
 
+# Columns of the ratings file and the dtype they are cached with
+COLUMNS = {
+    "userId": np.int32,
+    "movieId": np.int32,
+    "rating": np.float32,
+    "timestamp": np.int64,
+}
+
+# Feature names of the samples for each column of the ratings file
+FEATURES = {"userId": "user", "movieId": "item", "timestamp": "timestamp"}
+
+RATINGS_FILE = "ml-25m/ratings.csv"
+
 
 class MovieLens25M(base.RemoteDataset):
-    """MovieLens 1M dataset.
+    """MovieLens 25M dataset.
+
+    25 million ratings of 62,000 movies by 162,000 users. Each sample is a
+    rating, with the ``user``, ``item`` and ``timestamp`` features, in the
+    order of the ratings file.
+
+    The first time the dataset is used, the ratings CSV file is converted to
+    one NumPy file per column in the ``cache`` directory of the dataset. The
+    columns are then memory-mapped, so that iterating does not parse any CSV
+    and no longer needs the CSV file or a network connection. ``iter_batches``
+    yields chunks of samples as DataFrames, e.g. for ``learn_many``.
 
     Source: https://grouplens.org/datasets/movielens/25m/
 
+    Parameters
+    ----------
+    archive: str (default=None)
+        Path to a local copy of ``ml-25m.zip``, or of the directory it was
+        extracted to, used instead of downloading the archive.
+
     References
     ----------
     [^1]: [The MovieLens Datasets](http://dx.doi.org/10.1145/2827872)
 
     """
 
-    def __init__(self):
+    def __init__(self, archive: str = None):
         super().__init__(
-            n_samples=100_000,
-            n_features=10,
+            n_samples=25_000_095,
+            n_features=len(FEATURES),
             task=base.REG,
             url="https://files.grouplens.org/datasets/movielens/ml-25m.zip",
             size=261_978_986,
-            filename="movie.csv",
+            filename=RATINGS_FILE,
         )
+        self.archive = archive
+
+    @property
+    def data_dir(self) -> pathlib.Path:
+        return pathlib.Path(base.get_data_home(), self.__class__.__name__)
+
+    @property
+    def cache_dir(self) -> pathlib.Path:
+        return self.data_dir / "cache"
+
+    @property
+    def path(self):
+        if self.archive is not None and os.path.isdir(self.archive):
+            root = pathlib.Path(self.archive)
+            if (root / "ratings.csv").exists():
+                return root / "ratings.csv"
+            return root / RATINGS_FILE
+        return self.data_dir / RATINGS_FILE
+
+    @property
+    def is_prepared(self) -> bool:
+        """Indicate whether the columnar cache has been built."""
+        return all((self.cache_dir / f"{c}.npy").exists() for c in COLUMNS)
+
+    @property
+    def is_downloaded(self):
+        return self.is_prepared or self.path.exists()
+
+    def download(self, force=False, verbose=True):
+        if not force and self.is_downloaded:
+            return
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        if self.archive is not None:
+            archive_path = pathlib.Path(self.archive)
+        else:
+            archive_path = self.data_dir / os.path.basename(self.url)
+            if verbose:
+                print(f"Downloading {self.url}")
+            with request.urlopen(self.url) as r, open(archive_path, "wb") as f:
+                shutil.copyfileobj(r, f)
+
+        # Only the ratings are used, skip the other files of the archive
+        if verbose:
+            print(f"Uncompressing {RATINGS_FILE} into {self.data_dir}")
+        with zipfile.ZipFile(archive_path, "r") as zf:
+            zf.extract(RATINGS_FILE, self.data_dir)
+
+        if self.archive is None:
+            archive_path.unlink()
+
+    def prepare(self, force: bool = False, chunk_size: int = 1_000_000):
+        """Convert the ratings CSV file to the columnar cache.
+
+        Parameters
+        ----------
+        force: bool (default=False)
+            Rebuild the cache even if it already exists.
+        chunk_size: int (default=1_000_000)
+            Number of rows parsed at once, which bounds the memory used.
+        """
+        if self.is_prepared and not force:
+            return
+        if not self.path.exists():
+            self.download(force=True)
+
+        with open(self.path, "rb") as f:
+            n_rows = sum(b.count(b"\n") for b in iter(lambda: f.read(1 << 24), b""))
+        n_rows -= 1  # header
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        columns = {
+            c: np.lib.format.open_memmap(
+                self.cache_dir / f"{c}.tmp.npy", mode="w+", dtype=dtype, shape=(n_rows,)
+            )
+            for c, dtype in COLUMNS.items()
+        }
+        start = 0
+        for chunk in pd.read_csv(
+            self.path, usecols=list(COLUMNS), dtype=COLUMNS, chunksize=chunk_size
+        ):
+            stop = start + len(chunk)
+            for c, column in columns.items():
+                column[start:stop] = chunk[c].to_numpy()
+            start = stop
+
+        # Rename once complete, so that an interrupted conversion is redone
+        for column in columns.values():
+            column.flush()
+        del columns, column
+        for c in COLUMNS:
+            os.replace(self.cache_dir / f"{c}.tmp.npy", self.cache_dir / f"{c}.npy")
+
+    def load_columns(self, mmap: bool = True) -> dict:
+        """Columns of the ratings file as arrays, building the cache if needed.
+
+        Parameters
+        ----------
+        mmap: bool (default=True)
+            Memory-map the columns read-only instead of reading them.
+        """
+        if not self.is_prepared:
+            self.prepare()
+        return {
+            c: np.load(self.cache_dir / f"{c}.npy", mmap_mode="r" if mmap else None)
+            for c in COLUMNS
+        }
+
+    def iter_batches(self, batch_size: int = 10_000):
+        """Iterate over the ratings in chunks.
+
+        Yields
+        ------
+        X: pd.DataFrame
+            The ``user``, ``item`` and ``timestamp`` features of the chunk.
+        y: pd.Series
+            The ratings of the chunk.
+        """
+        columns = self.load_columns()
+        n_rows = len(columns["rating"])
+        for start in range(0, n_rows, batch_size):
+            stop = min(start + batch_size, n_rows)
+            index = pd.RangeIndex(start, stop)
+            X = pd.DataFrame(
+                {f: columns[c][start:stop] for c, f in FEATURES.items()}, index=index
+            )
+            yield X, pd.Series(columns["rating"][start:stop], index=index)
 
     def _iter(self):
-        return stream.iter_csv(
-            self.path,
-            target="rating",
-            converters={
-                "timestamp": int,
-                "release_date": int,
-                "age": float,
-                "rating": float,
-            },
-            delimiter="\t",
-        )
+        # Converting whole chunks to Python objects is much faster than
+        # indexing the memory-mapped columns sample by sample
+        for X, y in self.iter_batches(batch_size=100_000):
+            for x, yi in zip(X.to_dict(orient="records"), y.tolist()):
+                yield x, yi
@@ -0,0 +1,324 @@
+"""Parallel prequential evaluation of several models over the same stream.
+
+The stream is decoded once in the parent process into a numeric matrix held in
+shared memory. Worker processes attach to this matrix instead of receiving a
+copy of the data, and each one runs the progressive validation of a model.
+"""
+
+import itertools
+import numbers
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from river import metrics
+from river.evaluate import iter_progressive_val_score
+
+# Kinds of columns: how the values are encoded as float64 and decoded back
+BOOL, INT, FLOAT, CATEGORY = "bool", "int", "float", "category"
+
+
+def _kind(value):
+    if isinstance(value, (bool, np.bool_)):
+        return BOOL
+    if isinstance(value, numbers.Integral):
+        return INT
+    if isinstance(value, numbers.Real):
+        return FLOAT
+    return CATEGORY
+
+
+def _dtype_kind(dtype):
+    """Kind of the values of a NumPy array, ``None`` if they need a look."""
+    if dtype.kind == "b":
+        return BOOL
+    if dtype.kind in "iu":
+        return INT
+    if dtype.kind == "f":
+        return FLOAT
+    return None
+
+
+def _decoder(kind, categories):
+    if kind == BOOL:
+        return bool
+    if kind == INT:
+        return int
+    if kind == CATEGORY:
+        return lambda code: categories[int(code)]
+    return float
+
+
+class _ColumnEncoder:
+    """Encodes the values of a column as float64, one chunk at a time.
+
+    The kind of the column is only known once all the chunks are seen. Until
+    then, numeric values are stored as is and non-numeric ones as category
+    codes. When a column that held numbers gets its first non-numeric value,
+    ``recode_from`` is set to its previous kind and the chunks already encoded
+    must be passed through :meth:`recode`.
+    """
+
+    def __init__(self):
+        self.kinds = set()
+        self.categories = []
+        self.codes = {}
+        self.recode_from = None
+
+    @property
+    def kind(self):
+        if CATEGORY in self.kinds:
+            return CATEGORY
+        if len(self.kinds) == 1:
+            return next(iter(self.kinds))
+        return FLOAT
+
+    def encode(self, values):
+        """Encode a chunk, given as a NumPy array or a list with ``None`` gaps."""
+        previous = self.kind if self.kinds else None
+        kind = _dtype_kind(values.dtype) if isinstance(values, np.ndarray) else None
+        if kind is not None:
+            self.kinds.add(kind)
+        else:
+            values = list(values)
+            self.kinds.update(_kind(v) for v in values if v is not None)
+        self.recode_from = None
+        if self.kind != CATEGORY:
+            return np.asarray(values, dtype=float)
+        if previous not in (None, CATEGORY):
+            self.recode_from = previous
+        return np.array([self._code(v) for v in values], dtype=float)
+
+    def _code(self, value):
+        if value is None:
+            return None
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+    def recode(self, encoded):
+        """Convert numbers encoded before ``recode_from`` was set to codes."""
+        decode = _decoder(self.recode_from, [])
+        return np.array(
+            [self._code(decode(v)) if v == v else None for v in encoded.tolist()],
+            dtype=float,
+        )
+
+
+class SharedStream:
+    """A stream decoded once into shared memory.
+
+    Features and targets are stored as a float64 matrix where missing features
+    are NaN and non-numeric values are category codes. Pickling a
+    ``SharedStream`` only transfers the name of the shared memory block and
+    the column descriptions, so that it can be sent to worker processes
+    cheaply. Iterating yields the ``(x, y)`` samples with their original
+    types.
+
+    The stream is encoded chunk by chunk, and the samples are never held as
+    Python objects all at once. Columnar datasets, which have ``load_columns``
+    and ``iter_batches`` methods like
+    :class:`~kappaml_core.datasets.MovieLens25M`, are copied batch by batch
+    straight into shared memory. Other datasets are iterated.
+
+    Parameters
+    ----------
+    dataset: iterable
+        The ``(x, y)`` samples, e.g. a river dataset.
+    n_samples: int (default=None)
+        Only keep the first ``n_samples`` samples.
+    chunk_size: int (default=10_000)
+        Number of samples encoded at once.
+    """
+
+    def __init__(self, dataset, n_samples: int = None, chunk_size: int = 10_000):
+        self._owner = True
+        if hasattr(dataset, "load_columns") and hasattr(dataset, "iter_batches"):
+            self._from_batches(dataset, n_samples, chunk_size)
+        else:
+            self._from_samples(dataset, n_samples, chunk_size)
+
+    def _allocate(self, shape):
+        self.shape = shape
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(1, 8 * shape[0] * shape[1])
+        )
+
+    def _finish(self, encoders):
+        self.kinds = [encoder.kind for encoder in encoders]
+        self.categories = [encoder.categories for encoder in encoders]
+
+    def _from_batches(self, dataset, n_samples, chunk_size):
+        n_rows = len(next(iter(dataset.load_columns().values())))
+        if n_samples is not None:
+            n_rows = min(n_rows, n_samples)
+
+        batches = dataset.iter_batches(batch_size=chunk_size)
+        first = next(batches, None)
+        if first is None:
+            n_rows, self.features = 0, []
+        else:
+            self.features = list(first[0].columns)
+            batches = itertools.chain([first], batches)
+        encoders = [_ColumnEncoder() for _ in range(len(self.features) + 1)]
+        self._allocate((n_rows, len(encoders)))
+        data = self._array()
+
+        start = 0
+        for X, y in batches:
+            if start == n_rows:
+                break
+            stop = min(start + len(X), n_rows)
+            columns = [X[f].to_numpy() for f in self.features] + [y.to_numpy()]
+            for j, (encoder, values) in enumerate(zip(encoders, columns)):
+                data[start:stop, j] = encoder.encode(values[: stop - start])
+                if encoder.recode_from is not None:
+                    data[:start, j] = encoder.recode(data[:start, j])
+            start = stop
+        # The shared memory block may be larger than the samples read
+        self.shape = (start, len(encoders))
+        self._finish(encoders)
+
+    def _from_samples(self, dataset, n_samples, chunk_size):
+        self.features = []
+        columns = {}
+        x_encoders = []
+        y_encoder = _ColumnEncoder()
+        blocks = deque()
+        samples = itertools.islice(dataset, n_samples)
+        for chunk in iter(lambda: list(itertools.islice(samples, chunk_size)), []):
+            for f in dict.fromkeys(k for x, _ in chunk for k in x):
+                if f not in columns:
+                    columns[f] = len(self.features)
+                    self.features.append(f)
+                    x_encoders.append(_ColumnEncoder())
+
+            X_block = np.full((len(chunk), len(self.features)), np.nan)
+            for f, j in columns.items():
+                encoder = x_encoders[j]
+                X_block[:, j] = encoder.encode([x.get(f) for x, _ in chunk])
+                if encoder.recode_from is not None:
+                    for X_prev, _ in blocks:
+                        if j < X_prev.shape[1]:
+                            X_prev[:, j] = encoder.recode(X_prev[:, j])
+            y_block = y_encoder.encode([y for _, y in chunk])
+            if y_encoder.recode_from is not None:
+                for _, y_prev in blocks:
+                    y_prev[:] = y_encoder.recode(y_prev)
+            blocks.append((X_block, y_block))
+
+        n_rows = sum(len(y_block) for _, y_block in blocks)
+        self._allocate((n_rows, len(self.features) + 1))
+        data = self._array()
+        start = 0
+        # Release each block once copied
+        while blocks:
+            X_block, y_block = blocks.popleft()
+            stop = start + len(y_block)
+            data[start:stop, : X_block.shape[1]] = X_block
+            data[start:stop, X_block.shape[1] : -1] = np.nan
+            data[start:stop, -1] = y_block
+            start = stop
+        self._finish(x_encoders + [y_encoder])
+
+    def _array(self):
+        return np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = self._shm.name
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=state["_shm"])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _decoders(self):
+        return [_decoder(k, c) for k, c in zip(self.kinds, self.categories)]
+
+    def __iter__(self):
+        *decode_x, decode_y = self._decoders()
+        decode_x = list(zip(self.features, decode_x))
+        data = self._array()
+        # Convert blocks of rows at once, without copying the whole stream
+        for start in range(0, len(data), 1024):
+            for row in data[start : start + 1024].tolist():
+                # NaN values are missing features
+                x = {f: dec(v) for (f, dec), v in zip(decode_x, row) if v == v}
+                yield x, decode_y(row[-1])
+
+    def close(self):
+        """Release the shared memory, which is freed once the owner closes it."""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def evaluate_one(name, model, metric, stream, step):
+    """Progressive validation of a model, with a checkpoint every ``step``."""
+    results = []
+    for state in iter_progressive_val_score(
+        stream, model, metric, step=step, measure_time=True, measure_memory=True
+    ):
+        time = state["Time"].total_seconds()
+        res = {"model": name, "step": state["Step"]}
+        for k, v in state.items():
+            if isinstance(v, metrics.base.Metric):
+                res[k] = v.get()
+        res["Memory in Mb"] = state["Memory"] / 1024**2
+        res["Time in s"] = time
+        res["Samples per s"] = state["Step"] / time if time else 0.0
+        results.append(res)
+    return results
+
+
+def evaluate_parallel(candidates, dataset, n_workers=None, step=100, n_samples=None):
+    """Evaluate candidate models in parallel worker processes.
+
+    Parameters
+    ----------
+    candidates: dict
+        Maps the name of each candidate to a ``(model, metric)`` pair.
+    dataset: iterable
+        The ``(x, y)`` samples, decoded once and shared with the workers.
+    n_workers: int (default=None)
+        Number of worker processes, defaults to the number of CPUs.
+    step: int (default=100)
+        Number of samples between two checkpoints of the metrics.
+    n_samples: int (default=None)
+        Only evaluate on the first ``n_samples`` samples.
+
+    Returns
+    -------
+    results: dict
+        Maps the name of each candidate to its checkpoints, as a list of dicts
+        with the metrics, time and memory.
+    errors: dict
+        Maps the name of each candidate that failed to its error message.
+    """
+    stream = SharedStream(dataset, n_samples=n_samples)
+    results, errors = {}, {}
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {
+                pool.submit(evaluate_one, name, model, metric, stream, step): name
+                for name, (model, metric) in candidates.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+    finally:
+        stream.close()
+    # Keep the order of the candidates
+    results = {name: results[name] for name in candidates if name in results}
+    return results, errors
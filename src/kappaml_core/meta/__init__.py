@@ -1,11 +1,39 @@
 """
 The :mod:`kappaml_core.meta` module contains meta-learning algorithms
+
+Submodules are imported on first access to the names they define, so that
+importing the package, or a lightweight part of it, does not load River,
+pandas and PyMFE.
 """
 
-from .meta_classifier import MetaClassifier
-from .meta_regressor import MetaRegressor
+import importlib
+
+# Public name to the submodule defining it
+_LAZY_IMPORTS = {
+    "MetaRegressor": "meta_regressor",
+    "MetaClassifier": "meta_classifier",
+    "MetaFeatureCache": "cache",
+    "DriftScheduler": "scheduling",
+    "WindowSubsampler": "subsampling",
+    "SuccessiveHalvingPruner": "pruning",
+    "split_shared_prefix": "preprocessing",
+    "MemoryBudget": "memory",
+    "KnowledgeBase": "knowledge",
+    "NearestNeighborMetaLearner": "neighbors",
+    "TenantManager": "tenants",
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_LAZY_IMPORTS[name]}", __name__), name)
+    # Cache the name, later accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
 
-__all__ = [
-    "MetaRegressor",
-    "MetaClassifier",
-]
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
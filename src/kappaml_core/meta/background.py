@@ -0,0 +1,105 @@
+import queue
+import threading
+import warnings
+
+DROP_POLICIES = ["oldest", "newest", "block"]
+
+
+class BackgroundMetaUpdater:
+    """Run meta-updates on a background thread fed by a bounded queue.
+
+    Window snapshots are submitted by the estimator and processed in order by
+    a single worker thread, so the caller of ``learn_one`` never waits for
+    meta-feature extraction or meta-learner updates.
+
+    Parameters
+    ----------
+    update: callable
+        Called by the worker with the submitted arguments.
+    max_pending: int (default=1)
+        Maximum number of snapshots waiting to be processed.
+    drop_policy: str (default='oldest')
+        What to do when the queue is full. ``oldest`` drops the stalest
+        pending snapshot, ``newest`` drops the snapshot being submitted and
+        ``block`` waits for the worker to free a slot.
+    """
+
+    def __init__(self, update, max_pending: int = 1, drop_policy: str = "oldest"):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(
+                f"Unknown drop_policy {drop_policy!r}, expected one of {DROP_POLICIES}"
+            )
+        self.update = update
+        self.max_pending = max_pending
+        self.drop_policy = drop_policy
+        self.n_submitted = 0
+        self.n_dropped = 0
+        self.n_completed = 0
+        self.n_failed = 0
+        self._queue = None
+        self._thread = None
+
+    def _start(self):
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            args = self._queue.get()
+            try:
+                if args is None:
+                    return
+                self.update(*args)
+                self.n_completed += 1
+            except Exception as e:
+                self.n_failed += 1
+                warnings.warn(f"Background meta-update failed: {e!r}", RuntimeWarning)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, *args) -> bool:
+        """Queue a snapshot, returns whether it was accepted."""
+        if self._thread is None:
+            self._start()
+        self.n_submitted += 1
+
+        if self.drop_policy == "block":
+            self._queue.put(args)
+            return True
+
+        while True:
+            try:
+                self._queue.put_nowait(args)
+                return True
+            except queue.Full:
+                if self.drop_policy == "newest":
+                    self.n_dropped += 1
+                    return False
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.n_dropped += 1
+            except queue.Empty:
+                pass
+
+    def join(self):
+        """Block until all the queued snapshots have been processed."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self.join()
+        self._queue.put(None)
+        self._thread.join()
+        self._queue = None
+        self._thread = None
+
+    def __getstate__(self):
+        self.join()
+        state = self.__dict__.copy()
+        state["_queue"] = None
+        state["_thread"] = None
+        return state
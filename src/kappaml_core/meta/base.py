@@ -1,15 +1,39 @@
-from collections import deque
+import warnings
 from copy import deepcopy
+from time import perf_counter
 from typing import List
 
 import numpy as np
-from pymfe.mfe import MFE
-from river.base import Classifier, Regressor
+import pandas as pd
+from river import stats
+from river.base import Classifier, Regressor, Transformer
 from river.metrics import MAE
 from river.metrics.base import Metric
 from river.model_selection.base import ModelSelector
 from river.tree import HoeffdingTreeClassifier
 
+from kappaml_core.meta.background import BackgroundMetaUpdater
+from kappaml_core.meta.cache import MetaFeatureCache
+from kappaml_core.meta.checkpoint import load_checkpoint, save_checkpoint
+from kappaml_core.meta.execution import make_executor
+from kappaml_core.meta.knowledge import KnowledgeBase
+from kappaml_core.meta.memory import MemoryBudget, deep_sizeof
+from kappaml_core.meta.metric_bank import make_metric_bank
+from kappaml_core.meta.preprocessing import (
+    preprocess_many,
+    preprocess_one,
+    transform_many,
+)
+from kappaml_core.meta.profiling import Profiler
+from kappaml_core.meta.pruning import SuccessiveHalvingPruner
+from kappaml_core.meta.scheduling import DriftScheduler
+from kappaml_core.meta.streaming_mfe import StreamingMFE
+from kappaml_core.meta.subsampling import WindowSubsampler
+from kappaml_core.meta.window import WindowBuffer
+
+MFE_BACKENDS = ["pymfe", "streaming"]
+META_UPDATE_MODES = ["sync", "async"]
+
 
 class MetaEstimator(ModelSelector):
     """Meta-estimator for model selection using meta-learning.
@@ -34,144 +58,820 @@ class MetaEstimator(ModelSelector):
     meta_update_frequency: int (default=50)
         How frequently to extract meta-features and update the meta-learner.
         Higher values mean less frequent updates but more stable meta-model.
+    mfe_backend: str (default='pymfe')
+        Meta-feature extraction backend. ``pymfe`` refits PyMFE on the whole
+        window at every meta-update. ``streaming`` uses
+        :class:`~kappaml_core.meta.streaming_mfe.StreamingMFE`, which maintains
+        the ``general`` and ``statistical`` groups incrementally. It covers
+        every ``general`` feature but ``num_to_cat``, and the ``statistical``
+        features but ``can_cor``, ``iq_range``, ``lh_trace``, ``mad``,
+        ``median``, ``nr_disc``, ``nr_norm``, ``nr_outliers``, ``p_trace``,
+        ``roy_root``, ``sd_ratio``, ``t_mean`` and ``w_lambda``, so a
+        knowledge base should only hold meta-features of one backend.
+    execution_backend: str (default='serial')
+        How the per-model predict/learn step of ``learn_one`` is executed.
+        ``thread`` and ``process`` fan it out to a pool of workers, each owning
+        a fixed subset of the models, with results identical to ``serial``.
+        With ``process``, the models are trained in the worker processes:
+        ``best_model`` is always up to date, but ``models`` is only refreshed
+        by ``close``, ``save`` and pickling. See
+        :mod:`kappaml_core.meta.execution`.
+    n_workers: int (default=None)
+        Number of workers of the ``thread`` and ``process`` backends, defaults
+        to the number of CPUs.
+    meta_update_mode: str (default='sync')
+        ``sync`` runs meta-updates inside ``learn_one``. ``async`` only
+        snapshots the window in ``learn_one`` and runs meta-feature extraction
+        and the meta-learner update on a background thread, switching the best
+        model atomically once done.
+    max_pending_updates: int (default=1)
+        Size of the queue of window snapshots waiting for the background
+        thread, used when ``meta_update_mode='async'``.
+    drop_policy: str (default='oldest')
+        What to do with a snapshot when the queue is full: ``oldest`` drops the
+        stalest pending snapshot, ``newest`` drops the incoming one and
+        ``block`` waits for a free slot.
+    eval_every: int (default=1)
+        Evaluate the models that are not currently selected on every
+        ``eval_every``-th sample only. Evaluations are staggered across models
+        so that each sample only pays for about ``1 / eval_every`` of the
+        predictions. The selected model is always evaluated. With values above
+        1, the standard error of each window metric is tracked and available
+        through :meth:`window_metric_std_errors`.
+    mfe_cache: MetaFeatureCache (default=None)
+        Cache of meta-features keyed by a fingerprint of the window, see
+        :class:`~kappaml_core.meta.cache.MetaFeatureCache`. Extraction is
+        skipped when the window has not materially changed.
+    profile: bool (default=False)
+        Record per-phase timers, call counts and latency histograms of the hot
+        path in :attr:`profiler`, a
+        :class:`~kappaml_core.meta.profiling.Profiler` that can be exported as
+        a dict or in Prometheus text format. The phases are ``window``,
+        ``models``, ``metrics``, ``meta_features``, ``meta_learner``,
+        ``learn_one`` and ``learn_many`` (end to end) and ``predict``. When disabled,
+        :attr:`profiler` is ``None`` and the overhead is a few attribute checks.
+    scheduler: DriftScheduler (default=None)
+        Trigger meta-updates from a drift detector on the error stream of the
+        selected model instead of every ``meta_update_frequency`` samples, see
+        :class:`~kappaml_core.meta.scheduling.DriftScheduler`.
+    mfe_subsampler: WindowSubsampler (default=None)
+        Compute the meta-features on a random projection, a hashed subset of
+        the features or a stratified subsample of the rows of the window, to
+        bound the extraction cost on wide streams, see
+        :class:`~kappaml_core.meta.subsampling.WindowSubsampler`. Only used by
+        the ``pymfe`` backend.
+    pruner: SuccessiveHalvingPruner (default=None)
+        Suspend the training of dominated models and revive them
+        periodically, see
+        :class:`~kappaml_core.meta.pruning.SuccessiveHalvingPruner`. The
+        meta-learner then only selects among the active models.
+    preprocessor: Transformer (default=None)
+        Preprocessing shared by all the base models, updated once per sample
+        instead of once per model, see :mod:`kappaml_core.meta.preprocessing`.
+        :func:`~kappaml_core.meta.preprocessing.split_shared_prefix` splits
+        the common prefix of a list of pipelines. Meta-features are extracted
+        from the raw features.
+    memory_budget: MemoryBudget (default=None)
+        Periodically measure the footprint of the window, the models, the
+        meta-learner, the metrics and the meta-feature extractor, see
+        :meth:`memory_footprint`, and evict the worst models or shrink the
+        window when it exceeds the budget, see
+        :class:`~kappaml_core.meta.memory.MemoryBudget`.
+    top_k: int (default=1)
+        Number of models blended at prediction time. With values above 1,
+        predictions are a weighted blend of the ``top_k`` models the
+        meta-learner deems most likely to be the best, weighted by the
+        probabilities of its ``predict_proba_one``. Regressors average the
+        predictions and classifiers the predicted probabilities.
+    min_weight: float (default=0.05)
+        Models whose probability is below ``min_weight`` are left out of the
+        blend, so that predicting costs about as many models as are likely to
+        be the best.
+    knowledge_base: KnowledgeBase (default=None)
+        Meta-knowledge base the meta-learner is pretrained on, and where the
+        pairs of meta-features and best model of each meta-update are
+        recorded, see :class:`~kappaml_core.meta.knowledge.KnowledgeBase`.
+        Until the first meta-update, the model most often the best in the
+        knowledge base is selected.
     """
 
     def __init__(
         self,
         models: List[Regressor | Classifier],
-        meta_learner: Classifier = HoeffdingTreeClassifier(),
+        meta_learner: Classifier = None,
         metric: Metric = MAE(),
         mfe_groups: list = ["general"],
         window_size: int = 200,
         meta_update_frequency: int = 50,
+        mfe_backend: str = "pymfe",
+        execution_backend: str = "serial",
+        n_workers: int = None,
+        meta_update_mode: str = "sync",
+        max_pending_updates: int = 1,
+        drop_policy: str = "oldest",
+        eval_every: int = 1,
+        mfe_cache: MetaFeatureCache = None,
+        profile: bool = False,
+        scheduler: DriftScheduler = None,
+        mfe_subsampler: WindowSubsampler = None,
+        pruner: SuccessiveHalvingPruner = None,
+        preprocessor: Transformer = None,
+        memory_budget: MemoryBudget = None,
+        top_k: int = 1,
+        min_weight: float = 0.05,
+        knowledge_base: KnowledgeBase = None,
     ):
         super().__init__(models, metric)
 
+        if mfe_backend not in MFE_BACKENDS:
+            raise ValueError(
+                f"Unknown mfe_backend {mfe_backend!r}, expected one of {MFE_BACKENDS}"
+            )
+        if meta_update_mode not in META_UPDATE_MODES:
+            raise ValueError(
+                f"Unknown meta_update_mode {meta_update_mode!r}, "
+                f"expected one of {META_UPDATE_MODES}"
+            )
+        if mfe_subsampler is not None and mfe_backend != "pymfe":
+            raise ValueError("mfe_subsampler is only supported by the pymfe backend")
+
+        # A fresh default per estimator, a default instance would be shared
+        if meta_learner is None:
+            meta_learner = HoeffdingTreeClassifier()
         self.meta_learner = meta_learner
 
         self.mfe_groups = mfe_groups
 
         self.window_size = window_size
         self.meta_update_frequency = meta_update_frequency
+        self.mfe_backend = mfe_backend
+        self.execution_backend = execution_backend
+        self.n_workers = n_workers
+        self.meta_update_mode = meta_update_mode
+        self.max_pending_updates = max_pending_updates
+        self.drop_policy = drop_policy
+        self.eval_every = eval_every
+        self.mfe_cache = mfe_cache
+        self.profile = profile
+        self.profiler = Profiler() if profile else None
+        self.scheduler = scheduler
+        self.mfe_subsampler = mfe_subsampler
+        self.pruner = pruner
+        if pruner is not None:
+            pruner.start(len(self), metric)
+        self.preprocessor = preprocessor
+        self.memory_budget = memory_budget
+        self.top_k = top_k
+        self.min_weight = min_weight
+        self.knowledge_base = knowledge_base
+
+        self._executor = make_executor(execution_backend, self.models, n_workers)
+        self._updater = BackgroundMetaUpdater(
+            self._run_meta_update, max_pending_updates, drop_policy
+        )
 
-        # Track performance of each model globally
-        self.metrics = [deepcopy(metric) for _ in range(len(self))]
+        # Track performance of each model globally, vectorized for the common
+        # metrics
+        self.metrics = make_metric_bank(metric, len(self))
 
-        self.mfe = MFE(groups=self.mfe_groups, suppress_warnings=True)
+        # Window of (x, y) pairs for meta-feature extraction, shrunk when
+        # over the memory budget
+        self.window = WindowBuffer(window_size)
 
-        # Window of (x, y) pairs for meta-feature extraction
-        self.window_data_x = deque(maxlen=window_size)
-        self.window_data_y = deque(maxlen=window_size)
+        self.mfe = self._make_mfe()
 
         # Track performance of each model on the current window
-        self.window_metrics = [deepcopy(metric) for _ in range(len(self))]
+        self.window_metrics = make_metric_bank(metric, len(self))
 
         # Counter to track samples for meta-update frequency
         self.sample_counter = 0
 
-        # Track the best model predicted by the meta-learner
-        self._best_model = models[0]
-
-    def _extract_meta_features(self):
-        """Extract meta-features from the current window."""
-        if len(self.window_data_x) < self.window_size:
-            return None
-
-        # Convert deque to appropriate format for PyMFE
-        X = np.array(
-            [
-                list(x.values()) if isinstance(x, dict) else list(x)
-                for x in self.window_data_x
-            ]
-        )
-        y = np.array(self.window_data_y)
-
+        # Index of the best model predicted by the meta-learner, and weight of
+        # each model blended at prediction time, see _best_index and _weights
+        self._selection = (0, {0: 1.0})
+
+        if knowledge_base is not None:
+            knowledge_base.attach(len(self))
+            knowledge_base.warm_start(self.meta_learner)
+            best_index = knowledge_base.most_frequent()
+            if best_index is not None:
+                self._selection = (best_index, {best_index: 1.0})
+
+        # Number of samples seen, used to stagger the evaluation of the models
+        self._n_seen = 0
+
+        # Pointwise scores of each model on the current window, to estimate the
+        # uncertainty of the window metrics when models are evaluated lazily
+        self._scratch_metrics = [deepcopy(metric) for _ in range(len(self))]
+        self.window_scores = [stats.Var() for _ in range(len(self))]
+
+    def _make_mfe(self):
+        if self.mfe_backend == "streaming":
+            return StreamingMFE(groups=self.mfe_groups, window_size=self.window.size)
+        # PyMFE pulls in scikit-learn and more, only import it when used
+        from pymfe.mfe import MFE
+
+        return MFE(groups=self.mfe_groups, suppress_warnings=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # PyMFE keeps references to the last fitted window, it is rebuilt
+        # when unpickling
+        if self.mfe_backend == "pymfe":
+            state["mfe"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.mfe is None:
+            self.mfe = self._make_mfe()
+
+    def save(self, path: str):
+        """Save a checkpoint of the estimator to the ``path`` directory.
+
+        The estimator is pickled with a compact layout of the window and of
+        the streaming meta-feature buffers, see
+        :mod:`kappaml_core.meta.checkpoint`.
+        """
+        save_checkpoint(self, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """Load a checkpoint saved with :meth:`save`.
+
+        Parameters
+        ----------
+        path: str
+            Directory of the checkpoint.
+        mmap: bool (default=True)
+            Whether to memory-map the window arrays rather than read them, see
+            :func:`~kappaml_core.meta.checkpoint.load_checkpoint`.
+        """
+        estimator = load_checkpoint(path, mmap=mmap)
+        if not isinstance(estimator, cls):
+            raise TypeError(
+                f"Checkpoint holds a {type(estimator).__name__}, not a {cls.__name__}"
+            )
+        return estimator
+
+    def _extract_meta_features(self, X=None, y=None):
+        """Extract meta-features from the current window, or a snapshot of it."""
+        if self.profiler is None:
+            return self._lookup_meta_features(X, y)
+        start = perf_counter()
+        meta_features = self._lookup_meta_features(X, y)
+        self.profiler.record("meta_features", start)
+        return meta_features
+
+    def _lookup_meta_features(self, X, y):
+        if X is None:
+            if not self.window.is_full:
+                return None
+            # Contiguous views of the window, no copy needed
+            X = self.window.X
+            y = self.window.y
+
+        if self.mfe_cache is None:
+            return self._compute_meta_features(X, y)
+
+        key = self.mfe_cache.key(X, y)
+        features_dict = self.mfe_cache.get(key)
+        if features_dict is None:
+            features_dict = self._compute_meta_features(X, y)
+            if features_dict:
+                self.mfe_cache.put(key, features_dict)
+        return features_dict
+
+    def _compute_meta_features(self, X, y):
+        if self.mfe_backend == "streaming":
+            names, values = self.mfe.extract()
+            return {k: v for k, v in zip(names, values) if not np.isnan(v)}
+
+        if self.mfe_subsampler is not None:
+            X, y = self.mfe_subsampler.transform(X, y)
+        self.mfe.fit(X, y, suppress_warnings=True)
+        meta_features = self.mfe.extract(suppress_warnings=True)
+        # Convert to dict for easier use with River
+        features_dict = {
+            name: value for name, value in zip(meta_features[0], meta_features[1])
+        }
+        # Remove nan values
+        return {k: v for k, v in features_dict.items() if not np.isnan(v)}
+
+    def _meta_update_features(self, X=None, y=None):
+        """Meta-features for a meta-update, None if the extraction failed."""
         try:
-            self.mfe.fit(X, y, suppress_warnings=True)
-            meta_features = self.mfe.extract(suppress_warnings=True)
-            # Convert to dict for easier use with River
-            features_dict = {
-                name: value for name, value in zip(meta_features[0], meta_features[1])
-            }
-            # Remove nan values
-            features_dict = {k: v for k, v in features_dict.items() if not np.isnan(v)}
-            return features_dict
+            return self._extract_meta_features(X, y)
         except Exception as e:
-            print(f"Error extracting meta-features: {e}")
+            warnings.warn(
+                f"Skipping a meta-update, meta-feature extraction failed: {e!r}",
+                RuntimeWarning,
+            )
             return None
 
-    def _get_best_window_model_index(self):
-        """Get the index of the best performing model on the current window."""
-        best_metric = self.window_metrics[0]
-        best_index = 0
-
-        for i, metric in enumerate(self.window_metrics):
-            if metric.is_better_than(best_metric):
-                best_metric = metric
-                best_index = i
+    def _active(self):
+        """Which models are trained, None for all."""
+        return None if self.pruner is None else self.pruner.active
 
-        return best_index, best_metric.get()
+    def _get_best_window_model_index(self):
+        """Get the index of the best active model on the current window."""
+        best_index = self.window_metrics.best(self._active())
+        return best_index, self.window_metrics[best_index].get()
 
     def _get_best_global_model_index(self):
         """Get the best global model."""
-        best_metric = self.metrics[0]
-        best_index = 0
+        best_index = self.metrics.best()
+        return best_index, self.metrics[best_index].get()
 
-        for i, metric in enumerate(self.metrics):
-            if metric.is_better_than(best_metric):
-                best_metric = metric
-                best_index = i
-
-        return best_index, best_metric.get()
+    def _evaluation_mask(self, t):
+        """Which models to evaluate on the ``t``-th sample, None for all."""
+        if self.eval_every <= 1:
+            return None
+        return [
+            i == self._best_index or (t + i) % self.eval_every == 0
+            for i in range(len(self))
+        ]
+
+    def _update_metrics(self, y, y_preds):
+        """Update the global and window metrics of each model."""
+        self.metrics.update(y, y_preds)
+        self.window_metrics.update(y, y_preds)
+        self._update_scores(y, y_preds)
+
+    def _update_scores(self, y, y_preds):
+        """Track pointwise scores, for lazy evaluation and the scheduler."""
+        if self.eval_every > 1:
+            for i, y_pred in enumerate(y_preds):
+                if y_pred is not None:
+                    self.window_scores[i].update(self._pointwise_score(i, y, y_pred))
+
+        # Feed the error stream of the selected model to the scheduler
+        if self.scheduler is not None:
+            best_index = self._best_index
+            y_pred = y_preds[best_index]
+            if y_pred is not None:
+                score = self._pointwise_score(best_index, y, y_pred)
+                self.scheduler.update(score)
+
+    def _pointwise_score(self, i, y, y_pred):
+        """Value of the metric of model ``i`` on a single sample."""
+        scratch = self._scratch_metrics[i]
+        scratch.update(y, y_pred)
+        score = scratch.get()
+        scratch.revert(y, y_pred)
+        return score
+
+    def window_metric_std_errors(self):
+        """Standard error of the window metric of each model.
+
+        This is estimated from the pointwise metric values of the samples on
+        which each model was evaluated, and is exact for metrics that are
+        averages of pointwise values such as MAE or accuracy. Only tracked when
+        ``eval_every`` is above 1.
+
+        Returns
+        -------
+        list of float
+            One standard error per model, ``nan`` when there are fewer than two
+            evaluations in the current window.
+        """
+        std_errors = []
+        for scores in self.window_scores:
+            n = scores.mean.n
+            std_errors.append(np.sqrt(scores.get() / n) if n > 1 else np.nan)
+        return std_errors
+
+    def _apply_meta_update(self, meta_features, best_model_idx):
+        """Train the meta-learner on a window and switch to its prediction."""
+        if self.profiler is not None:
+            start = perf_counter()
+
+        # Train meta-learner to predict the best model index
+        self.meta_learner.learn_one(meta_features, best_model_idx)
+        if self.knowledge_base is not None:
+            self.knowledge_base.add(meta_features, best_model_idx)
+
+        # Predict the best model using the meta-learner
+        predicted_model_idx = int(round(self.meta_learner.predict_one(meta_features)))
+        active = self._active()
+        if active is not None and not active[predicted_model_idx]:
+            predicted_model_idx = self._most_likely_active(
+                meta_features, best_model_idx
+            )
+
+        # Publish the best model and the blend in a single assignment, so that
+        # predictions made meanwhile by another thread see both or neither
+        weights = self._blend_weights(meta_features, predicted_model_idx)
+        self._selection = (predicted_model_idx, weights)
+
+        if self.profiler is not None:
+            self.profiler.record("meta_learner", start)
+
+    def _most_likely_active(self, meta_features, default):
+        """Active model the meta-learner deems most likely to be the best."""
+        active = self._active()
+        if hasattr(self.meta_learner, "predict_proba_one"):
+            proba = self.meta_learner.predict_proba_one(meta_features)
+            candidates = [i for i in proba if 0 <= i < len(self) and active[i]]
+            if candidates:
+                return max(candidates, key=proba.get)
+        return default
+
+    def _reselect_if_suspended(self):
+        """Drop the pruned models from the selected and blended ones."""
+        active = self.pruner.active
+        best_index, weights = self._selection
+        if active[best_index] and all(active[i] for i in weights):
+            return
+        weights = {i: w for i, w in weights.items() if active[i]}
+        if weights:
+            best_index = max(weights, key=weights.get)
+            total = sum(weights.values())
+            weights = {i: w / total for i, w in weights.items()}
+        else:
+            # Fall back to the best active model on the window
+            best_index, _ = self._get_best_window_model_index()
+            weights = {best_index: 1.0}
+        self._selection = (best_index, weights)
+
+    def _blend_weights(self, meta_features, best_index):
+        """Normalized probabilities of the most likely active models."""
+        if self.top_k <= 1 or not hasattr(self.meta_learner, "predict_proba_one"):
+            return {best_index: 1.0}
+        active = self._active()
+        proba = self.meta_learner.predict_proba_one(meta_features)
+        candidates = [
+            (p, i)
+            for i, p in proba.items()
+            if 0 <= i < len(self)
+            and (active is None or active[i])
+            and p >= self.min_weight
+        ]
+        top = sorted(candidates, reverse=True)[: self.top_k]
+        total = sum(p for p, _ in top)
+        if total <= 0:
+            return {best_index: 1.0}
+        return {i: p / total for p, i in top}
+
+    def _blend_one(self, x, weights):
+        """Blend the predictions of the weighted models on a sample."""
+        raise NotImplementedError
+
+    def _blend_many(self, X, weights):
+        return [self._blend_one(x, weights) for x in X.to_dict(orient="records")]
+
+    def _predict_one(self, x):
+        best_index, weights = self._selection
+        if len(weights) == 1:
+            return self._executor.predict_one(best_index, x)
+        return self._blend_one(x, weights)
+
+    def _run_meta_update(self, X, y, meta_features, best_model_idx):
+        """Meta-update on a window snapshot or its meta-features, in both modes.
+
+        Windows without meta-features, e.g. because the extraction failed, are
+        skipped and the next meta-update is scheduled as usual.
+        """
+        if meta_features is None:
+            meta_features = self._meta_update_features(X, y)
+        if meta_features:
+            self._apply_meta_update(meta_features, best_model_idx)
+
+    def _reset_window_state(self):
+        # Reset window metrics for next window
+        self.window_metrics.reset()
+        self.window_scores = [stats.Var() for _ in range(len(self))]
+
+        # Reset sample counter
+        self.sample_counter = 0
+        if self.scheduler is not None:
+            self.scheduler.reset()
+
+    def _samples_until_meta_update(self):
+        """Lower bound on the number of samples before a meta-update is due."""
+        if self.scheduler is not None:
+            n_until_due = self.scheduler.samples_until_due(self.sample_counter)
+        else:
+            n_until_due = self.meta_update_frequency - self.sample_counter
+        return max(n_until_due, self.window.size - len(self.window))
+
+    def _meta_update(self):
+        """Extract meta-features and update the meta-learner if it is due."""
+        if not self.window.is_full:
+            return
+        if self.scheduler is not None:
+            if not self.scheduler.is_due(self.sample_counter):
+                return
+        elif self.sample_counter < self.meta_update_frequency:
+            return
+
+        # Get the best model index for this window
+        best_model_idx, _ = self._get_best_window_model_index()
+
+        if self.meta_update_mode == "async":
+            # Snapshot the window, the streaming meta-features are cheap to get
+            if self.mfe_backend == "streaming":
+                snapshot = (None, None, self._meta_update_features() or {})
+            else:
+                snapshot = (self.window.X.copy(), self.window.y.copy(), None)
+            self._updater.submit(*snapshot, best_model_idx)
+        else:
+            self._run_meta_update(None, None, None, best_model_idx)
+
+        # Move on to the next window in both modes, even if the update failed
+        self._reset_window_state()
+
+    def memory_footprint(self):
+        """Estimated memory used by each component, in bytes.
+
+        Returns
+        -------
+        dict
+            The footprint of the ``window``, of each base model as a list under
+            ``models``, of the ``meta_learner``, of the ``metrics`` and of the
+            ``meta_features`` extractor, plus the ``preprocessor`` if any and
+            the ``total``.
+        """
+        footprint = {
+            "window": deep_sizeof(self.window),
+            "models": self._executor.model_sizes(),
+            "meta_learner": deep_sizeof(self.meta_learner),
+            "metrics": deep_sizeof(
+                [
+                    self.metrics,
+                    self.window_metrics,
+                    self.window_scores,
+                    self._scratch_metrics,
+                ]
+            ),
+            "meta_features": deep_sizeof(self.mfe),
+        }
+        if self.preprocessor is not None:
+            footprint["preprocessor"] = deep_sizeof(self.preprocessor)
+        footprint["total"] = sum(
+            sum(size) if isinstance(size, list) else size for size in footprint.values()
+        )
+        return footprint
+
+    def _enforce_memory_budget(self):
+        """Evict the worst models, then shrink the window, until within budget."""
+        budget = self.memory_budget
+        footprint = self.memory_footprint()
+        total = footprint["total"]
+        if total <= budget.max_bytes:
+            budget.footprint = footprint
+            return
+
+        # Suspended models first, then from the worst to the best, models not
+        # evaluated yet counting as the worst
+        active = self._active()
+        scores = self.metrics.get()
+        if self.metrics.bigger_is_better:
+            scores = -scores
+        scores = np.nan_to_num(scores, nan=np.inf)
+        order = sorted(
+            range(len(self)),
+            key=lambda i: (active is None or bool(active[i]), -scores[i]),
+        )
+        best_index, weights = self._selection
+        for i in order:
+            if total <= budget.max_bytes:
+                break
+            if i == best_index or i in weights:
+                continue
+            total -= footprint["models"][i] - self._reset_model(i)
+            budget.n_evicted += 1
+
+        while total > budget.max_bytes and self.window.size > budget.min_window_size:
+            before = deep_sizeof(self.window) + deep_sizeof(self.mfe)
+            self._resize_window(max(budget.min_window_size, self.window.size // 2))
+            total -= before - deep_sizeof(self.window) - deep_sizeof(self.mfe)
+            budget.n_window_shrinks += 1
+
+        budget.footprint = self.memory_footprint()
+
+    def _reset_model(self, i):
+        """Replace model ``i`` by an untrained clone, and forget its scores.
+
+        Returns the size of the clone in bytes.
+        """
+        size = self._executor.reset_model(i)
+        self.metrics.reset(i)
+        self.window_metrics.reset(i)
+        self.window_scores[i] = stats.Var()
+        if self.pruner is not None:
+            self.pruner.reset_model(i)
+        return size
+
+    def _resize_window(self, size):
+        self.window.resize(size)
+        if self.mfe_backend == "streaming":
+            # Rebuild the incremental statistics from the remaining samples
+            self.mfe = self._make_mfe()
+            for row, yi in zip(self.window.X, self.window.y):
+                self.mfe.update(row, yi)
 
     def learn_one(self, x, y):
+        profiler = self.profiler
+        if profiler is not None:
+            start = t = perf_counter()
+
         # Store data in window
-        self.window_data_x.append(x)
-        self.window_data_y.append(y)
+        self.window.append(x, y)
         self.sample_counter += 1
+        if self.mfe_backend == "streaming":
+            self.mfe.update(self.window.X[-1], y)
+
+        if profiler is not None:
+            t = profiler.record("window", t)
+
+        # Update all models, then their metrics in model order
+        evaluate = self._evaluation_mask(self._n_seen)
+        self._n_seen += 1
+        if self.preprocessor is None:
+            x_pred = x_learn = x
+        else:
+            x_pred, x_learn = preprocess_one(self.preprocessor, x, y)
+        y_preds = self._executor.learn_predict_one(
+            x_pred, y, evaluate, self._active(), x_learn
+        )
 
-        # Update all models and their metrics
-        for i, (model, metric) in enumerate(zip(self, self.metrics)):
-            y_pred = model.predict_one(x)
-            metric.update(y, y_pred)
-            model.learn_one(x, y)
-
-            # Update window metrics
-            self.window_metrics[i].update(y, y_pred)
+        if profiler is not None:
+            t = profiler.record("models", t)
 
-        # Only extract meta-features and update meta-learner periodically
-        if (
-            len(self.window_data_x) >= self.window_size
-            and self.sample_counter >= self.meta_update_frequency
-        ):
-            meta_features = self._extract_meta_features()
+        self._update_metrics(y, y_preds)
+        if self.pruner is not None:
+            self.pruner.update(y, y_preds)
+            self._reselect_if_suspended()
 
-            if meta_features:
-                # Get the best model index for this window
-                best_model_idx, _ = self._get_best_window_model_index()
+        if profiler is not None:
+            profiler.record("metrics", t)
 
-                # Train meta-learner to predict the best model index
-                self.meta_learner.learn_one(meta_features, best_model_idx)
+        # Only extract meta-features and update meta-learner periodically
+        self._meta_update()
 
-                # Predict the best model using the meta-learner
-                predicted_model_idx = int(
-                    round(self.meta_learner.predict_one(meta_features))
-                )
+        if self.memory_budget is not None and self.memory_budget.update():
+            self._enforce_memory_budget()
 
-                # Update the best model
-                self._best_model = self.models[predicted_model_idx]
+        if profiler is not None:
+            profiler.record("learn_one", start)
 
-                # Reset window metrics for next window
-                self.window_metrics = [deepcopy(self.metric) for _ in range(len(self))]
+        return self
 
-                # Reset sample counter
-                self.sample_counter = 0
+    def _as_frame(self, X, y=None):
+        """Convert a mini-batch given as NumPy arrays to pandas objects."""
+        if not isinstance(X, pd.DataFrame):
+            X = np.asarray(X)
+            columns = None
+            if self.window.columns is not None and len(self.window.columns) == (
+                X.shape[1]
+            ):
+                columns = list(self.window.columns)
+            X = pd.DataFrame(X, columns=columns)
+        if y is not None and not isinstance(y, pd.Series):
+            y = pd.Series(np.asarray(y), index=X.index)
+        return X, y
+
+    def learn_many(self, X, y):
+        """Update the estimator with a mini-batch.
+
+        The batch is split at the samples where ``learn_one`` would trigger a
+        meta-update, so the window and the meta-updates match a replay of the
+        batch with ``learn_one``. Within each chunk, base models with native
+        mini-batch methods predict the whole chunk before learning from it,
+        while the other models are replayed sample by sample.
+
+        Parameters
+        ----------
+        X: pd.DataFrame or np.ndarray
+            A batch of features.
+        y: pd.Series or np.ndarray
+            A batch of targets.
+        """
+        X, y = self._as_frame(X, y)
+
+        profiler = self.profiler
+        if profiler is not None:
+            begin = perf_counter()
+
+        start = 0
+        while start < len(X):
+            # Number of samples until the next meta-update may be due, or the
+            # active models may change
+            n = self._samples_until_meta_update()
+            if self.pruner is not None:
+                n = min(n, self.pruner.samples_until_change())
+            if self.memory_budget is not None:
+                n = min(n, self.memory_budget.samples_until_check())
+            n = max(1, n)
+            X_chunk, y_chunk = X.iloc[start : start + n], y.iloc[start : start + n]
+            start += len(X_chunk)
+
+            if profiler is not None:
+                t = perf_counter()
+
+            self.window.extend(X_chunk, y_chunk)
+            self.sample_counter += len(X_chunk)
+            if self.mfe_backend == "streaming":
+                rows = self.window.X[-len(X_chunk) :]
+                for row, yi in zip(rows, y_chunk.tolist()):
+                    self.mfe.update(row, yi)
+
+            if profiler is not None:
+                t = profiler.record("window", t)
+
+            evaluate = None
+            if self.eval_every > 1:
+                masks = [
+                    self._evaluation_mask(t)
+                    for t in range(self._n_seen, self._n_seen + len(X_chunk))
+                ]
+                evaluate = [list(flags) for flags in zip(*masks)]
+            self._n_seen += len(X_chunk)
+
+            if self.preprocessor is None:
+                X_pred = X_learn = X_chunk
+            else:
+                X_pred, X_learn = preprocess_many(self.preprocessor, X_chunk, y_chunk)
+            y_preds = self._executor.learn_predict_many(
+                X_pred, y_chunk, evaluate, self._active(), X_learn
+            )
+
+            if profiler is not None:
+                t = profiler.record("models", t)
+
+            y_list = y_chunk.tolist()
+            self.metrics.update_many(y_list, y_preds)
+            self.window_metrics.update_many(y_list, y_preds)
+            if self.eval_every > 1 or self.scheduler is not None:
+                for yi, y_preds_i in zip(y_list, zip(*y_preds)):
+                    self._update_scores(yi, y_preds_i)
+            if self.pruner is not None:
+                self.pruner.update_many(y_list, y_preds)
+                self._reselect_if_suspended()
+
+            if profiler is not None:
+                profiler.record("metrics", t)
+
+            self._meta_update()
+
+            budget = self.memory_budget
+            if budget is not None and budget.update(len(X_chunk)):
+                self._enforce_memory_budget()
+
+        if profiler is not None:
+            profiler.record("learn_many", begin)
 
         return self
 
     def predict_one(self, x):
-        return self._best_model.predict_one(x)
+        if self.preprocessor is not None:
+            x = self.preprocessor.transform_one(x)
+        if self.profiler is None:
+            return self._predict_one(x)
+        start = perf_counter()
+        y_pred = self._predict_one(x)
+        self.profiler.record("predict", start)
+        return y_pred
+
+    def predict_many(self, X):
+        """Predict a mini-batch with the current best model.
+
+        Parameters
+        ----------
+        X: pd.DataFrame or np.ndarray
+            A batch of features.
+
+        Returns
+        -------
+        pd.Series
+            The predictions, indexed like ``X``.
+        """
+        X, _ = self._as_frame(X)
+        if self.preprocessor is not None:
+            X = transform_many(self.preprocessor, X)
+        best_index, weights = self._selection
+        if len(weights) > 1:
+            return pd.Series(self._blend_many(X, weights), index=X.index)
+        return pd.Series(self._executor.predict_many(best_index, X), index=X.index)
+
+    def flush(self):
+        """Block until the pending background meta-updates are applied."""
+        self._updater.join()
+
+    def close(self):
+        """Release the background workers, if any."""
+        self._updater.close()
+        self._executor.close()
+
+    @property
+    def _best_index(self):
+        return self._selection[0]
+
+    @property
+    def _weights(self):
+        return self._selection[1]
 
     @property
     def best_model(self):
-        return self._best_model
+        return self._executor.fetch_models()[self._best_index]
@@ -0,0 +1,121 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+FINGERPRINTS = ["summary", "hash"]
+
+
+class MetaFeatureCache:
+    """LRU/TTL cache of meta-features keyed by a fingerprint of the window.
+
+    On stationary or repetitive streams consecutive windows yield nearly the
+    same meta-features. The cache skips extraction when the fingerprint of the
+    window matches a recent one.
+
+    Parameters
+    ----------
+    max_size: int (default=128)
+        Maximum number of entries, the least recently used entry is evicted
+        first.
+    ttl: float (default=None)
+        Time to live of an entry in seconds, entries never expire by default.
+    fingerprint: str (default='summary')
+        ``summary`` quantizes the per-feature mean and standard deviation of
+        the window and the target distribution, the mean and standard
+        deviation of float targets or the class frequencies of the others, so
+        that windows that have not materially changed share a key. ``hash``
+        hashes the raw window and only matches identical windows. Windows with
+        non-numeric features are always hashed.
+    digits: int (default=3)
+        Significant digits kept by the ``summary`` fingerprint. Fewer digits
+        mean more hits but coarser meta-features.
+
+    Attributes
+    ----------
+    hits: int
+        Number of lookups served from the cache.
+    misses: int
+        Number of lookups that required an extraction.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 128,
+        ttl: float = None,
+        fingerprint: str = "summary",
+        digits: int = 3,
+    ):
+        if fingerprint not in FINGERPRINTS:
+            raise ValueError(
+                f"Unknown fingerprint {fingerprint!r}, expected one of {FINGERPRINTS}"
+            )
+        self.max_size = max_size
+        self.ttl = ttl
+        self.fingerprint = fingerprint
+        self.digits = digits
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _quantize(self, values):
+        return tuple(float(f"{v:.{self.digits}g}") for v in values)
+
+    def key(self, X: np.ndarray, y: np.ndarray):
+        """Fingerprint of a window."""
+        if self.fingerprint == "hash" or X.dtype == object:
+            if X.dtype == object:
+                digest = hashlib.blake2b(repr(X.tolist()).encode(), digest_size=16)
+            else:
+                digest = hashlib.blake2b(
+                    np.ascontiguousarray(X).tobytes(), digest_size=16
+                )
+            if y.dtype == object:
+                digest.update(repr(y.tolist()).encode())
+            else:
+                digest.update(np.ascontiguousarray(y).tobytes())
+            return X.shape, digest.hexdigest()
+
+        # Integer targets are class labels, as in classification
+        if y.dtype.kind == "f":
+            y_summary = self._quantize([y.mean(), y.std()])
+        else:
+            classes, counts = np.unique(y.astype(str), return_counts=True)
+            y_summary = tuple(zip(classes, self._quantize(counts / len(y))))
+        return (
+            X.shape,
+            self._quantize(X.mean(axis=0)),
+            self._quantize(X.std(axis=0)),
+            y_summary,
+        )
+
+    def get(self, key):
+        """Cached meta-features for ``key``, or ``None``."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            created, meta_features = entry
+            if self.ttl is None or time.monotonic() - created <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(meta_features)
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, meta_features: dict):
+        self._entries[key] = (time.monotonic(), dict(meta_features))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
@@ -0,0 +1,157 @@
+"""Checkpoints of meta estimators for fast warm starts.
+
+A checkpoint is a directory holding:
+
+- ``manifest.json``: the format version and a description of the checkpoint.
+- ``state.pkl``: the pickled estimator (base models, meta-learner, metrics,
+  window, ...). The PyMFE extractor is not stored and is rebuilt on load.
+
+- ``window-*.npy``: the features and targets of the window, when numeric.
+
+Unlike a plain pickle of the estimator, the window is stored once in
+chronological order rather than as its mirrored ring buffer, and the sliding
+buffers of :class:`~kappaml_core.meta.streaming_mfe.StreamingMFE` are packed
+into arrays. Both are rebuilt when loading.
+
+The window arrays are memory-mapped when loading, so a warm start does not
+read them. They are copied into the ring buffer of the window when it is first
+written, that is by the first sample learned.
+"""
+
+import copyreg
+import json
+import os
+import pickle
+
+import numpy as np
+
+from kappaml_core import __version__
+from kappaml_core.meta.streaming_mfe import StreamingMFE
+from kappaml_core.meta.window import WindowBuffer
+
+CHECKPOINT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+STATE_FILE = "state.pkl"
+
+# Functions upgrading a checkpoint from a version to the next one, called with
+# the manifest and the loaded estimator
+MIGRATIONS = {}
+
+
+def _reduce_streaming_mfe(mfe):
+    return StreamingMFE._unpack, (mfe._pack(),)
+
+
+class _ArrayFile(str):
+    """Name of a ``.npy`` file of the checkpoint holding a window array."""
+
+
+class _Pickler(pickle.Pickler):
+    """Pickler storing the window and the streaming buffers compactly."""
+
+    def __init__(self, file, path):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = path
+        self.n_windows = 0
+        self.dispatch_table = {
+            **copyreg.dispatch_table,
+            WindowBuffer: self._reduce_window,
+            StreamingMFE: _reduce_streaming_mfe,
+        }
+
+    def _reduce_window(self, window):
+        state = window._pack()
+        # Object arrays can not be mapped and stay in the pickle
+        if window._X is not None and object not in (window._X.dtype, window._y.dtype):
+            for name in ["_X", "_y"]:
+                file = _ArrayFile(f"window-{self.n_windows}{name}.npy")
+                # Replace rather than overwrite the file, which may be mapped
+                # by the estimator being saved
+                tmp = os.path.join(self.path, f"{file}.tmp")
+                with open(tmp, "wb") as f:
+                    np.save(f, state[name])
+                os.replace(tmp, os.path.join(self.path, file))
+                state[name] = file
+            self.n_windows += 1
+        return WindowBuffer._unpack, (state,)
+
+    def persistent_id(self, obj):
+        return str(obj) if type(obj) is _ArrayFile else None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, path, mmap):
+        super().__init__(file)
+        self.path = path
+        self.mmap_mode = "r" if mmap else None
+
+    def persistent_load(self, pid):
+        return np.load(os.path.join(self.path, pid), mmap_mode=self.mmap_mode)
+
+
+def save_checkpoint(estimator, path: str):
+    """Save a meta estimator to the ``path`` directory.
+
+    Parameters
+    ----------
+    estimator: MetaEstimator
+        The estimator to save.
+    path: str
+        Directory of the checkpoint, created if needed.
+    """
+    os.makedirs(path, exist_ok=True)
+
+    # Make sure the models trained out of process are up to date
+    estimator.flush()
+    estimator._executor.fetch_models()
+
+    with open(os.path.join(path, STATE_FILE), "wb") as f:
+        _Pickler(f, path).dump(estimator)
+
+    manifest = {
+        "format_version": CHECKPOINT_VERSION,
+        "kappaml_core_version": __version__,
+        "estimator": f"{type(estimator).__module__}.{type(estimator).__qualname__}",
+        "n_models": len(estimator),
+        "window_size": estimator.window.size,
+        "window_samples": len(estimator.window),
+    }
+    with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_checkpoint(path: str, mmap: bool = True):
+    """Load a meta estimator saved with :func:`save_checkpoint`.
+
+    Parameters
+    ----------
+    path: str
+        Directory of the checkpoint.
+    mmap: bool (default=True)
+        Whether to memory-map the window arrays rather than read them. The
+        checkpoint must then be kept until the window is first written, i.e.
+        until the estimator learns a sample.
+
+    Returns
+    -------
+    MetaEstimator
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    version = manifest["format_version"]
+    if version > CHECKPOINT_VERSION:
+        raise ValueError(
+            f"Checkpoint format version {version} is newer than the supported "
+            f"version {CHECKPOINT_VERSION}, upgrade kappaml-core to load it"
+        )
+
+    with open(os.path.join(path, STATE_FILE), "rb") as f:
+        estimator = _Unpickler(f, path, mmap).load()
+
+    while version < CHECKPOINT_VERSION:
+        MIGRATIONS[version](manifest, estimator)
+        version += 1
+
+    return estimator
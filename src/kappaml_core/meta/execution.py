@@ -0,0 +1,433 @@
+import multiprocessing as mp
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+from river import base, compose
+
+from kappaml_core.meta.memory import deep_sizeof
+
+EXECUTION_BACKENDS = ["serial", "thread", "process"]
+
+
+def _partition(n_models: int, n_workers: int) -> List[List[int]]:
+    """Split model indices into contiguous, fixed subsets, one per worker."""
+    n_workers = max(1, min(n_workers, n_models))
+    return [list(chunk) for chunk in np.array_split(np.arange(n_models), n_workers)]
+
+
+def _subset(flags, subset):
+    return None if flags is None else [flags[i] for i in subset]
+
+
+def _learn_predict(models, x, y, evaluate=None, active=None, x_learn=None):
+    """Predict then learn on each model, returning the predictions.
+
+    Models whose ``evaluate`` flag is false are trained without predicting,
+    and their prediction is reported as ``None``. Models whose ``active`` flag
+    is false are suspended: neither evaluated nor trained. Models learn from
+    ``x_learn`` when given, e.g. features transformed by a shared preprocessor
+    after it learned from the sample.
+    """
+    if x_learn is None:
+        x_learn = x
+    y_preds = []
+    for i, model in enumerate(models):
+        if active is not None and not active[i]:
+            y_preds.append(None)
+            continue
+        if evaluate is None or evaluate[i]:
+            y_preds.append(model.predict_one(x))
+        else:
+            y_preds.append(None)
+        model.learn_one(x_learn, y)
+    return y_preds
+
+
+_MINI_BATCH_TYPES = (
+    base.MiniBatchClassifier,
+    base.MiniBatchRegressor,
+    base.MiniBatchTransformer,
+    base.MiniBatchSupervisedTransformer,
+)
+
+
+def supports_mini_batch(model) -> bool:
+    """Whether a model implements River's native mini-batch methods."""
+    if isinstance(model, compose.Pipeline):
+        return all(supports_mini_batch(step) for step in model.steps.values())
+    return isinstance(model, _MINI_BATCH_TYPES)
+
+
+def _learn_predict_many(models, X, y, evaluate=None, active=None, X_learn=None):
+    """Mini-batch counterpart of :func:`_learn_predict`.
+
+    Models with native mini-batch methods predict the whole batch, then learn
+    from it. The others are replayed sample by sample, which is exactly what
+    successive calls to ``learn_one`` would do. ``evaluate`` holds one flag
+    per model and sample, ``active`` one flag per model.
+    """
+    if X_learn is None:
+        X_learn = X
+    records = learn_records = None
+    y_preds = []
+    for i, model in enumerate(models):
+        if active is not None and not active[i]:
+            y_preds.append([None] * len(X))
+            continue
+        mask = None if evaluate is None else evaluate[i]
+        if supports_mini_batch(model):
+            y_pred = list(model.predict_many(X))
+            if mask is not None:
+                y_pred = [p if keep else None for p, keep in zip(y_pred, mask)]
+            y_preds.append(y_pred)
+            model.learn_many(X_learn, y)
+            continue
+        if records is None:
+            records = X.to_dict(orient="records")
+            learn_records = (
+                records if X_learn is X else X_learn.to_dict(orient="records")
+            )
+        y_preds.append(
+            _learn_predict_each(model, records, y.tolist(), mask, learn_records)
+        )
+    return y_preds
+
+
+def _learn_predict_each(model, records, ys, mask=None, learn_records=None):
+    if learn_records is None:
+        learn_records = records
+    y_preds = []
+    for j, (x, x_learn, y) in enumerate(zip(records, learn_records, ys)):
+        y_preds.append(model.predict_one(x) if mask is None or mask[j] else None)
+        model.learn_one(x_learn, y)
+    return y_preds
+
+
+def _predict_many(model, X):
+    if supports_mini_batch(model):
+        return list(model.predict_many(X))
+    return [model.predict_one(x) for x in X.to_dict(orient="records")]
+
+
+class SerialExecutor:
+    """Run the per-model predict/learn step sequentially in the caller.
+
+    Parameters
+    ----------
+    models: list of Estimator
+        The base models, owned by the calling estimator.
+    """
+
+    def __init__(self, models):
+        self.models = models
+
+    def learn_predict_one(self, x, y, evaluate=None, active=None, x_learn=None):
+        """Predict on ``x`` with every model, then train it on ``(x, y)``.
+
+        Parameters
+        ----------
+        evaluate: list of bool (default=None)
+            Which models to predict with, all of them by default.
+        active: list of bool (default=None)
+            Which models to predict with and train, all of them by default.
+        x_learn: dict (default=None)
+            Features to train on instead of ``x``.
+
+        Returns
+        -------
+        list
+            The prediction of each model made before learning, in model order,
+            ``None`` for the models that were not evaluated.
+        """
+        return _learn_predict(self.models, x, y, evaluate, active, x_learn)
+
+    def learn_predict_many(self, X, y, evaluate=None, active=None, X_learn=None):
+        """Mini-batch version of :meth:`learn_predict_one`.
+
+        Returns
+        -------
+        list of list
+            The predictions of each model for the batch, in model order.
+        """
+        return _learn_predict_many(self.models, X, y, evaluate, active, X_learn)
+
+    def predict_one(self, index: int, x):
+        return self.models[index].predict_one(x)
+
+    def predict_many(self, index: int, X):
+        return _predict_many(self.models[index], X)
+
+    def predict_proba_one(self, index: int, x):
+        return self.models[index].predict_proba_one(x)
+
+    def model_sizes(self):
+        """Estimated memory used by each model, in bytes."""
+        return [deep_sizeof(model) for model in self.models]
+
+    def reset_model(self, index: int) -> int:
+        """Replace a model by an untrained clone, and return its size in bytes."""
+        self.models[index] = self.models[index].clone()
+        return deep_sizeof(self.models[index])
+
+    def fetch_models(self):
+        """Return the up-to-date base models."""
+        return self.models
+
+    def close(self):
+        pass
+
+
+class ThreadExecutor(SerialExecutor):
+    """Fan the per-model step out to a thread pool.
+
+    Each worker owns a fixed, contiguous subset of the models and always
+    processes them in the same order, so results are identical to serial mode.
+    Threads share the models with the caller, and pay off when the models
+    release the GIL (e.g. NumPy or compiled code).
+
+    Parameters
+    ----------
+    models: list of Estimator
+        The base models, owned by the calling estimator.
+    n_workers: int (default=None)
+        Number of threads, defaults to the number of CPUs.
+    """
+
+    def __init__(self, models, n_workers: int = None):
+        super().__init__(models)
+        self.n_workers = n_workers or mp.cpu_count()
+        self.partitions = _partition(len(models), self.n_workers)
+        self._pool = None
+
+    def _map(self, func, x, y, evaluate, active, x_learn):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=len(self.partitions))
+        futures = [
+            self._pool.submit(
+                func,
+                [self.models[i] for i in subset],
+                x,
+                y,
+                _subset(evaluate, subset),
+                _subset(active, subset),
+                x_learn,
+            )
+            for subset in self.partitions
+        ]
+        return [y_pred for future in futures for y_pred in future.result()]
+
+    def learn_predict_one(self, x, y, evaluate=None, active=None, x_learn=None):
+        return self._map(_learn_predict, x, y, evaluate, active, x_learn)
+
+    def learn_predict_many(self, X, y, evaluate=None, active=None, X_learn=None):
+        return self._map(_learn_predict_many, X, y, evaluate, active, X_learn)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+
+class _WorkerError:
+    """Exception raised by a command in a worker, sent back to the caller."""
+
+    def __init__(self, exc):
+        self.exc = exc
+        self.traceback = "".join(
+            traceback.format_exception(type(exc), exc, exc.__traceback__)
+        )
+
+
+def _result(reply):
+    """Return the reply of a worker, or raise the exception it sent back."""
+    if isinstance(reply, _WorkerError):
+        raise reply.exc from RuntimeError(
+            f"Raised in a worker process:\n{reply.traceback}"
+        )
+    return reply
+
+
+def _run_command(models, command, payload):
+    if command == "learn_predict":
+        return _learn_predict(models, *payload)
+    if command == "learn_predict_many":
+        return _learn_predict_many(models, *payload)
+    if command == "predict":
+        index, x = payload
+        return models[index].predict_one(x)
+    if command == "predict_proba":
+        index, x = payload
+        return models[index].predict_proba_one(x)
+    if command == "predict_many":
+        index, X = payload
+        return _predict_many(models[index], X)
+    if command == "sizes":
+        return [deep_sizeof(model) for model in models]
+    if command == "reset":
+        index, _ = payload
+        models[index] = models[index].clone()
+        return deep_sizeof(models[index])
+    if command == "fetch":
+        return models
+    raise ValueError(f"Unknown command {command!r}")
+
+
+def _process_worker(conn, models):
+    """Serve commands for the subset of models owned by this process.
+
+    An exception raised by a command is sent back, to be raised again by the
+    caller, and the worker keeps serving commands.
+    """
+    while True:
+        command, payload = conn.recv()
+        if command == "close":
+            conn.close()
+            break
+        try:
+            reply = _run_command(models, command, payload)
+        except Exception as exc:
+            reply = _WorkerError(exc)
+        try:
+            conn.send(reply)
+        except Exception as exc:
+            # E.g. a reply that can not be pickled
+            conn.send(_WorkerError(RuntimeError(repr(exc))))
+
+
+class ProcessExecutor(SerialExecutor):
+    """Fan the per-model step out to a persistent pool of processes.
+
+    Each process is started once and owns a fixed subset of the models for
+    its whole lifetime, only samples and predictions cross process
+    boundaries. This sidesteps the GIL but adds inter-process communication
+    to every sample, so it pays off for expensive models. While the pool is
+    running, the caller's copies of the models are stale and
+    :meth:`fetch_models` must be used to retrieve them. An exception raised
+    by a model in a worker is raised again in the caller.
+
+    Parameters
+    ----------
+    models: list of Estimator
+        The base models, owned by the calling estimator.
+    n_workers: int (default=None)
+        Number of processes, defaults to the number of CPUs.
+    """
+
+    def __init__(self, models, n_workers: int = None):
+        super().__init__(models)
+        self.n_workers = n_workers or mp.cpu_count()
+        self.partitions = _partition(len(models), self.n_workers)
+        self._workers = None
+
+    def _start(self):
+        self._workers = []
+        for subset in self.partitions:
+            parent, child = mp.Pipe()
+            process = mp.Process(
+                target=_process_worker,
+                args=(child, [self.models[i] for i in subset]),
+                daemon=True,
+            )
+            process.start()
+            child.close()
+            self._workers.append((parent, process))
+
+    def _broadcast(self, command, x, y, evaluate, active, x_learn):
+        if self._workers is None:
+            self._start()
+        for (conn, _), subset in zip(self._workers, self.partitions):
+            payload = (
+                x,
+                y,
+                _subset(evaluate, subset),
+                _subset(active, subset),
+                x_learn,
+            )
+            conn.send((command, payload))
+        # Read every reply before raising, so that no reply is left pending
+        replies = [conn.recv() for conn, _ in self._workers]
+        return [y_pred for reply in replies for y_pred in _result(reply)]
+
+    def learn_predict_one(self, x, y, evaluate=None, active=None, x_learn=None):
+        return self._broadcast("learn_predict", x, y, evaluate, active, x_learn)
+
+    def learn_predict_many(self, X, y, evaluate=None, active=None, X_learn=None):
+        return self._broadcast("learn_predict_many", X, y, evaluate, active, X_learn)
+
+    def _route(self, command, index, payload):
+        for (conn, _), subset in zip(self._workers, self.partitions):
+            if index in subset:
+                conn.send((command, (subset.index(index), payload)))
+                return _result(conn.recv())
+
+    def predict_one(self, index: int, x):
+        if self._workers is None:
+            return self.models[index].predict_one(x)
+        return self._route("predict", index, x)
+
+    def predict_many(self, index: int, X):
+        if self._workers is None:
+            return _predict_many(self.models[index], X)
+        return self._route("predict_many", index, X)
+
+    def predict_proba_one(self, index: int, x):
+        if self._workers is None:
+            return self.models[index].predict_proba_one(x)
+        return self._route("predict_proba", index, x)
+
+    def model_sizes(self):
+        if self._workers is None:
+            return super().model_sizes()
+        sizes = []
+        for conn, _ in self._workers:
+            conn.send(("sizes", None))
+            sizes.extend(_result(conn.recv()))
+        return sizes
+
+    def reset_model(self, index: int) -> int:
+        if self._workers is None:
+            return super().reset_model(index)
+        return self._route("reset", index, None)
+
+    def fetch_models(self):
+        if self._workers is not None:
+            for (conn, _), subset in zip(self._workers, self.partitions):
+                conn.send(("fetch", None))
+                for i, model in zip(subset, _result(conn.recv())):
+                    self.models[i] = model
+        return self.models
+
+    def close(self):
+        if self._workers is None:
+            return
+        self.fetch_models()
+        for conn, process in self._workers:
+            conn.send(("close", None))
+            process.join()
+            conn.close()
+        self._workers = None
+
+    def __getstate__(self):
+        self.fetch_models()
+        state = self.__dict__.copy()
+        state["_workers"] = None
+        return state
+
+
+def make_executor(backend: str, models, n_workers: int = None):
+    if backend == "serial":
+        return SerialExecutor(models)
+    if backend == "thread":
+        return ThreadExecutor(models, n_workers)
+    if backend == "process":
+        return ProcessExecutor(models, n_workers)
+    raise ValueError(
+        f"Unknown execution_backend {backend!r}, expected one of {EXECUTION_BACKENDS}"
+    )
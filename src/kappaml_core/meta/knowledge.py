@@ -0,0 +1,190 @@
+"""Offline meta-knowledge base to warm-start meta-learners.
+
+A meta estimator given a :class:`KnowledgeBase` records the meta-features of
+each window with the index of the best model on it, the pairs its
+meta-learner is trained on. Saved to disk, the pairs of past streams
+pretrain the meta-learner of new estimators with the same pool of models, so
+that they do not start from an untrained meta-learner.
+
+On disk, a knowledge base is a directory holding:
+
+- ``index.json``: the format version, the number of models, the names of the
+  meta-features and the names of the sources, i.e. of the recorded streams.
+- ``meta_features.npy``: one row per pair and one column per meta-feature,
+  NaN for the meta-features missing from a pair. NaN meta-features, e.g. the
+  correlations of a constant feature, are dropped when recorded, so that a
+  pair is the same before saving and once loaded.
+- ``best_models.npy`` and ``sources.npy``: the index of the best model and the
+  source of each pair.
+"""
+
+import json
+import os
+from collections import Counter
+
+import numpy as np
+
+KNOWLEDGE_BASE_VERSION = 1
+
+INDEX_FILE = "index.json"
+
+
+class KnowledgeBase:
+    """Recorded (meta-features, best model) pairs of past streams.
+
+    The knowledge base is part of the estimator, and of its checkpoints. To
+    bound its size on long streams, ``max_records`` keeps a uniform sample of
+    the pairs recorded so far with reservoir sampling, so that older streams
+    stay represented.
+
+    Parameters
+    ----------
+    source: str (default='default')
+        Name of the stream the pairs recorded from now on come from. Pairs can
+        be selected by source when warm-starting.
+    max_records: int (default=None)
+        Maximum number of pairs kept, unbounded by default.
+    seed: int (default=42)
+        Seed of the reservoir sampling.
+    """
+
+    def __init__(
+        self, source: str = "default", max_records: int = None, seed: int = 42
+    ):
+        self.source = source
+        self.max_records = max_records
+        self.seed = seed
+        self.n_models = None
+        self.n_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._meta_features = []
+        self._best_models = []
+        self._sources = []
+
+    def __len__(self):
+        return len(self._best_models)
+
+    @property
+    def sources(self):
+        """Names of the recorded sources, in order of appearance."""
+        return list(dict.fromkeys(self._sources))
+
+    def attach(self, n_models: int):
+        """Check that an estimator with ``n_models`` models can use the pairs."""
+        if self.n_models is not None and self.n_models != n_models:
+            raise ValueError(
+                f"Knowledge base recorded with {self.n_models} models, "
+                f"the estimator has {n_models}"
+            )
+        self.n_models = n_models
+
+    def add(self, meta_features: dict, best_index: int, source: str = None):
+        """Record the meta-features of a window and the best model on it."""
+        # NaN values are not stored, as on disk
+        meta_features = {k: v for k, v in meta_features.items() if v == v}
+        source = self.source if source is None else source
+        self.n_seen += 1
+        if self.max_records is None or len(self) < self.max_records:
+            self._meta_features.append(meta_features)
+            self._best_models.append(int(best_index))
+            self._sources.append(source)
+            return
+        # Replace a pair with probability max_records / n_seen
+        i = int(self._rng.integers(self.n_seen))
+        if i < self.max_records:
+            self._meta_features[i] = meta_features
+            self._best_models[i] = int(best_index)
+            self._sources[i] = source
+
+    def records(self, sources=None):
+        """Iterate over the pairs, optionally of some sources only.
+
+        Yields
+        ------
+        tuple
+            The meta-features and the index of the best model.
+        """
+        for meta_features, best_index, source in zip(
+            self._meta_features, self._best_models, self._sources
+        ):
+            if sources is None or source in sources:
+                yield meta_features, best_index
+
+    def most_frequent(self, sources=None):
+        """Index of the model that was most often the best, None if empty."""
+        counts = Counter(best_index for _, best_index in self.records(sources))
+        return counts.most_common(1)[0][0] if counts else None
+
+    def warm_start(self, meta_learner, sources=None) -> int:
+        """Train a meta-learner on the pairs, returning how many were used."""
+        n = 0
+        for meta_features, best_index in self.records(sources):
+            meta_learner.learn_one(meta_features, best_index)
+            n += 1
+        return n
+
+    def save(self, path: str):
+        """Save the knowledge base to the ``path`` directory."""
+        os.makedirs(path, exist_ok=True)
+        names = list(dict.fromkeys(k for mf in self._meta_features for k in mf))
+        columns = {name: j for j, name in enumerate(names)}
+        meta_features = np.full((len(self), len(names)), np.nan)
+        for i, mf in enumerate(self._meta_features):
+            for name, value in mf.items():
+                meta_features[i, columns[name]] = value
+        sources = self.sources
+        codes = {source: i for i, source in enumerate(sources)}
+
+        np.save(os.path.join(path, "meta_features.npy"), meta_features)
+        np.save(
+            os.path.join(path, "best_models.npy"),
+            np.array(self._best_models, dtype=np.int32),
+        )
+        np.save(
+            os.path.join(path, "sources.npy"),
+            np.array([codes[s] for s in self._sources], dtype=np.int32),
+        )
+        index = {
+            "format_version": KNOWLEDGE_BASE_VERSION,
+            "n_models": self.n_models,
+            "n_records": len(self),
+            "meta_features": names,
+            "sources": sources,
+        }
+        with open(os.path.join(path, INDEX_FILE), "w") as f:
+            json.dump(index, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, source: str = "default", max_records: int = None):
+        """Load a knowledge base saved with :meth:`save`.
+
+        Parameters
+        ----------
+        path: str
+            Directory of the knowledge base.
+        source: str (default='default')
+            Name of the stream the pairs recorded from now on come from.
+        max_records: int (default=None)
+            Maximum number of pairs kept, see :class:`KnowledgeBase`.
+        """
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        version = index["format_version"]
+        if version > KNOWLEDGE_BASE_VERSION:
+            raise ValueError(
+                f"Knowledge base format version {version} is newer than the "
+                f"supported version {KNOWLEDGE_BASE_VERSION}, upgrade "
+                "kappaml-core to load it"
+            )
+
+        knowledge_base = cls(source, max_records=max_records)
+        knowledge_base.n_models = index["n_models"]
+        names = index["meta_features"]
+        meta_features = np.load(os.path.join(path, "meta_features.npy"))
+        best_models = np.load(os.path.join(path, "best_models.npy"))
+        sources = np.load(os.path.join(path, "sources.npy"))
+        for row, best_index, code in zip(meta_features, best_models, sources):
+            knowledge_base.add(
+                dict(zip(names, row.tolist())), best_index, index["sources"][code]
+            )
+        return knowledge_base
@@ -0,0 +1,90 @@
+import gc
+import sys
+import types
+
+import numpy as np
+
+
+def deep_sizeof(obj, exclude=()) -> int:
+    """Estimate the memory used by an object and everything it references.
+
+    Walks the object graph with :func:`gc.get_referents`, as River's
+    ``_raw_memory_usage`` does, counting the data buffers of NumPy arrays
+    that own them. Classes, modules and functions are not followed, nor are
+    the objects in ``exclude``, e.g. objects shared with other estimators.
+    """
+    # Walking into these would drag in the whole interpreter
+    blacklist = (type, types.ModuleType, types.FunctionType)
+    seen = {id(o) for o in exclude}
+    size = 0
+    pending = [obj]
+    while pending:
+        obj = pending.pop()
+        if isinstance(obj, blacklist) or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, np.ndarray) and obj.base is None:
+            # getsizeof already includes the buffer of owning arrays
+            continue
+        pending.extend(gc.get_referents(obj))
+    return size
+
+
+class MemoryBudget:
+    """Bound the memory used by a meta estimator.
+
+    Every ``check_every`` samples, the meta estimator measures the footprint
+    of its components with :func:`deep_sizeof`: the window, each base model,
+    the meta-learner, the metrics and the meta-feature extractor. If the total
+    is above ``max_bytes``, the worst base models are evicted, i.e. replaced
+    by untrained clones, starting with the models suspended by a pruner and
+    never evicting the selected or blended models. If that is not enough, the
+    window is halved, down to ``min_window_size`` samples. Meta-features of a
+    smaller window are noisier, so ``max_bytes`` should leave room for the
+    window. The budget may still be exceeded when the selected models alone
+    outgrow it.
+
+    Measuring walks the whole object graph, which takes time proportional to
+    the size of the models, hence the check period.
+
+    Parameters
+    ----------
+    max_bytes: int
+        The memory budget, in bytes.
+    check_every: int (default=1000)
+        Number of samples between two checks of the footprint.
+    min_window_size: int (default=50)
+        The window is never shrunk below this size.
+
+    Attributes
+    ----------
+    footprint: dict
+        Footprint of each component at the last check, in bytes.
+    n_evicted: int
+        Number of base models evicted.
+    n_window_shrinks: int
+        Number of times the window was halved.
+    """
+
+    def __init__(
+        self, max_bytes: int, check_every: int = 1000, min_window_size: int = 50
+    ):
+        self.max_bytes = max_bytes
+        self.check_every = check_every
+        self.min_window_size = min_window_size
+        self.footprint = None
+        self.n_evicted = 0
+        self.n_window_shrinks = 0
+        self._since_check = 0
+
+    def samples_until_check(self) -> int:
+        return self.check_every - self._since_check
+
+    def update(self, n: int = 1) -> bool:
+        """Count ``n`` samples and return whether a check is due."""
+        self._since_check += n
+        if self._since_check < self.check_every:
+            return False
+        self._since_check = 0
+        return True
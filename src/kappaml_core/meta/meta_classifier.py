@@ -1,11 +1,17 @@
+from collections import defaultdict
 from typing import List
 
-from river.base import Classifier
+from river.base import Classifier, Transformer
 from river.metrics import Accuracy
 from river.model_selection.base import ModelSelectionClassifier
-from river.tree import HoeffdingTreeClassifier
 
 from kappaml_core.meta.base import MetaEstimator
+from kappaml_core.meta.cache import MetaFeatureCache
+from kappaml_core.meta.knowledge import KnowledgeBase
+from kappaml_core.meta.memory import MemoryBudget
+from kappaml_core.meta.pruning import SuccessiveHalvingPruner
+from kappaml_core.meta.scheduling import DriftScheduler
+from kappaml_core.meta.subsampling import WindowSubsampler
 
 
 class MetaClassifier(MetaEstimator, ModelSelectionClassifier):
@@ -32,17 +38,118 @@ class MetaClassifier(MetaEstimator, ModelSelectionClassifier):
     meta_update_frequency: int (default=50)
         How frequently to extract meta-features and update the meta-learner.
         Higher values mean less frequent updates but more stable meta-model.
+    mfe_backend: str (default='pymfe')
+        Meta-feature extraction backend, either ``pymfe`` or the incremental
+        ``streaming`` extractor.
+    execution_backend: str (default='serial')
+        Execution of the per-model step, one of ``serial``, ``thread`` or
+        ``process``.
+    n_workers: int (default=None)
+        Number of workers of the parallel execution backends.
+    meta_update_mode: str (default='sync')
+        Run meta-updates inline (``sync``) or on a background thread
+        (``async``).
+    max_pending_updates: int (default=1)
+        Size of the queue of window snapshots in ``async`` mode.
+    drop_policy: str (default='oldest')
+        Policy when the snapshot queue is full, one of ``oldest``, ``newest``
+        or ``block``.
+    eval_every: int (default=1)
+        Evaluate the models that are not selected on every ``eval_every``-th
+        sample only, staggered across models.
+    mfe_cache: MetaFeatureCache (default=None)
+        Cache of meta-features keyed by a fingerprint of the window.
+    profile: bool (default=False)
+        Record per-phase timings of the hot path in ``profiler``.
+    scheduler: DriftScheduler (default=None)
+        Trigger meta-updates on drift of the selected model's errors instead of
+        every ``meta_update_frequency`` samples.
+    mfe_subsampler: WindowSubsampler (default=None)
+        Extract PyMFE meta-features on a random projection, a hashed feature
+        subset or a stratified row subsample of the window.
+    pruner: SuccessiveHalvingPruner (default=None)
+        Suspend the training of dominated models, reviving them periodically.
+    preprocessor: Transformer (default=None)
+        Preprocessing shared by all the base models, updated once per sample.
+    memory_budget: MemoryBudget (default=None)
+        Evict the worst models or shrink the window to stay within a budget.
+    top_k: int (default=1)
+        Number of models blended at prediction time, weighted by the
+        probabilities of the meta-learner.
+    min_weight: float (default=0.05)
+        Models with a smaller probability are left out of the blend.
+    knowledge_base: KnowledgeBase (default=None)
+        Recorded meta-knowledge to pretrain the meta-learner on, extended with
+        the meta-updates of this estimator.
     """
 
     def __init__(
         self,
         models: List[Classifier],
-        meta_learner: Classifier = HoeffdingTreeClassifier(),
+        meta_learner: Classifier = None,
         metric=Accuracy(),
         mfe_groups: list = ["general"],
         window_size: int = 200,
         meta_update_frequency: int = 50,
+        mfe_backend: str = "pymfe",
+        execution_backend: str = "serial",
+        n_workers: int = None,
+        meta_update_mode: str = "sync",
+        max_pending_updates: int = 1,
+        drop_policy: str = "oldest",
+        eval_every: int = 1,
+        mfe_cache: MetaFeatureCache = None,
+        profile: bool = False,
+        scheduler: DriftScheduler = None,
+        mfe_subsampler: WindowSubsampler = None,
+        pruner: SuccessiveHalvingPruner = None,
+        preprocessor: Transformer = None,
+        memory_budget: MemoryBudget = None,
+        top_k: int = 1,
+        min_weight: float = 0.05,
+        knowledge_base: KnowledgeBase = None,
     ):
         super().__init__(
-            models, meta_learner, metric, mfe_groups, window_size, meta_update_frequency
+            models,
+            meta_learner,
+            metric,
+            mfe_groups,
+            window_size,
+            meta_update_frequency,
+            mfe_backend,
+            execution_backend,
+            n_workers,
+            meta_update_mode,
+            max_pending_updates,
+            drop_policy,
+            eval_every,
+            mfe_cache,
+            profile,
+            scheduler,
+            mfe_subsampler,
+            pruner,
+            preprocessor,
+            memory_budget,
+            top_k,
+            min_weight,
+            knowledge_base,
         )
+
+    def predict_proba_one(self, x):
+        if self.preprocessor is not None:
+            x = self.preprocessor.transform_one(x)
+        best_index, weights = self._selection
+        if len(weights) == 1:
+            return self._executor.predict_proba_one(best_index, x)
+        return self._blend_proba_one(x, weights)
+
+    def _blend_proba_one(self, x, weights):
+        proba = defaultdict(float)
+        for i, w in weights.items():
+            for label, p in self._executor.predict_proba_one(i, x).items():
+                proba[label] += w * p
+        return dict(proba)
+
+    def _blend_one(self, x, weights):
+        proba = self._blend_proba_one(x, weights)
+        return max(proba, key=proba.get) if proba else None
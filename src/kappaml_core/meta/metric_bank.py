@@ -0,0 +1,320 @@
+"""Metrics of all the base models of a meta estimator, updated at once.
+
+:func:`make_metric_bank` returns a :class:`MetricBank` holding the state of
+every model in NumPy arrays for MAE, RMSE, Accuracy and binary F1, and a
+:class:`RiverMetricBank` wrapping one River metric per model otherwise. Both
+share the same interface, and indexing or iterating over a bank yields River
+metrics: the metric of a model for a ``RiverMetricBank``, and a view that
+reads and updates one model of the arrays for a ``MetricBank``.
+
+The value of a model that has not been evaluated yet is NaN, and such models
+are never picked as the best one, unless no model was evaluated.
+"""
+
+from copy import deepcopy
+
+import numpy as np
+from river import metrics
+
+SUPPORTED_METRICS = {
+    metrics.MAE: "mae",
+    metrics.RMSE: "rmse",
+    metrics.Accuracy: "accuracy",
+    metrics.F1: "f1",
+}
+
+
+def make_metric_bank(metric, n_models: int):
+    """Vectorized bank for the supported metrics, River metrics otherwise.
+
+    Parameters
+    ----------
+    metric: Metric
+        The metric of each model, only its type and parameters are used.
+    n_models: int
+        Number of models.
+    """
+    if type(metric) in SUPPORTED_METRICS:
+        return MetricBank(metric, n_models)
+    return RiverMetricBank(metric, n_models)
+
+
+def _best(values, candidates, bigger_is_better):
+    """Best of the ``candidates`` with a value, the first one if none has."""
+    candidates = np.asarray(candidates)
+    values = np.asarray(values, dtype=float)[candidates]
+    if np.isnan(values).all():
+        return int(candidates[0])
+    best = np.nanargmax(values) if bigger_is_better else np.nanargmin(values)
+    return int(candidates[best])
+
+
+class _MetricView(metrics.base.Metric):
+    """The metric of one model of a :class:`MetricBank`, as a River metric."""
+
+    def __init__(self, bank, index):
+        self.bank = bank
+        self.index = index
+
+    @property
+    def bigger_is_better(self):
+        return self.bank.bigger_is_better
+
+    def works_with(self, model) -> bool:
+        return self.bank.metric.works_with(model)
+
+    def update(self, y_true, y_pred):
+        self.bank._update_model(self.index, y_true, y_pred, 1)
+
+    def revert(self, y_true, y_pred):
+        self.bank._update_model(self.index, y_true, y_pred, -1)
+
+    def get(self):
+        return float(self.bank.get()[self.index])
+
+    def __repr__(self):
+        metric = self.bank.metric
+        return f"{type(metric).__name__}: {self.get():{metric._fmt}}".rstrip("0")
+
+
+class MetricBank:
+    """State of a metric for every model, in NumPy arrays.
+
+    Regression metrics keep a running sum of the errors and classification
+    metrics keep counts, so that a sample is added to all the models with a
+    few array operations, a mini-batch with a cumulative sum and resetting is
+    a fill of arrays of size ``n_models``. Sums are accumulated sequentially,
+    so updating with a mini-batch gives exactly the same values as updating
+    sample by sample.
+
+    Predictions are given as one value per model, where ``None`` means that
+    the model was not evaluated on the sample.
+
+    Parameters
+    ----------
+    metric: Metric
+        One of ``MAE``, ``RMSE``, ``Accuracy`` or ``F1``.
+    n_models: int
+        Number of models.
+    """
+
+    def __init__(self, metric, n_models: int):
+        if type(metric) not in SUPPORTED_METRICS:
+            raise ValueError(
+                f"Unsupported metric {type(metric).__name__}, expected one of "
+                f"{[m.__name__ for m in SUPPORTED_METRICS]}"
+            )
+        self.metric = metric
+        self.kind = SUPPORTED_METRICS[type(metric)]
+        self.bigger_is_better = metric.bigger_is_better
+        self.n_models = n_models
+        self.pos_val = getattr(metric, "pos_val", None)
+        # Sum of the errors for regression, counts for classification: number
+        # of correct predictions for accuracy, true positives for F1
+        self._sum = np.zeros(n_models)
+        self._n = np.zeros(n_models, dtype=np.int64)
+        # False positives and false negatives for F1
+        self._fp = np.zeros(n_models, dtype=np.int64)
+        self._fn = np.zeros(n_models, dtype=np.int64)
+
+    def __len__(self):
+        return self.n_models
+
+    def __getitem__(self, index):
+        return _MetricView(self, index)
+
+    def __iter__(self):
+        return (_MetricView(self, i) for i in range(self.n_models))
+
+    def reset(self, index: int = None):
+        """Reset the metrics of all the models, or of the model ``index``."""
+        if index is None:
+            index = slice(None)
+        self._sum[index] = 0.0
+        self._n[index] = 0
+        self._fp[index] = 0
+        self._fn[index] = 0
+
+    def _scores(self, y, y_preds):
+        """Pointwise contributions of ``y_preds``, an ``(n_models, n)`` list.
+
+        Returns the mask of the evaluated predictions and the contributions to
+        ``_sum``, ``_fp`` and ``_fn``, zero where not evaluated.
+        """
+        if self.kind in ("mae", "rmse"):
+            preds = np.array(
+                [[np.nan if p is None else p for p in row] for row in y_preds],
+                dtype=float,
+            )
+            mask = ~np.isnan(preds)
+            errors = np.where(mask, np.asarray(y, dtype=float) - preds, 0.0)
+            scores = np.abs(errors) if self.kind == "mae" else errors * errors
+            return mask, scores, None, None
+
+        mask = np.array([[p is not None for p in row] for row in y_preds])
+        if self.kind == "accuracy":
+            correct = [[p == yi for p, yi in zip(row, y)] for row in y_preds]
+            return mask, np.array(correct) & mask, None, None
+
+        pos = self.pos_val
+        true_pos = np.array([yi == pos for yi in y])
+        pred_pos = np.array([[p == pos for p in row] for row in y_preds]) & mask
+        tp = pred_pos & true_pos
+        fp = pred_pos & ~true_pos
+        fn = ~pred_pos & mask & true_pos
+        return mask, tp, fp, fn
+
+    def _update_model(self, index, y, y_pred, sign):
+        """Update, or revert when ``sign`` is -1, the metric of one model."""
+        # In place, the state may be a view of arrays shared by estimators
+        self._n[index] += sign
+        if self.kind in ("mae", "rmse"):
+            error = y - y_pred
+            self._sum[index] += sign * (abs(error) if self.kind == "mae" else error**2)
+        elif self.kind == "accuracy":
+            self._sum[index] += sign * (y_pred == y)
+        elif y_pred == self.pos_val:
+            if y == self.pos_val:
+                self._sum[index] += sign
+            else:
+                self._fp[index] += sign
+        elif y == self.pos_val:
+            self._fn[index] += sign
+
+    def update(self, y, y_preds):
+        """Update with one sample and the prediction of each model."""
+        n = self.n_models
+        if self.kind in ("mae", "rmse"):
+            # None becomes NaN
+            errors = y - np.array(y_preds, dtype=float)
+            mask = ~np.isnan(errors)
+            errors[~mask] = 0.0
+            self._n += mask
+            self._sum += np.abs(errors) if self.kind == "mae" else errors * errors
+            return
+
+        mask = np.fromiter((p is not None for p in y_preds), bool, n)
+        self._n += mask
+        if self.kind == "accuracy":
+            self._sum += np.fromiter((p == y for p in y_preds), bool, n) & mask
+            return
+
+        pred_pos = np.fromiter((p == self.pos_val for p in y_preds), bool, n) & mask
+        if y == self.pos_val:
+            self._sum += pred_pos
+            self._fn += mask & ~pred_pos
+        else:
+            self._fp += pred_pos
+
+    def update_many(self, y, y_preds):
+        """Update with a mini-batch.
+
+        Parameters
+        ----------
+        y: list
+            The targets of the mini-batch.
+        y_preds: list of lists
+            For each model, its prediction of each sample of the mini-batch.
+        """
+        if len(y) == 0:
+            return
+        mask, scores, fp, fn = self._scores(y, y_preds)
+        self._n += mask.sum(axis=1)
+        if self.kind in ("mae", "rmse"):
+            # Accumulate left to right, as sample by sample updates do
+            running = np.cumsum(np.column_stack([self._sum, scores]), axis=1)
+            # In place, the state may be a view of arrays shared by estimators
+            self._sum[:] = running[:, -1]
+        else:
+            self._sum += scores.sum(axis=1)
+        if fp is not None:
+            self._fp += fp.sum(axis=1)
+            self._fn += fn.sum(axis=1)
+
+    def get(self) -> np.ndarray:
+        """Value of the metric of each model, NaN for models not evaluated yet."""
+        if self.kind == "f1":
+            tp = self._sum
+            # The numerators are 0 when the denominators are
+            precision = tp / np.maximum(tp + self._fp, 1)
+            recall = tp / np.maximum(tp + self._fn, 1)
+            denominator = precision + recall
+            values = (
+                2.0 * precision * recall / np.where(denominator > 0, denominator, 1)
+            )
+        else:
+            values = self._sum / np.maximum(self._n, 1)
+            if self.kind == "rmse":
+                values = np.sqrt(values)
+        return np.where(self._n > 0, values, np.nan)
+
+    def best(self, mask=None) -> int:
+        """Index of the best model, the first one in case of ties.
+
+        Models that were not evaluated are skipped, unless none was.
+
+        Parameters
+        ----------
+        mask: list of bool (default=None)
+            Only consider the models whose flag is true, all of them by
+            default.
+        """
+        candidates = np.arange(self.n_models)
+        if mask is not None and np.any(mask):
+            candidates = np.flatnonzero(mask)
+        return _best(self.get(), candidates, self.bigger_is_better)
+
+
+class RiverMetricBank:
+    """One River metric per model, with the interface of :class:`MetricBank`.
+
+    Used for the metrics that have no vectorized implementation. Only the
+    updates made through the bank count as evaluations of a model.
+    """
+
+    def __init__(self, metric, n_models: int):
+        self.metric = metric
+        self.bigger_is_better = metric.bigger_is_better
+        self.n_models = n_models
+        self.metrics = [deepcopy(metric) for _ in range(n_models)]
+        self._n = np.zeros(n_models, dtype=np.int64)
+
+    def __len__(self):
+        return self.n_models
+
+    def __getitem__(self, index):
+        return self.metrics[index]
+
+    def __iter__(self):
+        return iter(self.metrics)
+
+    def reset(self, index: int = None):
+        if index is not None:
+            self.metrics[index] = deepcopy(self.metric)
+            self._n[index] = 0
+            return
+        self.metrics = [deepcopy(self.metric) for _ in range(self.n_models)]
+        self._n.fill(0)
+
+    def update(self, y, y_preds):
+        for i, (metric, y_pred) in enumerate(zip(self.metrics, y_preds)):
+            if y_pred is not None:
+                metric.update(y, y_pred)
+                self._n[i] += 1
+
+    def update_many(self, y, y_preds):
+        for i, (metric, preds) in enumerate(zip(self.metrics, y_preds)):
+            for yi, y_pred in zip(y, preds):
+                if y_pred is not None:
+                    metric.update(yi, y_pred)
+                    self._n[i] += 1
+
+    def get(self) -> np.ndarray:
+        values = np.array([metric.get() for metric in self.metrics], dtype=float)
+        return np.where(self._n > 0, values, np.nan)
+
+    def best(self, mask=None) -> int:
+        candidates = np.arange(self.n_models)
+        if mask is not None and any(mask):
+            candidates = np.flatnonzero(mask)
+        return _best(self.get(), candidates, self.bigger_is_better)
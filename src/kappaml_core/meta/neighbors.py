@@ -0,0 +1,133 @@
+import numpy as np
+from river import base
+
+
+class NearestNeighborMetaLearner(base.Classifier):
+    """Meta-learner voting among the nearest recorded windows.
+
+    Each call to ``learn_one`` inserts the meta-features of a window with the
+    index of the best model on it into a fixed-size index, evicting the oldest
+    entry once ``max_size`` entries are held. Predictions are a vote among the
+    ``n_neighbors`` entries closest to the queried meta-features, weighted by
+    the inverse of their distance if ``weighted``.
+
+    Meta-features live on very different scales, so distances are computed on
+    features standardized with the mean and standard deviation of the entries
+    in the index. Meta-features missing from an entry or from the query do not
+    contribute to the distance. The search is a vectorized brute-force scan,
+    which answers in well under a millisecond for thousands of entries, the
+    typical size of a history of meta-updates, and, unlike a tree, does not
+    need to be rebuilt on insertions and evictions.
+
+    Parameters
+    ----------
+    n_neighbors: int (default=5)
+        Number of entries voting for a prediction.
+    max_size: int (default=1000)
+        Maximum number of entries, the oldest ones are evicted first.
+    weighted: bool (default=True)
+        Weight the votes by the inverse of the distance.
+    """
+
+    def __init__(self, n_neighbors: int = 5, max_size: int = 1000, weighted=True):
+        self.n_neighbors = n_neighbors
+        self.max_size = max_size
+        self.weighted = weighted
+        # Meta-feature name to column, columns are added as names appear
+        self._columns = {}
+        # Entries with missing values set to 0, their squares and the mask of
+        # observed values, so that distances are three matrix-vector products
+        self._X = np.zeros((max_size, 0))
+        self._X2 = np.zeros((max_size, 0))
+        self._mask = np.zeros((max_size, 0))
+        self._y = np.empty(max_size, dtype=object)
+        # Running sums of the entries held, for the standardization
+        self._sum = np.zeros(0)
+        self._sum2 = np.zeros(0)
+        self._count = np.zeros(0)
+        self._pos = 0
+        self._n = 0
+
+    @property
+    def _multiclass(self):
+        return True
+
+    def __len__(self):
+        return self._n
+
+    def _vector(self, x):
+        v = np.full(len(self._columns), np.nan)
+        for name, value in x.items():
+            j = self._columns.get(name)
+            if j is not None:
+                v[j] = value
+        return v
+
+    def _add_columns(self, n):
+        self._X, self._X2, self._mask = (
+            np.hstack([a, np.zeros((self.max_size, n))])
+            for a in (self._X, self._X2, self._mask)
+        )
+        self._sum, self._sum2, self._count = (
+            np.concatenate([a, np.zeros(n)])
+            for a in (self._sum, self._sum2, self._count)
+        )
+
+    def learn_one(self, x, y):
+        new = [name for name in x if name not in self._columns]
+        if new:
+            for name in new:
+                self._columns[name] = len(self._columns)
+            self._add_columns(len(new))
+
+        # Overwrite the oldest entry once full
+        i = self._pos
+        if self._n == self.max_size:
+            self._sum -= self._X[i]
+            self._sum2 -= self._X2[i]
+            self._count -= self._mask[i]
+        v = self._vector(x)
+        observed = ~np.isnan(v)
+        self._X[i] = np.where(observed, v, 0.0)
+        self._X2[i] = self._X[i] * self._X[i]
+        self._mask[i] = observed
+        self._sum += self._X[i]
+        self._sum2 += self._X2[i]
+        self._count += self._mask[i]
+        self._y[i] = y
+        self._pos = (self._pos + 1) % self.max_size
+        self._n = min(self._n + 1, self.max_size)
+
+    def predict_proba_one(self, x):
+        if self._n == 0:
+            return {}
+        n = self._n
+        counts = np.maximum(self._count, 1)
+        mean = self._sum / counts
+        var = self._sum2 / counts - mean * mean
+        # Weight of each meta-feature in the distance, 0 when missing from x
+        q = self._vector(x)
+        w = np.where(var > 1e-12, 1.0 / np.maximum(var, 1e-12), 1.0)
+        w[np.isnan(q)] = 0.0
+        q = np.where(np.isnan(q), 0.0, q)
+
+        # Sum over the observed meta-features of w * (X - q) ** 2, expanded
+        distances = (
+            self._X2[:n] @ w
+            - 2.0 * (self._X[:n] @ (w * q))
+            + self._mask[:n] @ (w * q * q)
+        )
+        distances = np.sqrt(np.maximum(distances, 0.0))
+
+        k = min(self.n_neighbors, n)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        if self.weighted:
+            weights = 1.0 / (distances[nearest] + 1e-9)
+        else:
+            weights = np.ones(k)
+
+        votes = {}
+        for i, w_i in zip(nearest, weights):
+            votes[self._y[i]] = votes.get(self._y[i], 0.0) + w_i
+        total = sum(votes.values())
+        return {label: v / total for label, v in votes.items()}
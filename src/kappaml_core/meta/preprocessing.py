@@ -0,0 +1,114 @@
+"""Preprocessing shared by all the base models of a meta estimator.
+
+Candidate pipelines often start with the same transformers, e.g.
+``preprocessing.StandardScaler() | model``. Each pipeline then updates its own
+copy of the transformers and transforms every sample again, a cost that grows
+with the size of the pool. A meta estimator given a ``preprocessor`` instead
+updates it once per sample and feeds the transformed features to the base
+models. :func:`split_shared_prefix` detects such a prefix in a list of
+pipelines.
+
+The preprocessor follows the order of a River pipeline: models predict on the
+features transformed before the preprocessor learns from the sample, and learn
+from the features transformed after it, except for supervised transformers
+that are updated after transforming to avoid target leakage. Mini-batches are
+transformed at once when the preprocessor has mini-batch methods, as
+``Pipeline.learn_many`` does.
+"""
+
+import pandas as pd
+from river import base, compose
+
+from kappaml_core.meta.execution import supports_mini_batch
+
+
+def _steps(model):
+    if isinstance(model, compose.Pipeline):
+        return list(model.steps.values())
+    return [model]
+
+
+def _chain(steps):
+    return steps[0] if len(steps) == 1 else compose.Pipeline(*steps)
+
+
+def split_shared_prefix(models):
+    """Split the leading transformers shared by all the base models.
+
+    Steps are shared when they have the same type and parameters, as given by
+    their representation. The models should not have been trained, since only
+    the state of the first model's prefix is kept.
+
+    Parameters
+    ----------
+    models: list of Estimator
+        The base models, typically River pipelines.
+
+    Returns
+    -------
+    tuple
+        The shared prefix, ``None`` if there is none, and the base models
+        without it.
+    """
+    steps = [_steps(model) for model in models]
+    n_shared = 0
+    # Keep at least the final estimator of every model
+    while all(n_shared < len(s) - 1 for s in steps):
+        candidates = [s[n_shared] for s in steps]
+        if not isinstance(candidates[0], base.Transformer):
+            break
+        if any(
+            type(c) is not type(candidates[0]) or repr(c) != repr(candidates[0])
+            for c in candidates
+        ):
+            break
+        n_shared += 1
+
+    if n_shared == 0:
+        return None, list(models)
+    return _chain(steps[0][:n_shared]), [_chain(s[n_shared:]) for s in steps]
+
+
+def preprocess_one(preprocessor, x, y):
+    """Update the preprocessor with a sample.
+
+    Returns
+    -------
+    tuple
+        The features to predict on and the features to learn from.
+    """
+    x_pred = preprocessor.transform_one(x)
+    if preprocessor._supervised:
+        preprocessor.learn_one(x, y)
+        return x_pred, x_pred
+    preprocessor.learn_one(x)
+    return x_pred, preprocessor.transform_one(x)
+
+
+def preprocess_many(preprocessor, X: pd.DataFrame, y: pd.Series):
+    """Mini-batch version of :func:`preprocess_one`."""
+    if not supports_mini_batch(preprocessor):
+        pairs = [
+            preprocess_one(preprocessor, x, yi)
+            for x, yi in zip(X.to_dict(orient="records"), y.tolist())
+        ]
+        X_pred = pd.DataFrame([x for x, _ in pairs], index=X.index)
+        X_learn = pd.DataFrame([x for _, x in pairs], index=X.index)
+        return X_pred, X_learn
+
+    X_pred = preprocessor.transform_many(X)
+    if preprocessor._supervised:
+        preprocessor.learn_many(X, y)
+        return X_pred, X_pred
+    preprocessor.learn_many(X)
+    return X_pred, preprocessor.transform_many(X)
+
+
+def transform_many(preprocessor, X: pd.DataFrame) -> pd.DataFrame:
+    """Transform a mini-batch without updating the preprocessor."""
+    if supports_mini_batch(preprocessor):
+        return preprocessor.transform_many(X)
+    return pd.DataFrame(
+        [preprocessor.transform_one(x) for x in X.to_dict(orient="records")],
+        index=X.index,
+    )
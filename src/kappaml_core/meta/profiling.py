@@ -0,0 +1,126 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    2.5e-3,
+    5e-3,
+    1e-2,
+    2.5e-2,
+    5e-2,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+class _Phase:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self, n_buckets):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # The last bucket counts the observations above the largest bound
+        self.buckets = [0] * (n_buckets + 1)
+
+
+class Profiler:
+    """Per-phase timers, call counts and latency histograms.
+
+    The meta estimators call :meth:`record` around each phase of their hot
+    path when profiling is enabled, and skip it entirely otherwise. Recording
+    is thread-safe, since asynchronous meta-updates record their phases from
+    the background thread.
+
+    Parameters
+    ----------
+    buckets: tuple of float (default=DEFAULT_BUCKETS)
+        Upper bounds of the latency histogram buckets, in seconds.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def record(self, phase: str, start: float) -> float:
+        """Record the time elapsed since ``start`` in ``phase``.
+
+        Returns
+        -------
+        float
+            The current time, to be used as the start of the next phase.
+        """
+        now = perf_counter()
+        elapsed = now - start
+        with self._lock:
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = _Phase(len(self.buckets))
+            stats.count += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            stats.buckets[bisect_left(self.buckets, elapsed)] += 1
+        return now
+
+    def reset(self):
+        with self._lock:
+            self.phases = {}
+
+    def to_dict(self) -> dict:
+        """Export the measurements, with cumulative histogram counts."""
+        report = {}
+        # Consistent with concurrent calls to record
+        with self._lock:
+            for phase, stats in self.phases.items():
+                cumulative, histogram = 0, {}
+                bounds = self.buckets + (float("inf"),)
+                for bound, count in zip(bounds, stats.buckets):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                report[phase] = {
+                    "count": stats.count,
+                    "total_seconds": stats.total,
+                    "mean_seconds": stats.total / stats.count,
+                    "max_seconds": stats.max,
+                    "histogram": histogram,
+                }
+        return report
+
+    def to_prometheus(self, prefix: str = "kappaml_meta") -> str:
+        """Export the measurements in the Prometheus text exposition format."""
+        name = f"{prefix}_phase_duration_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each phase of the meta estimator.",
+            f"# TYPE {name} histogram",
+        ]
+        for phase, stats in self.to_dict().items():
+            for bound, count in stats["histogram"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{name}_bucket{{phase="{phase}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {stats["total_seconds"]!r}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {stats["count"]}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+
+from kappaml_core.meta.metric_bank import make_metric_bank
+
+
+class SuccessiveHalvingPruner:
+    """Suspend the training of dominated base models by successive halving.
+
+    The active models are ranked every ``rung_size`` samples on the metric
+    they obtained since the previous rung, and only the best
+    ``keep_ratio`` of them, at least ``min_active``, stay active. Suspended
+    models are neither evaluated nor trained, so the cost of a sample grows
+    with the number of active models rather than with the size of the pool.
+    Every ``revive_every`` samples, all the suspended models are revived and
+    compete again from the next rung on, so that a model that would have
+    become competitive after a concept change is not discarded for good.
+
+    A dominated model is suspended even if it is the one selected by the meta
+    estimator, which then falls back to the best active model on its window.
+    The meta-learner only selects among the active models. A revived model has
+    no evaluations on the current window, so it is not labelled as the best
+    model before it is evaluated again.
+
+    Parameters
+    ----------
+    rung_size: int (default=200)
+        Number of samples between two rankings of the active models.
+    keep_ratio: float (default=0.5)
+        Fraction of the active models kept at each rung.
+    min_active: int (default=2)
+        Minimum number of active models.
+    revive_every: int (default=2000)
+        Number of samples between two revivals of the suspended models.
+
+    Attributes
+    ----------
+    active: np.ndarray
+        Whether each model is active.
+    n_suspended: int
+        Number of times a model was suspended.
+    n_revived: int
+        Number of times a model was revived.
+    """
+
+    def __init__(
+        self,
+        rung_size: int = 200,
+        keep_ratio: float = 0.5,
+        min_active: int = 2,
+        revive_every: int = 2000,
+    ):
+        if not 0 < keep_ratio <= 1:
+            raise ValueError("keep_ratio must be in (0, 1]")
+        self.rung_size = rung_size
+        self.keep_ratio = keep_ratio
+        self.min_active = min_active
+        self.revive_every = revive_every
+        self.active = None
+        self.n_suspended = 0
+        self.n_revived = 0
+
+    def start(self, n_models: int, metric):
+        """Called by the meta estimator with its number of models and metric."""
+        self.active = np.ones(n_models, dtype=bool)
+        self._bank = make_metric_bank(metric, n_models)
+        self._counts = np.zeros(n_models, dtype=np.int64)
+        self._since_rung = 0
+        self._since_revival = 0
+
+    def reset_model(self, index: int):
+        """Forget the scores of a model since the last rung, e.g. once evicted."""
+        self._bank.reset(index)
+        self._counts[index] = 0
+
+    def samples_until_change(self) -> int:
+        """Number of samples before the active models may change."""
+        return min(
+            self.rung_size - self._since_rung,
+            self.revive_every - self._since_revival,
+        )
+
+    def update(self, y, y_preds):
+        """Record the predictions of a sample, ``None`` for skipped models."""
+        self._bank.update(y, y_preds)
+        self._counts += [p is not None for p in y_preds]
+        self._step(1)
+
+    def update_many(self, y, y_preds):
+        """Record the predictions of a mini-batch, one list per model.
+
+        The mini-batch must not be larger than :meth:`samples_until_change`.
+        """
+        self._bank.update_many(y, y_preds)
+        self._counts += [sum(p is not None for p in preds) for preds in y_preds]
+        self._step(len(y))
+
+    def _step(self, n):
+        self._since_rung += n
+        self._since_revival += n
+        if self._since_rung >= self.rung_size:
+            self._halve()
+        if self._since_revival >= self.revive_every:
+            self._revive()
+
+    def _halve(self):
+        # Models that were not evaluated since the last rung are not ranked
+        ranked = np.flatnonzero(self.active & (self._counts > 0))
+        n_keep = max(self.min_active, math.ceil(self.active.sum() * self.keep_ratio))
+        n_drop = min(len(ranked), int(self.active.sum()) - n_keep)
+        if n_drop > 0:
+            scores = self._bank.get()[ranked]
+            if self._bank.bigger_is_better:
+                scores = -scores
+            # Stable sort, so that ties are broken in model order
+            order = ranked[np.argsort(scores, kind="stable")]
+            dropped = order[::-1][:n_drop]
+            self.active[dropped] = False
+            self.n_suspended += len(dropped)
+
+        self._bank.reset()
+        self._counts.fill(0)
+        self._since_rung = 0
+
+    def _revive(self):
+        self.n_revived += int((~self.active).sum())
+        self.active.fill(True)
+        self._since_revival = 0
@@ -0,0 +1,78 @@
+from river.base import DriftDetector
+from river.drift import ADWIN
+
+
+class DriftScheduler:
+    """Schedule meta-updates from drift on the selected model's error stream.
+
+    Instead of a fixed ``meta_update_frequency``, a meta-update is due when the
+    drift detector fires, but never before ``min_interval`` samples and at the
+    latest after ``max_interval`` samples since the previous one. Long stable
+    periods therefore cost few extractions, while abrupt changes are reacted to
+    after ``min_interval`` samples.
+
+    ADWIN only looks for drift every ``clock`` samples, so mini-batches run
+    until its next check rather than sample by sample once ``min_interval``
+    has passed. Other detectors are assumed to check on every sample.
+
+    Parameters
+    ----------
+    drift_detector: DriftDetector (default=ADWIN)
+        Detector fed with the pointwise metric value of the selected model,
+        e.g. ``drift.ADWIN()`` or ``drift.PageHinkley()``.
+    min_interval: int (default=50)
+        Minimum number of samples between two meta-updates.
+    max_interval: int (default=1000)
+        Maximum number of samples between two meta-updates.
+    """
+
+    def __init__(
+        self,
+        drift_detector: DriftDetector = None,
+        min_interval: int = 50,
+        max_interval: int = 1000,
+    ):
+        if min_interval > max_interval:
+            raise ValueError("min_interval must not be greater than max_interval")
+        self.drift_detector = drift_detector if drift_detector is not None else ADWIN()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.drift_pending = False
+        self.n_drifts = 0
+        # Samples fed to the detector since it was created or reset itself
+        self._n_fed = 0
+
+    def update(self, error: float):
+        """Feed the error of the selected model on a sample."""
+        if self.drift_detector.drift_detected:
+            # River detectors reset on the sample following a detection
+            self._n_fed = 0
+        self.drift_detector.update(error)
+        self._n_fed += 1
+        if self.drift_detector.drift_detected:
+            self.drift_pending = True
+            self.n_drifts += 1
+
+    def is_due(self, n_since_update: int) -> bool:
+        if n_since_update >= self.max_interval:
+            return True
+        return self.drift_pending and n_since_update >= self.min_interval
+
+    def samples_until_due(self, n_since_update: int) -> int:
+        """Lower bound on the number of samples before a meta-update is due."""
+        if self.is_due(n_since_update):
+            return 0
+        if n_since_update < self.min_interval:
+            return self.min_interval - n_since_update
+        return min(self._samples_until_check(), self.max_interval - n_since_update)
+
+    def _samples_until_check(self) -> int:
+        """Number of samples until the detector may next detect drift."""
+        if isinstance(self.drift_detector, ADWIN):
+            clock = self.drift_detector.clock
+            return clock - self._n_fed % clock
+        return 1
+
+    def reset(self):
+        """Called after each meta-update."""
+        self.drift_pending = False
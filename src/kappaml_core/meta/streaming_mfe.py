@@ -0,0 +1,431 @@
+from collections import Counter, deque
+
+import numpy as np
+
+GENERAL_FEATURES = [
+    "attr_to_inst",
+    "cat_to_num",
+    "freq_class",
+    "inst_to_attr",
+    "nr_attr",
+    "nr_bin",
+    "nr_cat",
+    "nr_class",
+    "nr_inst",
+    "nr_num",
+]
+
+STATISTICAL_FEATURES = [
+    "cor",
+    "cov",
+    "eigenvalues",
+    "g_mean",
+    "gravity",
+    "h_mean",
+    "kurtosis",
+    "max",
+    "mean",
+    "min",
+    "nr_cor_attr",
+    "range",
+    "sd",
+    "skewness",
+    "sparsity",
+    "var",
+]
+
+FEATURE_GROUPS = {
+    "general": GENERAL_FEATURES,
+    "statistical": STATISTICAL_FEATURES,
+}
+
+
+class _SlidingExtremum:
+    """Monotonic deque tracking the minimum (or maximum) of a sliding window."""
+
+    def __init__(self, maximum: bool = False):
+        self.sign = -1.0 if maximum else 1.0
+        self.values = deque()
+
+    def push(self, t: int, value: float):
+        value *= self.sign
+        while self.values and self.values[-1][1] >= value:
+            self.values.pop()
+        self.values.append((t, value))
+
+    def expire(self, t: int):
+        while self.values and self.values[0][0] <= t:
+            self.values.popleft()
+
+    def get(self):
+        return self.sign * self.values[0][1] if self.values else np.nan
+
+    def _pack(self):
+        return (
+            self.sign,
+            np.array([t for t, _ in self.values], dtype=int),
+            np.array([value for _, value in self.values], dtype=float),
+        )
+
+    @classmethod
+    def _unpack(cls, state):
+        sign, ts, values = state
+        extremum = cls(maximum=sign < 0)
+        extremum.values = deque(zip(ts.tolist(), values.tolist()))
+        return extremum
+
+
+class StreamingMFE:
+    """Incremental meta-feature extractor over a sliding window.
+
+    This is a streaming alternative to PyMFE for the ``general`` and
+    ``statistical`` groups. Instead of refitting on the whole window at every
+    extraction, it maintains sliding-window accumulators that are updated in
+    O(1) per sample and number of features. Only the accumulators of the
+    requested groups are maintained: per-class counts and value counts for
+    ``general``, and in addition power sums, cross products, per-class sums
+    and monotonic min/max queues for ``statistical``.
+
+    Feature names and summaries (``.mean`` and ``.sd``) follow PyMFE, but only
+    a subset of the PyMFE groups is covered:
+
+    - ``general``: every feature but ``num_to_cat``.
+    - ``statistical``: ``cor``, ``cov``, ``eigenvalues``, ``g_mean``,
+      ``gravity``, ``h_mean``, ``kurtosis``, ``max``, ``mean``, ``min``,
+      ``nr_cor_attr``, ``range``, ``sd``, ``skewness``, ``sparsity`` and
+      ``var``. The features that depend on order statistics or on
+      discriminant analysis, ``can_cor``, ``iq_range``, ``lh_trace``, ``mad``,
+      ``median``, ``nr_disc``, ``nr_norm``, ``nr_outliers``, ``p_trace``,
+      ``roy_root``, ``sd_ratio``, ``t_mean`` and ``w_lambda``, are not
+      maintained.
+
+    The two backends thus extract different meta-features, and a meta-learner
+    or a knowledge base should not mix meta-features of both.
+
+    Parameters
+    ----------
+    groups: list (default=['general'])
+        Groups of meta-features to extract, among ``general`` and
+        ``statistical``.
+    window_size: int (default=200)
+        The size of the sliding window.
+    cor_threshold: float (default=0.5)
+        Absolute correlation above which a pair of attributes counts towards
+        ``nr_cor_attr``.
+    refresh_every: int (default=None)
+        Number of evictions after which the accumulators are recomputed from
+        the window to bound floating point drift. Defaults to ``window_size``.
+    """
+
+    def __init__(
+        self,
+        groups: list = ["general"],
+        window_size: int = 200,
+        cor_threshold: float = 0.5,
+        refresh_every: int = None,
+    ):
+        unknown = set(groups) - set(FEATURE_GROUPS)
+        if unknown:
+            raise ValueError(
+                f"Unsupported meta-feature groups for the streaming backend: "
+                f"{sorted(unknown)}"
+            )
+        self.groups = groups
+        self.window_size = window_size
+        self.cor_threshold = cor_threshold
+        self.refresh_every = refresh_every or window_size
+        self.features = [f for g in groups for f in FEATURE_GROUPS[g]]
+        self._statistical = "statistical" in groups
+        self.reset()
+
+    def reset(self):
+        self.columns = None
+        self.window = deque()
+        self.t = 0
+        self._evictions = 0
+
+    def _init_state(self, n_features: int):
+        self.n_features = n_features
+        # Values are shifted by the first observation to limit cancellation
+        # errors when subtracting evicted samples from the power sums
+        self.shift = None
+        self._clear_accumulators()
+        n_extrema = n_features if self._statistical else 0
+        self.mins = [_SlidingExtremum() for _ in range(n_extrema)]
+        self.maxs = [_SlidingExtremum(maximum=True) for _ in range(n_extrema)]
+
+    def _clear_accumulators(self):
+        """Reset the additive accumulators of the requested groups."""
+        d = self.n_features
+        self.value_counts = [Counter() for _ in range(d)]
+        self.class_counts = Counter()
+        self.class_sums = {}
+        if self._statistical:
+            self.s1 = np.zeros(d)
+            self.s2 = np.zeros(d)
+            self.s3 = np.zeros(d)
+            self.s4 = np.zeros(d)
+            self.cross = np.zeros((d, d))
+            self.log_sum = np.zeros(d)
+            self.inv_sum = np.zeros(d)
+            self.n_negative = np.zeros(d, dtype=int)
+            self.n_zero = np.zeros(d, dtype=int)
+
+    def _to_array(self, x):
+        if isinstance(x, dict):
+            if self.columns is None:
+                self.columns = list(x)
+            x = [x.get(c, 0.0) for c in self.columns]
+        try:
+            return np.array(x, dtype=float).ravel()
+        except (TypeError, ValueError):
+            raise ValueError(
+                "The streaming backend only supports numeric features, use "
+                "mfe_backend='pymfe' for categorical ones"
+            ) from None
+
+    def _accumulate(self, row, y, sign):
+        for counts, value in zip(self.value_counts, row):
+            counts[value] += sign
+            if counts[value] == 0:
+                del counts[value]
+
+        self.class_counts[y] += sign
+        n_class = self.class_counts[y]
+        if n_class == 0:
+            del self.class_counts[y]
+
+        if not self._statistical:
+            return
+
+        if n_class == 0:
+            del self.class_sums[y]
+        elif sign > 0 and n_class == 1:
+            self.class_sums[y] = row.copy()
+        else:
+            self.class_sums[y] += sign * row
+
+        z = row - self.shift
+        z2 = z * z
+        self.s1 += sign * z
+        self.s2 += sign * z2
+        self.s3 += sign * z2 * z
+        self.s4 += sign * z2 * z2
+        self.cross += sign * np.outer(z, z)
+
+        negative = row < 0.0
+        zero = (row >= 0.0) & (row < 1e-10)
+        positive = ~(negative | zero)
+        self.n_negative += sign * negative
+        self.n_zero += sign * zero
+        self.log_sum[positive] += sign * np.log(row[positive])
+        self.inv_sum[positive] += sign / row[positive]
+
+    def _refresh(self):
+        """Recompute the additive accumulators from the window contents."""
+        self.shift = self.window[0][1].copy()
+        self._clear_accumulators()
+        for _, row, y in self.window:
+            self._accumulate(row, y, 1)
+
+    def update(self, x, y):
+        """Add a sample to the window, evicting the oldest one if it is full."""
+        row = self._to_array(x)
+        if self.t == 0:
+            self._init_state(len(row))
+            self.shift = row.copy()
+
+        self.window.append((self.t, row, y))
+        self._accumulate(row, y, 1)
+        for j, (mins, maxs) in enumerate(zip(self.mins, self.maxs)):
+            mins.push(self.t, row[j])
+            maxs.push(self.t, row[j])
+
+        if len(self.window) > self.window_size:
+            t_old, row_old, y_old = self.window.popleft()
+            self._accumulate(row_old, y_old, -1)
+            for mins, maxs in zip(self.mins, self.maxs):
+                mins.expire(t_old)
+                maxs.expire(t_old)
+            self._evictions += 1
+            if self._evictions >= self.refresh_every:
+                self._evictions = 0
+                self._refresh()
+
+        self.t += 1
+        return self
+
+    def _pack(self):
+        """State with the sliding buffers packed into arrays.
+
+        The deques of the window and of the min/max queues hold one small tuple
+        per sample, and the per-class sums one array per class, which pickle
+        slowly and verbosely. The value counts are not stored, they are rebuilt
+        from the window by :meth:`_unpack`.
+        """
+        state = self.__dict__.copy()
+        if self.t > 0:
+            state["window"] = (
+                np.array([t for t, _, _ in self.window], dtype=int),
+                np.array([row for _, row, _ in self.window]),
+                [y for _, _, y in self.window],
+            )
+            state["mins"] = [extremum._pack() for extremum in self.mins]
+            state["maxs"] = [extremum._pack() for extremum in self.maxs]
+            state["class_sums"] = (
+                list(self.class_sums),
+                np.array(list(self.class_sums.values())),
+            )
+            del state["value_counts"]
+        return state
+
+    @classmethod
+    def _unpack(cls, state):
+        """Rebuild an extractor from :meth:`_pack`."""
+        mfe = cls.__new__(cls)
+        mfe.__dict__.update(state)
+        if mfe.t > 0:
+            ts, rows, ys = state["window"]
+            mfe.window = deque(zip(ts.tolist(), rows, ys))
+            mfe.mins = [_SlidingExtremum._unpack(s) for s in state["mins"]]
+            mfe.maxs = [_SlidingExtremum._unpack(s) for s in state["maxs"]]
+            classes, sums = state["class_sums"]
+            mfe.class_sums = dict(zip(classes, sums))
+            mfe.value_counts = [Counter(column.tolist()) for column in rows.T]
+        return mfe
+
+    def _moments(self):
+        """Mean, unbiased variance and central moments of each attribute."""
+        n = len(self.window)
+        m1 = self.s1 / n
+        e2 = self.s2 / n
+        e3 = self.s3 / n
+        e4 = self.s4 / n
+        c2 = np.maximum(e2 - m1**2, 0.0)
+        c3 = e3 - 3 * m1 * e2 + 2 * m1**3
+        c4 = e4 - 4 * m1 * e3 + 6 * m1**2 * e2 - 3 * m1**4
+        var = c2 * n / (n - 1) if n > 1 else np.full_like(c2, np.nan)
+        return self.shift + m1, var, c3, c4
+
+    def _covariance(self):
+        n = len(self.window)
+        m1 = self.s1 / n
+        return (self.cross - n * np.outer(m1, m1)) / (n - 1)
+
+    def _gravity(self):
+        classes = sorted(self.class_counts)
+        counts = np.array([self.class_counts[c] for c in classes])
+        if len(classes) < 2:
+            return np.nan
+        i_maj = int(np.argmax(counts))
+        rest = [i for i in range(len(classes)) if i != i_maj]
+        i_min = rest[int(np.argmin(counts[rest]))]
+        c_maj, c_min = classes[i_maj], classes[i_min]
+        center_maj = self.class_sums[c_maj] / self.class_counts[c_maj]
+        center_min = self.class_sums[c_min] / self.class_counts[c_min]
+        return float(np.linalg.norm(center_maj - center_min))
+
+    def _compute(self, name, n, d, stats):
+        mean, var, c3, c4 = stats.get("moments", (None,) * 4)
+        if name == "attr_to_inst":
+            return d / n
+        if name == "inst_to_attr":
+            return n / d
+        if name == "cat_to_num":
+            return 0.0
+        if name in ("nr_attr", "nr_num"):
+            return d
+        if name == "nr_cat":
+            return 0
+        if name == "nr_inst":
+            return n
+        if name == "nr_bin":
+            return sum(len(counts) == 2 for counts in self.value_counts)
+        if name == "nr_class":
+            return len(self.class_counts)
+        if name == "freq_class":
+            return np.array(list(self.class_counts.values())) / n
+        if name == "mean":
+            return mean
+        if name == "var":
+            return var
+        if name == "sd":
+            return np.sqrt(var)
+        if name == "min":
+            return np.array([m.get() for m in self.mins])
+        if name == "max":
+            return np.array([m.get() for m in self.maxs])
+        if name == "range":
+            return self._compute("max", n, d, stats) - self._compute("min", n, d, stats)
+        if name == "skewness":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return c3 / var**1.5
+        if name == "kurtosis":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return c4 / var**2 - 3.0
+        if name == "g_mean":
+            g_mean = np.exp(self.log_sum / n)
+            g_mean[self.n_zero > 0] = 0.0
+            g_mean[self.n_negative > 0] = np.nan
+            return g_mean
+        if name == "h_mean":
+            with np.errstate(divide="ignore"):
+                h_mean = n / self.inv_sum
+            h_mean[self.n_zero > 0] = 0.0
+            h_mean[self.n_negative > 0] = np.nan
+            return h_mean
+        if name == "sparsity":
+            unique = np.array([len(counts) for counts in self.value_counts])
+            return (n / unique - 1.0) / (n - 1.0)
+        if name == "cov":
+            return np.abs(stats["cov"][np.tril_indices(d, k=-1)])
+        if name == "cor":
+            return stats["cor"]
+        if name == "nr_cor_attr":
+            if d < 2:
+                return np.nan
+            return np.sum(stats["cor"] >= self.cor_threshold) * 2.0 / (d * (d - 1.0))
+        if name == "eigenvalues":
+            return np.linalg.eigvalsh(stats["cov"])
+        if name == "gravity":
+            return self._gravity()
+        raise ValueError(f"Unknown meta-feature: {name}")
+
+    def extract(self):
+        """Extract meta-features from the current window.
+
+        Returns
+        -------
+        tuple of lists
+            Feature names and values, in the same format as ``MFE.extract``.
+        """
+        n = len(self.window)
+        if n < 2:
+            return [], []
+        d = self.n_features
+
+        stats = {}
+        if self._statistical:
+            stats["moments"] = self._moments()
+            cov = self._covariance()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sd = np.sqrt(np.diag(cov))
+                cor = np.abs(cov / np.outer(sd, sd))
+            stats["cov"] = cov
+            stats["cor"] = cor[np.tril_indices(d, k=-1)]
+
+        names, values = [], []
+        for name in self.features:
+            value = self._compute(name, n, d, stats)
+            if np.ndim(value) == 0:
+                names.append(name)
+                values.append(float(value))
+                continue
+            value = np.asarray(value, dtype=float)
+            names.extend([f"{name}.mean", f"{name}.sd"])
+            if value.size == 0:
+                values.extend([np.nan, np.nan])
+            else:
+                sd = np.nan if value.size <= 1 else float(np.std(value, ddof=1))
+                values.extend([float(np.mean(value)), sd])
+        return names, values
@@ -0,0 +1,129 @@
+import zlib
+
+import numpy as np
+
+METHODS = ["projection", "hash", "rows"]
+
+
+class WindowSubsampler:
+    """Shrink the window before PyMFE extracts meta-features from it.
+
+    The cost of the ``statistical`` group, and of other groups with pairwise
+    measures such as correlations and covariances, grows quadratically with the
+    number of features, and the cost of every group grows with the number of
+    rows. On wide streams, meta-features can be computed on a smaller window
+    instead:
+
+    - ``projection`` multiplies the features by a Gaussian random matrix with
+      ``n_components`` columns. Distances and the overall spread of the data
+      are approximately preserved, but per-feature meta-features describe
+      mixtures of features. Numeric features only.
+    - ``hash`` keeps ``n_components`` features picked by hashing their column
+      index. Per-feature meta-features stay exact for the kept features, but
+      information carried by the dropped ones is lost.
+    - ``rows`` keeps ``n_rows`` samples of the window, stratified on the
+      target: by class for classification and by quantile bins for
+      regression. All features are kept and the target distribution is
+      preserved, but the estimates are noisier.
+
+    Meta-features are only comparable between windows transformed the same
+    way, so the subsampler must not be changed once the meta-learner is
+    trained. The projection matrix and the hashed subset are fixed for a
+    given number of features. Streams with fewer features than
+    ``n_components``, or windows smaller than ``n_rows``, are left untouched.
+    ``benchmarks/subsampling.py`` measures the speed/accuracy tradeoff of
+    each method as the number of features grows.
+
+    Parameters
+    ----------
+    method: str (default='projection')
+        One of ``projection``, ``hash`` or ``rows``.
+    n_components: int (default=32)
+        Number of features kept by ``projection`` and ``hash``.
+    n_rows: int (default=100)
+        Number of samples kept by ``rows``.
+    n_bins: int (default=10)
+        Number of quantile bins of the target used to stratify regression
+        windows with ``rows``.
+    seed: int (default=42)
+        Seed of the projection, the hashing and the row sampling.
+    """
+
+    def __init__(
+        self,
+        method: str = "projection",
+        n_components: int = 32,
+        n_rows: int = 100,
+        n_bins: int = 10,
+        seed: int = 42,
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+        self.method = method
+        self.n_components = n_components
+        self.n_rows = n_rows
+        self.n_bins = n_bins
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+        self._projections = {}
+        self._subsets = {}
+
+    def transform(self, X: np.ndarray, y: np.ndarray):
+        """Subsampled copy of a window, as a pair of arrays."""
+        if self.method == "rows":
+            return self._sample_rows(X, y)
+        if X.shape[1] <= self.n_components:
+            return X, y
+        if self.method == "hash":
+            return X[:, self._subset(X.shape[1])], y
+        return X.astype(float) @ self._projection(X.shape[1]), y
+
+    def _projection(self, n_features):
+        if n_features not in self._projections:
+            rng = np.random.default_rng([self.seed, n_features])
+            self._projections[n_features] = rng.normal(
+                scale=1 / np.sqrt(self.n_components),
+                size=(n_features, self.n_components),
+            )
+        return self._projections[n_features]
+
+    def _subset(self, n_features):
+        # The window has a fixed set of columns, see WindowBuffer, so the
+        # subset only depends on the seed and the number of features: every
+        # window of a stream keeps the same features, in every run and process
+        # since CRC32, unlike hash(), is not salted
+        if n_features not in self._subsets:
+            hashes = [
+                zlib.crc32(f"{self.seed}:{j}".encode()) for j in range(n_features)
+            ]
+            self._subsets[n_features] = np.sort(np.argsort(hashes)[: self.n_components])
+        return self._subsets[n_features]
+
+    def _strata(self, y):
+        if y.dtype.kind == "f" and len(np.unique(y)) > self.n_bins:
+            edges = np.quantile(y, np.linspace(0, 1, self.n_bins + 1)[1:-1])
+            return np.searchsorted(edges, y)
+        return np.unique(y, return_inverse=True)[1]
+
+    def _sample_rows(self, X, y):
+        n = len(y)
+        if n <= self.n_rows:
+            return X, y
+        strata = self._strata(y)
+        counts = np.bincount(strata)
+        # Proportional allocation, rounding the largest remainders up
+        quotas = counts * self.n_rows / n
+        sizes = np.floor(quotas).astype(int)
+        remainders = np.argsort(sizes - quotas)[: self.n_rows - sizes.sum()]
+        sizes[remainders] += 1
+
+        keep = np.concatenate(
+            [
+                self._rng.choice(np.flatnonzero(strata == s), size, replace=False)
+                for s, size in enumerate(sizes)
+                if size > 0
+            ]
+        )
+        # Keep the samples in stream order
+        keep.sort()
+        return X[keep], y[keep]
@@ -0,0 +1,270 @@
+"""Many logical streams, one meta estimator each, hosted in one process.
+
+A :class:`TenantManager` clones a template estimator for every tenant, i.e.
+every logical stream, and shares what does not need to be per tenant:
+
+- one meta-learner per group of tenants, trained on the meta-updates of all
+  the tenants of the group;
+- the PyMFE extractor, which holds no state between windows;
+- the backing arrays of the windows and of the vectorized metric banks, which
+  are views into preallocated arrays with one slot per resident tenant.
+
+At most ``max_resident`` tenants are held in memory. Beyond that, or when
+idle for too long, tenants are offloaded to disk as checkpoints and restored
+transparently on their next sample.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from urllib.parse import quote
+
+import numpy as np
+
+from kappaml_core.meta.checkpoint import load_checkpoint
+from kappaml_core.meta.memory import deep_sizeof
+from kappaml_core.meta.metric_bank import MetricBank
+
+_BANK_STATE = ("_sum", "_n", "_fp", "_fn")
+
+
+class TenantManager:
+    """Route the samples of many tenants to their own meta estimators.
+
+    Tenants are created on their first sample. Their base models, window,
+    metrics and meta-update schedule are their own, so a tenant learns as an
+    independent clone of ``template`` would, except that the meta-learner is
+    shared with the other tenants of its group.
+
+    Parameters
+    ----------
+    template: MetaEstimator
+        Untrained estimator cloned for every new tenant. Only synchronous
+        meta-updates and serial execution are supported, since the shared
+        components are not thread-safe.
+    group: callable (default=None)
+        Maps a tenant id to the name of the group whose meta-learner it
+        shares. All tenants share one meta-learner by default.
+    max_resident: int (default=1000)
+        Maximum number of tenants held in memory, the least recently used
+        ones are offloaded beyond.
+    offload_dir: str (default=None)
+        Directory of the checkpoints of the offloaded tenants, a temporary
+        directory by default.
+
+    Attributes
+    ----------
+    n_offloaded: int
+        Number of times a tenant was offloaded to disk.
+    n_restored: int
+        Number of times a tenant was restored from disk.
+    """
+
+    def __init__(
+        self,
+        template,
+        group=None,
+        max_resident: int = 1000,
+        offload_dir: str = None,
+    ):
+        if template.meta_update_mode != "sync":
+            raise ValueError("Tenants only support meta_update_mode='sync'")
+        if template.execution_backend != "serial":
+            raise ValueError("Tenants only support execution_backend='serial'")
+        self.template = template
+        self.group = group
+        self.max_resident = max_resident
+        self.offload_dir = offload_dir
+        self._offload_dir = offload_dir or tempfile.mkdtemp(prefix="kappaml-")
+        self.n_offloaded = 0
+        self.n_restored = 0
+
+        # Resident tenants, least recently used first
+        self._tenants = OrderedDict()
+        self._last_seen = {}
+        self._offloaded = set()
+        self._slots = {}
+        self._free_slots = list(range(max_resident - 1, -1, -1))
+        self._meta_learners = {}
+        self._mfe = template._make_mfe() if template.mfe_backend == "pymfe" else None
+        # Shared backing arrays, allocated on first use
+        self._window_X = None
+        self._window_y = None
+        self._window_bound = set()
+        self._bank_state = None
+
+    def __len__(self):
+        return len(self._tenants) + len(self._offloaded)
+
+    def __contains__(self, tenant_id):
+        return tenant_id in self._tenants or tenant_id in self._offloaded
+
+    @property
+    def resident(self):
+        """Ids of the tenants held in memory, least recently used first."""
+        return list(self._tenants)
+
+    def get(self, tenant_id):
+        """The estimator of a tenant, created or restored if needed."""
+        estimator = self._tenants.get(tenant_id)
+        if estimator is None:
+            if len(self._tenants) >= self.max_resident:
+                self.offload(next(iter(self._tenants)))
+            if tenant_id in self._offloaded:
+                estimator = self._restore(tenant_id)
+            else:
+                estimator = self.template.clone()
+            self._attach(tenant_id, estimator)
+        else:
+            self._tenants.move_to_end(tenant_id)
+        self._last_seen[tenant_id] = time.monotonic()
+        return estimator
+
+    def learn_one(self, tenant_id, x, y):
+        estimator = self.get(tenant_id)
+        estimator.learn_one(x, y)
+        if tenant_id not in self._window_bound:
+            self._bind_window(tenant_id, estimator)
+        return self
+
+    def predict_one(self, tenant_id, x):
+        return self.get(tenant_id).predict_one(x)
+
+    def _meta_learner(self, tenant_id):
+        group = None if self.group is None else self.group(tenant_id)
+        if group not in self._meta_learners:
+            self._meta_learners[group] = self.template.meta_learner.clone()
+        return self._meta_learners[group]
+
+    def _attach(self, tenant_id, estimator):
+        """Make a tenant resident, binding it to the shared components."""
+        estimator.meta_learner = self._meta_learner(tenant_id)
+        if self._mfe is not None:
+            estimator.mfe = self._mfe
+        slot = self._free_slots.pop()
+        self._slots[tenant_id] = slot
+        self._tenants[tenant_id] = estimator
+        self._bind_banks(slot, estimator)
+        self._bind_window(tenant_id, estimator)
+
+    def _bind_banks(self, slot, estimator):
+        banks = (estimator.metrics, estimator.window_metrics)
+        if not all(type(bank) is MetricBank for bank in banks):
+            return
+        if self._bank_state is None:
+            n_models = len(estimator)
+            self._bank_state = {
+                name: np.zeros(
+                    (2, self.max_resident, n_models),
+                    dtype=getattr(banks[0], name).dtype,
+                )
+                for name in _BANK_STATE
+            }
+        for k, bank in enumerate(banks):
+            for name in _BANK_STATE:
+                view = self._bank_state[name][k, slot]
+                view[:] = getattr(bank, name)
+                setattr(bank, name, view)
+
+    def _bind_window(self, tenant_id, estimator):
+        """Move the window arrays of a tenant to its slot, once allocated."""
+        window = estimator.window
+        window._unmap()
+        if window._X is None:
+            return
+        if self._window_X is None:
+            self._window_X = np.empty((self.max_resident,) + window._X.shape)
+            self._window_y = np.empty(
+                (self.max_resident,) + window._y.shape, dtype=window._y.dtype
+            )
+        # Windows of another shape or type keep their own arrays
+        if (
+            window._X.shape == self._window_X.shape[1:]
+            and window._X.dtype == self._window_X.dtype
+            and window._y.dtype == self._window_y.dtype
+        ):
+            slot = self._slots[tenant_id]
+            self._window_X[slot] = window._X
+            self._window_y[slot] = window._y
+            window._X = self._window_X[slot]
+            window._y = self._window_y[slot]
+        self._window_bound.add(tenant_id)
+
+    def _path(self, tenant_id):
+        # Escape the id, so that it names one directory of offload_dir, and
+        # use its repr, so that e.g. 1 and "1" do not share it
+        name = quote(repr(tenant_id), safe="")
+        return os.path.join(self._offload_dir, f"tenant-{name}")
+
+    def offload(self, tenant_id):
+        """Save a resident tenant to disk and release its memory."""
+        estimator = self._tenants.pop(tenant_id)
+        # The shared meta-learner is not part of the checkpoint
+        estimator.meta_learner = None
+        estimator.save(self._path(tenant_id))
+        self._free_slots.append(self._slots.pop(tenant_id))
+        self._window_bound.discard(tenant_id)
+        self._last_seen.pop(tenant_id, None)
+        self._offloaded.add(tenant_id)
+        self.n_offloaded += 1
+
+    def offload_idle(self, max_idle: float):
+        """Offload the tenants without samples for ``max_idle`` seconds.
+
+        Returns
+        -------
+        list
+            The ids of the offloaded tenants.
+        """
+        now = time.monotonic()
+        idle = [t for t in self._tenants if now - self._last_seen[t] >= max_idle]
+        for tenant_id in idle:
+            self.offload(tenant_id)
+        return idle
+
+    def _restore(self, tenant_id):
+        path = self._path(tenant_id)
+        # The checkpoint is deleted, so its arrays are read rather than mapped
+        estimator = load_checkpoint(path, mmap=False)
+        shutil.rmtree(path)
+        self._offloaded.discard(tenant_id)
+        self.n_restored += 1
+        return estimator
+
+    def memory_footprint(self):
+        """Estimated memory used by the manager, in bytes.
+
+        Returns
+        -------
+        dict
+            The footprint of the components shared by the tenants, ``shared``,
+            and of each resident tenant without them, under ``tenants``.
+        """
+        shared = [
+            *self._meta_learners.values(),
+            self._mfe,
+            self._window_X,
+            self._window_y,
+            *(self._bank_state or {}).values(),
+        ]
+        shared = [obj for obj in shared if obj is not None]
+        return {
+            "shared": sum(deep_sizeof(obj) for obj in shared),
+            "tenants": {
+                tenant_id: deep_sizeof(estimator, exclude=shared)
+                for tenant_id, estimator in self._tenants.items()
+            },
+        }
+
+    def close(self):
+        """Release the tenants and delete the offloaded checkpoints."""
+        for estimator in self._tenants.values():
+            estimator.close()
+        self._tenants.clear()
+        for tenant_id in self._offloaded:
+            shutil.rmtree(self._path(tenant_id), ignore_errors=True)
+        self._offloaded.clear()
+        if self.offload_dir is None:
+            shutil.rmtree(self._offload_dir, ignore_errors=True)
@@ -0,0 +1,219 @@
+from numbers import Integral, Number
+
+import numpy as np
+
+
+class WindowBuffer:
+    """Preallocated ring buffer holding the most recent (x, y) pairs.
+
+    Samples are written in place into fixed-shape NumPy arrays, so appending
+    does not allocate. Each row is written twice, at ``pos`` and at
+    ``pos + size``, which makes the chronologically ordered window available as
+    a contiguous, zero-copy slice of the backing array.
+
+    Feature dicts are mapped to columns through a name-to-column mapping that
+    is fixed by the first sample, so extraction no longer depends on dict key
+    order. Features missing from a later sample are filled with ``fill_value``
+    and features that were not present in the first sample are ignored.
+
+    Features are held in a float array as long as they are numeric. The first
+    non-numeric value, e.g. a categorical feature, converts the features to an
+    object array, as targets are, which PyMFE handles as categorical columns.
+    Boolean, integer and other numeric targets are held in a bool, int64 and
+    float array respectively, so that class labels stay discrete. Integer
+    targets are widened to float by the first float one.
+
+    Parameters
+    ----------
+    size: int
+        Maximum number of samples held in the window.
+    fill_value: float (default=0.0)
+        Value used for features missing from a sample.
+    """
+
+    def __init__(self, size: int, fill_value: float = 0.0):
+        self.size = size
+        self.fill_value = fill_value
+        self.columns = None
+        self._X = None
+        self._y = None
+        self._pos = 0
+        self._n = 0
+        self._mapped = False
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def is_full(self):
+        return self._n == self.size
+
+    @property
+    def n_features(self):
+        return 0 if self.columns is None else len(self.columns)
+
+    def _allocate(self, x, y):
+        if isinstance(x, dict):
+            self.columns = {name: i for i, name in enumerate(x)}
+        else:
+            self.columns = {i: i for i in range(len(x))}
+        self._X = np.empty((2 * self.size, len(self.columns)), dtype=float)
+        self._y = np.empty(2 * self.size, dtype=self._dtype(y))
+
+    @staticmethod
+    def _dtype(y):
+        if isinstance(y, (bool, np.bool_)):
+            return np.dtype(bool)
+        if isinstance(y, Integral):
+            return np.dtype(np.int64)
+        if isinstance(y, Number):
+            return np.dtype(float)
+        return np.dtype(object)
+
+    def _widen(self, y):
+        """Convert the targets to a type that also holds ``y``."""
+        dtype = self._dtype(y)
+        if self._y.dtype in (object, dtype):
+            return
+        if np.dtype(bool) in (self._y.dtype, dtype):
+            self._y = self._y.astype(object)
+        else:
+            self._y = self._y.astype(np.result_type(self._y.dtype, dtype))
+
+    def _write_row(self, row, x):
+        if isinstance(x, dict):
+            row.fill(self.fill_value)
+            for name, value in x.items():
+                j = self.columns.get(name)
+                if j is not None:
+                    row[j] = value
+        else:
+            row[:] = x
+
+    def append(self, x, y):
+        """Write a sample in place, overwriting the oldest one if full."""
+        self._unmap()
+        if self._X is None:
+            self._allocate(x, y)
+
+        self._widen(y)
+
+        try:
+            self._write_row(self._X[self._pos], x)
+        except (TypeError, ValueError):
+            # Non-numeric feature
+            self._X = self._X.astype(object)
+            self._write_row(self._X[self._pos], x)
+        self._X[self._pos + self.size] = self._X[self._pos]
+        self._y[self._pos] = y
+        self._y[self._pos + self.size] = y
+
+        self._pos = (self._pos + 1) % self.size
+        self._n = min(self._n + 1, self.size)
+        return self
+
+    def extend(self, X, y):
+        """Write a block of samples in place, given as a DataFrame and targets.
+
+        Columns are aligned on the name-to-column mapping, as in :meth:`append`.
+        """
+        y = np.asarray(y)
+        self._unmap()
+        if self._X is None:
+            self._allocate(dict.fromkeys(X.columns), y[0])
+        self._widen(y[0])
+
+        columns = {name: X[name].to_numpy() for name in self.columns if name in X}
+        if self._X.dtype != object and any(
+            c.dtype.kind not in "biuf" for c in columns.values()
+        ):
+            # Non-numeric feature
+            self._X = self._X.astype(object)
+        block = np.full((len(X), self.n_features), self.fill_value, self._X.dtype)
+        for name, column in columns.items():
+            block[:, self.columns[name]] = column
+        block, y = block[-self.size :], y[-self.size :]
+
+        rows = (self._pos + np.arange(len(block))) % self.size
+        self._X[rows] = block
+        self._X[rows + self.size] = block
+        self._y[rows] = y
+        self._y[rows + self.size] = y
+
+        self._pos = (self._pos + len(block)) % self.size
+        self._n = min(self._n + len(block), self.size)
+        return self
+
+    def _slice(self):
+        if self._mapped:
+            return slice(None)
+        start = self._pos + self.size - self._n
+        return slice(start, start + self._n)
+
+    @property
+    def X(self):
+        """Contiguous view of the window features, oldest sample first."""
+        if self._X is None:
+            return np.empty((0, 0))
+        return self._X[self._slice()]
+
+    @property
+    def y(self):
+        """Contiguous view of the window targets, oldest sample first."""
+        if self._y is None:
+            return np.empty(0)
+        return self._y[self._slice()]
+
+    def _fill(self, X, y):
+        """Allocate the ring buffer and write chronological samples into it."""
+        self._X = np.empty((2 * self.size, X.shape[1]), dtype=X.dtype)
+        self._y = np.empty(2 * self.size, dtype=y.dtype)
+        self._n = len(y)
+        self._X[: self._n] = self._X[self.size : self.size + self._n] = X
+        self._y[: self._n] = self._y[self.size : self.size + self._n] = y
+        self._pos = self._n % self.size
+
+    def resize(self, size: int):
+        """Change the capacity of the window, keeping the most recent samples."""
+        self._unmap()
+        if self._X is None:
+            self.size = size
+        else:
+            X, y = self.X[-size:].copy(), self.y[-size:].copy()
+            self.size = size
+            self._fill(X, y)
+        return self
+
+    def _pack(self):
+        """State holding the chronological window only, see :meth:`_unpack`.
+
+        The window arrays of the state may be replaced by read-only memory-mapped
+        arrays before unpacking, which are then read in place until the window
+        is first written.
+        """
+        state = self.__dict__.copy()
+        if self._X is not None:
+            state["_X"], state["_y"] = self.X, self.y
+        return state
+
+    @classmethod
+    def _unpack(cls, state):
+        """Rebuild a window, and its mirrored rows, from :meth:`_pack`."""
+        window = cls.__new__(cls)
+        window.__dict__.update(state)
+        # Memory-mapped arrays are read in place until the window is written
+        window._mapped = isinstance(window._X, np.memmap)
+        if window._X is not None and not window._mapped:
+            window._fill(window._X, window._y)
+        return window
+
+    def _unmap(self):
+        """Copy the memory-mapped window into a ring buffer before writing."""
+        if self._mapped:
+            self._mapped = False
+            self._fill(np.asarray(self._X), np.asarray(self._y))
+
+    def clear(self):
+        self._unmap()
+        self._pos = 0
+        self._n = 0
@@ -0,0 +1,384 @@
+"""Asyncio inference server for trained models.
+
+The server speaks newline-delimited JSON over TCP or a Unix socket. Each
+request is an object with an ``id``, an ``op`` and its arguments, and is
+answered, possibly out of order, by an object with the same ``id`` and either
+a ``result`` or an ``error``:
+
+- ``{"id": 1, "op": "predict", "x": {...}}``
+- ``{"id": 2, "op": "predict_many", "X": [{...}, ...]}``
+- ``{"id": 3, "op": "learn", "x": {...}, "y": ...}``
+- ``{"id": 4, "op": "learn_many", "X": [{...}, ...], "y": [...]}``
+- ``{"id": 5, "op": "stats"}``
+
+Predictions are grouped in micro-batches of at most ``max_batch_size``
+samples, waiting at most ``max_latency`` seconds for a batch to fill up, and
+are served concurrently from a read-only snapshot of the model. Learning is
+applied in order by a single writer thread on the live model, which refreshes
+the snapshot every ``snapshot_every`` samples, so that predictions never wait
+for updates.
+
+As JSON object keys are strings, the model must have been trained with string
+feature names.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+from kappaml_core.meta.checkpoint import load_checkpoint
+
+
+def load_model(path: str):
+    """Load a model from a checkpoint directory or a pickle file."""
+    if os.path.isdir(path):
+        return load_checkpoint(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _predict_batch(model, xs):
+    # Vectorize when the samples have the same features, so that the frame
+    # holds no missing values that predict_one would not see
+    keys = xs[0].keys()
+    if len(xs) > 1 and hasattr(model, "predict_many"):
+        if all(x.keys() == keys for x in xs):
+            return list(model.predict_many(pd.DataFrame(xs)))
+    return [model.predict_one(x) for x in xs]
+
+
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ModelServer:
+    """Serve predictions and updates of a model over a local socket.
+
+    Parameters
+    ----------
+    model: river.base.Estimator
+        The trained model, e.g. loaded with ``load_model``.
+    max_batch_size: int (default=64)
+        Maximum number of samples predicted or learned at once.
+    max_latency: float (default=0.005)
+        Maximum time in seconds a prediction waits for its batch to fill up.
+    snapshot_every: int (default=100)
+        Number of learned samples after which the snapshot serving the
+        predictions is refreshed from the live model.
+    max_pending_learns: int (default=10_000)
+        Maximum number of samples waiting to be learned, after which learn
+        requests wait for the writer to catch up.
+    n_readers: int (default=2)
+        Number of threads predicting batches concurrently.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 64,
+        max_latency: float = 0.005,
+        snapshot_every: int = 100,
+        max_pending_learns: int = 10_000,
+        n_readers: int = 2,
+    ):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.snapshot_every = snapshot_every
+        self.max_pending_learns = max_pending_learns
+        self.n_readers = n_readers
+        self.snapshot = deepcopy(model)
+        self.snapshot_version = 0
+        self.n_predicted = 0
+        self.n_predict_batches = 0
+        self.n_learned = 0
+        self._since_snapshot = 0
+        self._server = None
+        self._tasks = []
+        self._batches = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: str = None):
+        """Start listening on ``host:port``, or on the Unix socket ``path``."""
+        self._predict_queue = asyncio.Queue()
+        self._learn_queue = asyncio.Queue(maxsize=self.max_pending_learns)
+        self._readers = ThreadPoolExecutor(self.n_readers)
+        self._writer = ThreadPoolExecutor(1)
+        self._tasks = [
+            asyncio.create_task(self._batch_predictions()),
+            asyncio.create_task(self._write()),
+        ]
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self
+
+    @property
+    def address(self):
+        """Address the server listens on, e.g. to connect to an ephemeral port."""
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def stop(self):
+        """Stop accepting connections and apply the pending updates."""
+        self._server.close()
+        await self._server.wait_closed()
+        await self._learn_queue.join()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._readers.shutdown()
+        self._writer.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            "n_predicted": self.n_predicted,
+            "n_predict_batches": self.n_predict_batches,
+            "n_learned": self.n_learned,
+            "pending_learns": self._learn_queue.qsize(),
+            "snapshot_version": self.snapshot_version,
+        }
+
+    # ---- Predictions ----
+
+    async def predict(self, x: dict):
+        future = asyncio.get_running_loop().create_future()
+        await self._predict_queue.put((x, future))
+        return await future
+
+    async def _batch_predictions(self):
+        loop = asyncio.get_running_loop()
+        queue = self._predict_queue
+        get = None
+        while True:
+            if get is None:
+                get = asyncio.ensure_future(queue.get())
+            batch = [await get]
+            get = None
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                # A pending get is kept for the next batch instead of being
+                # cancelled, so that no request is lost on timeout
+                get = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({get}, timeout=timeout)
+                if not done:
+                    break
+                batch.append(get.result())
+                get = None
+
+            task = asyncio.create_task(self._predict_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _predict_batch(self, batch):
+        xs = [x for x, _ in batch]
+        try:
+            y_preds = await asyncio.get_running_loop().run_in_executor(
+                self._readers, _predict_batch, self.snapshot, xs
+            )
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.n_predicted += len(batch)
+        self.n_predict_batches += 1
+        for (_, future), y_pred in zip(batch, y_preds):
+            future.set_result(y_pred)
+
+    # ---- Updates ----
+
+    async def learn(self, x: dict, y):
+        future = asyncio.get_running_loop().create_future()
+        await self._learn_queue.put((x, y, future))
+        return await future
+
+    async def _write(self):
+        loop = asyncio.get_running_loop()
+        queue = self._learn_queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.max_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                await loop.run_in_executor(
+                    self._writer, self._learn_batch, [(x, y) for x, y, _ in batch]
+                )
+            except Exception as e:
+                for *_, future in batch:
+                    future.set_exception(e)
+            else:
+                for *_, future in batch:
+                    future.set_result(True)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _learn_batch(self, samples):
+        # Only ever runs on the writer thread
+        for x, y in samples:
+            self.model.learn_one(x, y)
+            self.n_learned += 1
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_every:
+                self.snapshot = deepcopy(self.model)
+                self.snapshot_version += 1
+                self._since_snapshot = 0
+
+    # ---- Protocol ----
+
+    async def _dispatch(self, request):
+        op = request.get("op")
+        if op == "predict":
+            return await self.predict(request["x"])
+        if op == "predict_many":
+            return await asyncio.gather(*(self.predict(x) for x in request["X"]))
+        if op == "learn":
+            return await self.learn(request["x"], request["y"])
+        if op == "learn_many":
+            await asyncio.gather(
+                *(self.learn(x, y) for x, y in zip(request["X"], request["y"]))
+            )
+            return True
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"Unknown op {op!r}")
+
+    async def _respond(self, request, writer):
+        response = {"id": request.get("id")}
+        try:
+            response["result"] = await self._dispatch(request)
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        writer.write(json.dumps(response, default=_to_json).encode() + b"\n")
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        pending = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    writer.write(json.dumps({"id": None, "error": str(e)}).encode())
+                    writer.write(b"\n")
+                    continue
+                task = asyncio.create_task(self._respond(request, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+
+class ModelClient:
+    """Asyncio client of a :class:`ModelServer`.
+
+    Requests can be sent concurrently over the same connection, e.g. with
+    ``asyncio.gather``. Errors returned by the server are raised as
+    ``RuntimeError``.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._pending = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 8765, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        while line := await self._reader.readline():
+            response = json.loads(line)
+            future = self._pending.pop(response["id"])
+            if "error" in response:
+                future.set_exception(RuntimeError(response["error"]))
+            else:
+                future.set_result(response["result"])
+        for future in self._pending.values():
+            future.set_exception(ConnectionError("Connection closed by the server"))
+
+    async def request(self, op: str, **kwargs):
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        request = {"id": request_id, "op": op, **kwargs}
+        self._writer.write(json.dumps(request, default=_to_json).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def predict(self, x: dict):
+        return await self.request("predict", x=x)
+
+    async def predict_many(self, X: list) -> list:
+        return await self.request("predict_many", X=X)
+
+    async def learn(self, x: dict, y):
+        return await self.request("learn", x=x, y=y)
+
+    async def learn_many(self, X: list, y: list):
+        return await self.request("learn_many", X=X, y=y)
+
+    async def stats(self) -> dict:
+        return await self.request("stats")
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        await self._receiver
+
+
+async def serve(
+    path: str,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: str = None,
+    **kwargs,
+):
+    """Load the model at ``path`` and serve it until cancelled.
+
+    Parameters
+    ----------
+    path: str
+        Checkpoint directory or pickle file of the model.
+    host: str (default='127.0.0.1')
+        Host to listen on.
+    port: int (default=8765)
+        Port to listen on.
+    socket_path: str (default=None)
+        Listen on this Unix socket instead of TCP.
+    kwargs
+        Other parameters of :class:`ModelServer`.
+    """
+    server = ModelServer(load_model(path), **kwargs)
+    await server.start(host, port, path=socket_path)
+    address = socket_path or "{}:{}".format(*server.address[:2])
+    print(f"Serving {path} on {address}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
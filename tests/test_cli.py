@@ -1,6 +1,10 @@
+import json
+import subprocess
+import sys
+
 import pytest
 
-from kappaml_core.cli import fib, main
+from kappaml_core.cli import default_dataset, evaluate_models, fib, main
 
 __author__ = "Alex Imbrea"
 __copyright__ = "Alex Imbrea"
@@ -16,6 +20,18 @@ def test_fib():
         fib(-10)
 
 
+def test_cli_imports_lazily():
+    """Heavy dependencies are not imported before a command needs them"""
+    code = (
+        "import sys, kappaml_core.cli, kappaml_core.meta.knowledge\n"
+        "print(sorted({'river', 'pandas', 'pymfe'} & set(sys.modules)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == "[]"
+
+
 def test_main_fib(capsys):
     """CLI Test Fib Command"""
     main(["fib", "7"])
@@ -35,3 +51,33 @@ def test_main_demo_classifier(capsys):
     main(["demo", "meta_classifier"])
     captured = capsys.readouterr()
     assert "Meta classifier model selection" in captured.out
+
+
+def test_main_evaluate(capsys, tmp_path):
+    """CLI Test Evaluate Command"""
+    output = tmp_path / "results.json"
+    main(
+        ["evaluate", "greedy", "meta_regressor", "--n-samples", "300", "-j", "2"]
+        + ["--step", "100", "-o", str(output)]
+    )
+    captured = capsys.readouterr()
+    assert "greedy: MAE" in captured.out
+    assert "meta_regressor: MAE" in captured.out
+
+    with open(output) as f:
+        results = json.load(f)
+    assert results["errors"] == {}
+    assert list(results["results"]) == ["greedy", "meta_regressor"]
+    assert [r["step"] for r in results["results"]["greedy"]] == [100, 200, 300]
+
+    main(["evaluate", "greedy", "--n-samples", "300", "-o", str(tmp_path / "r.csv")])
+    with open(tmp_path / "r.csv") as f:
+        assert f.readline().startswith("model,step,MAE,RMSE")
+
+
+def test_evaluate_recommenders_need_reco_datasets():
+    """Recommenders default to a dataset with users and items"""
+    assert default_dataset(["greedy", "funk_mf"]) == "movielens100k"
+    assert default_dataset(["greedy"]) == "phishing"
+    with pytest.raises(ValueError, match="user and item"):
+        evaluate_models(["greedy", "biased_mf"], "phishing")
@@ -0,0 +1,68 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from kappaml_core.datasets import MovieLens25M
+
+__author__ = "Alex Imbrea"
+__copyright__ = "Alex Imbrea"
+__license__ = "Apache-2.0"
+
+RATINGS = [
+    (1, 296, 5.0, 1147880044),
+    (1, 306, 3.5, 1147868817),
+    (2, 307, 4.0, 1147868828),
+    (3, 665, 0.5, 1147878820),
+    (3, 899, 3.5, 1147868510),
+]
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setenv("RIVER_DATA", str(tmp_path / "river_data"))
+    path = tmp_path / "ml-25m.zip"
+    lines = ["userId,movieId,rating,timestamp"] + [
+        ",".join(str(v) for v in row) for row in RATINGS
+    ]
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("ml-25m/ratings.csv", "\n".join(lines) + "\n")
+        zf.writestr("ml-25m/movies.csv", "movieId,title,genres\n")
+    return path
+
+
+def test_movielens_local_archive(archive):
+    dataset = MovieLens25M(archive=str(archive))
+    samples = list(dataset)
+
+    assert dataset.is_prepared
+    assert samples == [
+        ({"user": u, "item": i, "timestamp": t}, r) for u, i, r, t in RATINGS
+    ]
+    assert all(type(v) is int for v in samples[0][0].values())
+
+    # The cache is used once built, without the CSV file or the archive
+    dataset.path.unlink()
+    archive.unlink()
+    assert list(MovieLens25M()) == samples
+
+    columns = dataset.load_columns()
+    assert isinstance(columns["rating"], np.memmap)
+    assert columns["userId"].dtype == np.int32
+
+    batches = list(dataset.iter_batches(batch_size=2))
+    assert [len(X) for X, _ in batches] == [2, 2, 1]
+    X, y = batches[1]
+    assert list(X.columns) == ["user", "item", "timestamp"]
+    assert X.index.tolist() == [2, 3]
+    assert y.tolist() == [4.0, 0.5]
+
+
+def test_movielens_extracted_directory(archive, tmp_path):
+    with zipfile.ZipFile(archive) as zf:
+        zf.extractall(tmp_path / "extracted")
+
+    dataset = MovieLens25M(archive=str(tmp_path / "extracted" / "ml-25m"))
+    assert dataset.is_downloaded
+    dataset.prepare(chunk_size=2)
+    assert [y for _, y in dataset] == [r for _, _, r, _ in RATINGS]
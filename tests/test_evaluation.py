@@ -0,0 +1,105 @@
+import pickle
+
+import numpy as np
+import pytest
+from river import datasets, linear_model, metrics, optim, preprocessing
+from river.evaluate import progressive_val_score
+
+from kappaml_core.datasets import MovieLens25M
+from kappaml_core.evaluation import SharedStream, evaluate_parallel
+
+__author__ = "Alex Imbrea"
+__copyright__ = "Alex Imbrea"
+__license__ = "Apache-2.0"
+
+
+def test_shared_stream_roundtrip():
+    samples = [
+        ({"a": 1.5, "b": True, "c": "x", "d": 3}, "yes"),
+        ({"a": -2.0, "b": False, "c": "y"}, "no"),
+        ({"b": True, "c": "x", "d": 7}, "yes"),
+    ]
+    stream = SharedStream(samples)
+    try:
+        assert list(stream) == samples
+        assert [type(v) for v in next(iter(stream))[0].values()] == [
+            float,
+            bool,
+            str,
+            int,
+        ]
+
+        # Workers receive the name of the shared memory, not the data
+        payload = pickle.dumps(stream)
+        assert len(payload) < 1_000
+        attached = pickle.loads(payload)
+        assert list(attached) == samples
+        attached.close()
+    finally:
+        stream.close()
+
+
+def test_shared_stream_chunks():
+    """Chunks see new features, and columns turning categorical late"""
+    samples = [
+        ({"a": 1, "b": 0.5}, 1.0),
+        ({"a": 2}, 2.0),
+        ({"a": "x", "c": True}, 3.0),
+        ({"a": 3, "c": False}, "high"),
+    ]
+    for chunk_size in (1, 2, 3, 10):
+        stream = SharedStream(samples, chunk_size=chunk_size)
+        try:
+            assert list(stream) == samples
+            assert [type(x["a"]) for x, _ in stream] == [int, int, str, int]
+        finally:
+            stream.close()
+
+
+def test_shared_stream_from_columns(tmp_path, monkeypatch):
+    """Columnar datasets are copied batch by batch, not iterated"""
+    monkeypatch.setenv("RIVER_DATA", str(tmp_path / "river_data"))
+    ratings = np.array([[1, 296, 5.0, 1147880044], [1, 306, 3.5, 1147868817]] * 3)
+    lines = ["userId,movieId,rating,timestamp"]
+    lines += [f"{int(u)},{int(i)},{r},{int(t)}" for u, i, r, t in ratings]
+    (tmp_path / "ratings.csv").write_text("\n".join(lines) + "\n")
+    dataset = MovieLens25M(archive=str(tmp_path))
+    samples = list(dataset)
+
+    def fail(self):
+        raise AssertionError("The dataset was iterated sample by sample")
+
+    monkeypatch.setattr(MovieLens25M, "_iter", fail)
+    for n_samples, chunk_size in ((None, 4), (5, 2), (None, 100)):
+        stream = SharedStream(dataset, n_samples=n_samples, chunk_size=chunk_size)
+        try:
+            assert list(stream) == samples[:n_samples]
+            x, y = next(iter(stream))
+            assert [type(v) for v in x.values()] == [int, int, int]
+            assert type(y) is float
+        finally:
+            stream.close()
+
+    with pytest.raises(AssertionError):
+        list(dataset)
+
+
+def test_evaluate_parallel_matches_serial():
+    def make_model(lr):
+        return preprocessing.StandardScaler() | linear_model.LinearRegression(
+            optimizer=optim.SGD(lr=lr)
+        )
+
+    dataset = datasets.TrumpApproval()
+    candidates = {
+        f"lr={lr}": (make_model(lr), metrics.MAE()) for lr in (0.001, 0.01, 0.1)
+    }
+    results, errors = evaluate_parallel(candidates, dataset, n_workers=2, step=500)
+
+    assert errors == {}
+    assert list(results) == list(candidates)
+    for lr in (0.001, 0.01, 0.1):
+        expected = progressive_val_score(dataset, make_model(lr), metrics.MAE())
+        final = results[f"lr={lr}"][-1]
+        assert final["step"] == 1001
+        assert final["MAE"] == expected.get()
@@ -0,0 +1,1144 @@
+import json
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from pymfe.mfe import MFE
+from river import (
+    datasets,
+    dummy,
+    linear_model,
+    metrics,
+    optim,
+    preprocessing,
+    stats,
+    tree,
+)
+
+from kappaml_core.meta import (
+    DriftScheduler,
+    KnowledgeBase,
+    MemoryBudget,
+    MetaClassifier,
+    MetaFeatureCache,
+    MetaRegressor,
+    NearestNeighborMetaLearner,
+    SuccessiveHalvingPruner,
+    TenantManager,
+    WindowSubsampler,
+    split_shared_prefix,
+)
+from kappaml_core.meta.background import BackgroundMetaUpdater
+from kappaml_core.meta.execution import ProcessExecutor
+from kappaml_core.meta.memory import deep_sizeof
+from kappaml_core.meta.metric_bank import MetricBank, RiverMetricBank, make_metric_bank
+from kappaml_core.meta.streaming_mfe import GENERAL_FEATURES, StreamingMFE
+from kappaml_core.meta.window import WindowBuffer
+
+__author__ = "Alex Imbrea"
+__copyright__ = "Alex Imbrea"
+__license__ = "Apache-2.0"
+
+
+def make_models(lrs=(0.01, 0.05, 0.1)):
+    return [
+        preprocessing.StandardScaler()
+        | linear_model.LinearRegression(optimizer=optim.SGD(lr=lr))
+        for lr in lrs
+    ]
+
+
+def stream(n=500):
+    return list(datasets.synth.Friedman(seed=42).take(n))
+
+
+def test_streaming_mfe_matches_pymfe():
+    """Streaming meta-features equal PyMFE on the last window"""
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(500, 4)) + 3
+    y = rng.integers(0, 3, size=500)
+
+    extractor = StreamingMFE(groups=["general", "statistical"], window_size=100)
+    for xi, yi in zip(X, y):
+        extractor.update(xi, yi)
+    names, values = extractor.extract()
+
+    mfe = MFE(groups=["general", "statistical"], suppress_warnings=True)
+    mfe.fit(X[-100:], y[-100:], suppress_warnings=True)
+    expected = dict(zip(*mfe.extract(suppress_warnings=True)))
+
+    for name, value in zip(names, values):
+        assert value == pytest.approx(expected[name], rel=1e-6, nan_ok=True), name
+
+
+def test_streaming_mfe_general_group_only():
+    """The general group skips the statistical accumulators"""
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(300, 4)).round()
+    y = rng.integers(0, 3, size=300)
+
+    general = StreamingMFE(groups=["general"], window_size=100, refresh_every=30)
+    both = StreamingMFE(groups=["general", "statistical"], window_size=100)
+    for xi, yi in zip(X, y):
+        general.update(xi, yi)
+        both.update(xi, yi)
+
+    assert not hasattr(general, "cross") and general.mins == []
+    assert general.class_sums == {}
+    names, values = general.extract()
+    expected = dict(zip(*both.extract()))
+    assert names == [n for n in expected if n.split(".")[0] in GENERAL_FEATURES]
+    assert values == [expected[n] for n in names]
+
+    restored = StreamingMFE._unpack(general._pack())
+    assert restored.extract() == (names, values)
+
+
+def test_streaming_mfe_rejects_unknown_groups():
+    with pytest.raises(ValueError):
+        StreamingMFE(groups=["model-based"])
+
+
+def test_meta_regressor_streaming_backend():
+    """The streaming backend is a drop-in alternative to PyMFE"""
+    model = MetaRegressor(
+        models=make_models(),
+        window_size=50,
+        meta_update_frequency=25,
+        mfe_backend="streaming",
+    )
+    for x, y in stream():
+        model.predict_one(x)
+        model.learn_one(x, y)
+    assert model.best_model in model.models
+
+
+def test_window_buffer_order_and_columns():
+    """The window is a chronological view with a stable column mapping"""
+    window = WindowBuffer(3)
+    for i in range(5):
+        # Key order changes between samples
+        x = {"b": -i, "a": i} if i % 2 else {"a": i, "b": -i}
+        window.append(x, float(i))
+
+    assert len(window) == 3
+    assert window.X.flags["C_CONTIGUOUS"]
+    assert np.shares_memory(window.X, window._X)
+    np.testing.assert_array_equal(window.X, [[2, -2], [3, -3], [4, -4]])
+    np.testing.assert_array_equal(window.y, [2.0, 3.0, 4.0])
+
+    # Shrinking keeps the most recent samples, in order
+    window.resize(2).append({"a": 5, "b": -5}, 5.0)
+    np.testing.assert_array_equal(window.X, [[4, -4], [5, -5]])
+    np.testing.assert_array_equal(window.y, [4.0, 5.0])
+
+
+def test_window_buffer_integer_targets(tmp_path):
+    """Integer class labels stay integers, also once checkpointed"""
+    window = WindowBuffer(3).append([0.0], 1).append([1.0], 2)
+    assert window.y.dtype == np.int64
+    assert window.append([2.0], 2.5).y.tolist() == [1.0, 2.0, 2.5]
+    assert WindowBuffer(3).append([0.0], True).append([1.0], 2).y.dtype == object
+
+    rng = np.random.default_rng(42)
+    cache = MetaFeatureCache()
+    model = MetaClassifier(
+        models=[tree.HoeffdingTreeClassifier(max_depth=d) for d in (1, 3)],
+        window_size=50,
+        meta_update_frequency=25,
+        mfe_cache=cache,
+    )
+    for _ in range(100):
+        x = {"a": rng.random(), "b": rng.random()}
+        model.learn_one(x, int(x["a"] * 3))
+
+    model.save(tmp_path)
+    restored = MetaClassifier.load(tmp_path)
+    assert restored.window.y.dtype == np.int64
+    np.testing.assert_array_equal(restored.window.y, model.window.y)
+    # The targets are summarized by their class frequencies
+    y_summary = cache.key(restored.window.X, restored.window.y)[-1]
+    assert [c for c, _ in y_summary] == ["0", "1", "2"]
+    assert sum(f for _, f in y_summary) == pytest.approx(1.0)
+
+
+def test_window_buffer_categorical_features():
+    """Non-numeric features switch the window to an object array"""
+    window = WindowBuffer(3)
+    window.append({"a": 1.0, "city": 0}, True)
+    assert window.X.dtype == float
+    window.append({"a": 2.0, "city": "rome"}, False)
+    window.extend(pd.DataFrame({"a": [3.0], "city": ["oslo"]}), [True])
+    assert window.X.dtype == object
+    assert window.X.tolist() == [[1.0, 0], [2.0, "rome"], [3.0, "oslo"]]
+
+    rng = np.random.default_rng(42)
+    model = MetaClassifier(
+        models=[tree.HoeffdingTreeClassifier(max_depth=d) for d in (1, 3)],
+        window_size=50,
+        meta_update_frequency=25,
+    )
+    for _ in range(100):
+        x = {"a": rng.random(), "city": rng.choice(["rome", "paris", "oslo"])}
+        model.learn_one(x, x["city"] == "rome" or x["a"] > 0.8)
+    assert model._extract_meta_features()["nr_cat"] == 1
+
+    with pytest.raises(ValueError, match="pymfe"):
+        StreamingMFE(window_size=50).update({"city": "rome"}, True)
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_parallel_execution_matches_serial(backend):
+    """Parallel backends give the same predictions as serial execution"""
+    data = stream(300)
+    predictions = {}
+    for name in ["serial", backend]:
+        model = MetaRegressor(
+            models=make_models((0.01, 0.02, 0.05, 0.1)),
+            window_size=50,
+            meta_update_frequency=25,
+            execution_backend=name,
+            n_workers=2,
+        )
+        predictions[name] = []
+        for x, y in data:
+            predictions[name].append(model.predict_one(x))
+            model.learn_one(x, y)
+        model.close()
+        predictions[name].append([m.predict_one(data[0][0]) for m in model.models])
+    assert predictions["serial"] == predictions[backend]
+
+
+class FailingRegressor(dummy.StatisticRegressor):
+    """Regressor raising on a given target"""
+
+    def __init__(self, fail_on):
+        super().__init__(stats.Mean())
+        self.fail_on = fail_on
+
+    def learn_one(self, x, y):
+        if y == self.fail_on:
+            raise ValueError("Cannot learn")
+        super().learn_one(x, y)
+
+
+def test_process_worker_errors_are_raised():
+    """A model raising in a worker raises in the caller, the pool survives"""
+    data = stream(10)
+    executor = ProcessExecutor(
+        [dummy.StatisticRegressor(stats.Mean()), FailingRegressor(data[3][1])],
+        n_workers=2,
+    )
+    try:
+        for x, y in data[:3]:
+            executor.learn_predict_one(x, y)
+        with pytest.raises(ValueError, match="Cannot learn"):
+            executor.learn_predict_one(*data[3])
+        # The replies of both workers were read, the next sample is served
+        assert executor.learn_predict_one(*data[4])[0] == pytest.approx(
+            np.mean([y for _, y in data[:4]])
+        )
+        assert executor.predict_one(1, data[5][0]) is not None
+    finally:
+        executor.close()
+
+
+def test_learn_many_matches_learn_one_replay():
+    """Mini-batches trigger the same meta-updates as a learn_one replay"""
+    data = stream(400)
+    X = pd.DataFrame([x for x, _ in data])
+    y = pd.Series([y for _, y in data])
+
+    def make():
+        return MetaRegressor(
+            models=[tree.HoeffdingTreeRegressor(grace_period=g) for g in (20, 50)],
+            window_size=50,
+            meta_update_frequency=25,
+        )
+
+    replay = make()
+    for x, yi in data:
+        replay.learn_one(x, yi)
+
+    batched = make()
+    for start in range(0, len(X), 64):
+        batched.learn_many(X[start : start + 64], y[start : start + 64])
+
+    assert batched.sample_counter == replay.sample_counter
+    assert batched._best_index == replay._best_index
+    np.testing.assert_array_equal(batched.window.X, replay.window.X)
+    assert [m.get() for m in batched.metrics] == [m.get() for m in replay.metrics]
+    pd.testing.assert_series_equal(
+        batched.predict_many(X.to_numpy()),
+        pd.Series([replay.predict_one(x) for x, _ in data]),
+    )
+
+
+def test_mini_batch_models_learn_many(monkeypatch):
+    """Models with mini-batch methods go through predict_many and learn_many"""
+    # String feature names, as River's mini-batch linear models need them
+    data = [({f"x{k}": v for k, v in x.items()}, y) for x, y in stream(300)]
+    X = pd.DataFrame([x for x, _ in data])
+    y = pd.Series([y for _, y in data])
+
+    def make():
+        return MetaRegressor(
+            models=make_models((0.01, 0.05)), window_size=50, meta_update_frequency=25
+        )
+
+    replay = make()
+    for x, yi in data:
+        replay.learn_one(x, yi)
+
+    def learn_one(*args, **kwargs):
+        raise AssertionError("learn_one called on a mini-batch model")
+
+    monkeypatch.setattr(linear_model.LinearRegression, "learn_one", learn_one)
+
+    # Single-sample mini-batches are exactly sample by sample updates
+    batched = make()
+    for start in range(len(X)):
+        batched.learn_many(X[start : start + 1], y[start : start + 1])
+    assert batched._best_index == replay._best_index
+    np.testing.assert_allclose(
+        [m.get() for m in batched.metrics], [m.get() for m in replay.metrics]
+    )
+    np.testing.assert_allclose(
+        batched.predict_many(X), [replay.predict_one(x) for x, _ in data]
+    )
+
+    # Larger mini-batches train on whole chunks, on the same schedule
+    batched = make()
+    for start in range(0, len(X), 64):
+        batched.learn_many(X[start : start + 64], y[start : start + 64])
+    assert batched.sample_counter == replay.sample_counter
+    np.testing.assert_array_equal(batched.window.X, replay.window.X)
+    assert batched._extract_meta_features() == replay._extract_meta_features()
+
+
+def test_async_meta_updates():
+    """Background meta-updates end up in the same state as inline ones"""
+    data = stream(400)
+    models = {}
+    for mode in ["sync", "async"]:
+        model = MetaRegressor(
+            models=make_models(),
+            meta_learner=tree.HoeffdingTreeClassifier(grace_period=2),
+            window_size=50,
+            meta_update_frequency=25,
+            meta_update_mode=mode,
+            max_pending_updates=4,
+            drop_policy="block",
+        )
+        for x, y in data:
+            model.learn_one(x, y)
+        model.flush()
+        models[mode] = model
+
+    assert models["async"]._updater.n_completed == 15
+    assert models["async"]._updater.n_dropped == 0
+    assert models["async"]._best_index == models["sync"]._best_index
+    models["async"].close()
+
+
+class BrokenMFE:
+    def fit(self, X, y, **kwargs):
+        raise ValueError("broken extractor")
+
+
+def test_failed_meta_updates_are_skipped_in_both_modes():
+    """A failed extraction skips the meta-update with a warning in both modes"""
+    models = {}
+    for mode in ["sync", "async"]:
+        model = MetaRegressor(
+            models=make_models(),
+            window_size=50,
+            meta_update_frequency=25,
+            meta_update_mode=mode,
+            max_pending_updates=4,
+            drop_policy="block",
+        )
+        model.mfe = BrokenMFE()
+        with pytest.warns(RuntimeWarning, match="broken extractor"):
+            for x, y in stream(200):
+                model.learn_one(x, y)
+            model.flush()
+        assert model.meta_learner.predict_proba_one({}) == {}
+        models[mode] = model
+
+    assert models["sync"].sample_counter == models["async"].sample_counter
+    np.testing.assert_array_equal(
+        models["sync"].window_metrics.get(), models["async"].window_metrics.get()
+    )
+    assert models["async"]._updater.n_completed == (200 - 50) // 25 + 1
+    assert models["async"]._updater.n_failed == 0
+    models["async"].close()
+
+
+@pytest.mark.parametrize("policy, expected", [("oldest", [0, 2]), ("newest", [0, 1])])
+def test_background_updater_drop_policy(policy, expected):
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def update(i):
+        started.set()
+        release.wait()
+        seen.append(i)
+
+    updater = BackgroundMetaUpdater(update, max_pending=1, drop_policy=policy)
+    updater.submit(0)
+    started.wait()
+    for i in (1, 2):
+        updater.submit(i)
+    release.set()
+    updater.close()
+
+    assert seen == expected
+    assert updater.n_dropped == 1
+
+
+def test_lazy_evaluation():
+    """Non-selected models are only evaluated on every k-th sample"""
+    model = MetaRegressor(
+        models=make_models(), window_size=300, meta_update_frequency=500, eval_every=3
+    )
+    for x, y in stream(300):
+        model.learn_one(x, y)
+
+    counts = [scores.mean.n for scores in model.window_scores]
+    assert counts == [300, 100, 100]
+    assert all(np.isfinite(model.window_metric_std_errors()))
+
+
+def test_mfe_cache_on_repetitive_stream():
+    """Identical windows are served from the cache"""
+    cache = MetaFeatureCache(fingerprint="hash")
+    model = MetaRegressor(
+        models=make_models(),
+        window_size=50,
+        meta_update_frequency=50,
+        mfe_cache=cache,
+    )
+    for x, y in stream(50) * 6:
+        model.learn_one(x, y)
+
+    assert (cache.hits, cache.misses) == (5, 1)
+    assert len(cache) == 1
+
+
+def test_profiling():
+    """Each phase of the hot path is timed when profiling is enabled"""
+    model = MetaRegressor(
+        models=make_models(), window_size=50, meta_update_frequency=25, profile=True
+    )
+    for x, y in stream(200):
+        model.predict_one(x)
+        model.learn_one(x, y)
+
+    report = model.profiler.to_dict()
+    assert report["learn_one"]["count"] == 200
+    assert report["predict"]["count"] == 200
+    assert report["meta_features"]["count"] == report["meta_learner"]["count"] == 7
+    assert report["models"]["histogram"][float("inf")] == 200
+
+    text = model.profiler.to_prometheus()
+    assert 'kappaml_meta_phase_duration_seconds_count{phase="models"} 200' in text
+
+    assert MetaRegressor(models=make_models()).profiler is None
+
+
+def test_drift_scheduler():
+    """Meta-updates follow drift, bounded by the min and max intervals"""
+    data = [(x, y + (50 if i >= 600 else 0)) for i, (x, y) in enumerate(stream(1200))]
+    model = MetaRegressor(
+        models=make_models(),
+        window_size=50,
+        profile=True,
+        scheduler=DriftScheduler(min_interval=20, max_interval=400),
+    )
+    for x, y in data:
+        model.learn_one(x, y)
+
+    assert model.scheduler.n_drifts >= 1
+    # Two updates from max_interval before the drift, at least one after it
+    assert 3 <= model.profiler.to_dict()["meta_learner"]["count"] < 1200 / 50
+
+
+def test_drift_scheduler_learn_many():
+    """Mini-batches run until the next drift check, and match learn_one"""
+    data = [
+        ({f"x{k}": v for k, v in x.items()}, y + (50 if i >= 600 else 0))
+        for i, (x, y) in enumerate(stream(1200))
+    ]
+    X = pd.DataFrame([x for x, _ in data])
+    y = pd.Series([y for _, y in data])
+
+    def make_model():
+        # Models replayed sample by sample, so that both paths see the same errors
+        return MetaRegressor(
+            models=[
+                preprocessing.StandardScaler() | linear_model.PARegressor(C=c)
+                for c in (0.01, 0.1, 1.0)
+            ],
+            window_size=50,
+            profile=True,
+            scheduler=DriftScheduler(min_interval=20, max_interval=400),
+        )
+
+    replay = make_model()
+    for x, yi in data:
+        replay.learn_one(x, yi)
+
+    model = make_model()
+    chunks = []
+    extend = model.window.extend
+
+    def spy(X_chunk, y_chunk):
+        chunks.append(len(X_chunk))
+        extend(X_chunk, y_chunk)
+
+    model.window.extend = spy
+    for start in range(0, len(X), 200):
+        model.learn_many(X.iloc[start : start + 200], y.iloc[start : start + 200])
+
+    assert model.sample_counter == replay.sample_counter
+    assert model.scheduler.n_drifts == replay.scheduler.n_drifts >= 1
+    assert (
+        model.profiler.to_dict()["meta_learner"]["count"]
+        == replay.profiler.to_dict()["meta_learner"]["count"]
+    )
+    # ADWIN checks every 32 samples, far fewer chunks than samples
+    assert len(chunks) < len(X) / 8
+
+
+def test_window_subsampler():
+    """Subsampled windows keep their structure"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 100))
+    y = np.array(["a"] * 240 + ["b"] * 60, dtype=object)
+
+    Xp, yp = WindowSubsampler("projection", n_components=16).transform(X, y)
+    assert Xp.shape == (300, 16) and yp is y
+    Xq, _ = WindowSubsampler("projection", n_components=16).transform(X, y)
+    np.testing.assert_array_equal(Xp, Xq)
+
+    Xh, _ = WindowSubsampler("hash", n_components=16).transform(X, y)
+    assert Xh.shape == (300, 16)
+    # Kept columns are exact copies, and the same ones for every window
+    kept = [j for j in range(100) if any((X[:, j] == Xh.T).all(axis=1))]
+    assert len(kept) == 16
+    X_next = rng.normal(size=(300, 100))
+    Xn, _ = WindowSubsampler("hash", n_components=16).transform(X_next, y)
+    np.testing.assert_array_equal(Xn, X_next[:, kept])
+    # Most of the subset is also kept by streams with a few more features
+    X_wide = np.hstack([X, rng.normal(size=(300, 20))])
+    Xw, _ = WindowSubsampler("hash", n_components=16).transform(X_wide, y)
+    assert sum((Xh[:, [k]] == Xw).all(axis=0).any() for k in range(16)) >= 12
+
+    Xr, yr = WindowSubsampler("rows", n_rows=50).transform(X, y)
+    assert Xr.shape == (50, 100)
+    assert list(yr).count("b") == 10
+
+    _, yr = WindowSubsampler("rows", n_rows=50).transform(X, X[:, 0])
+    assert len(yr) == 50
+    assert np.median(yr) == pytest.approx(np.median(X[:, 0]), abs=0.3)
+
+    with pytest.raises(ValueError):
+        WindowSubsampler("pca")
+
+
+def test_meta_regressor_subsampled_meta_features():
+    """Meta-features are extracted on the subsampled window"""
+    data = stream(300)
+    model = MetaRegressor(
+        models=make_models(),
+        window_size=100,
+        mfe_subsampler=WindowSubsampler("hash", n_components=4),
+    )
+    for x, y in data:
+        model.learn_one(x, y)
+    assert model._extract_meta_features()["nr_attr"] == 4
+
+    with pytest.raises(ValueError):
+        MetaRegressor(
+            models=make_models(),
+            mfe_backend="streaming",
+            mfe_subsampler=WindowSubsampler(),
+        )
+
+
+@pytest.mark.parametrize(
+    "metric, task",
+    [
+        (metrics.MAE(), "regression"),
+        (metrics.RMSE(), "regression"),
+        (metrics.Accuracy(), "classification"),
+        (metrics.F1(), "classification"),
+    ],
+)
+def test_metric_bank_matches_river_metrics(metric, task):
+    """Vectorized metrics agree with River, whether updated one by one or at once"""
+    rng = np.random.default_rng(42)
+    n_models, n = 4, 300
+    if task == "regression":
+        y = rng.normal(size=n).tolist()
+        y_preds = (rng.normal(size=(n_models, n)) + y).tolist()
+    else:
+        y = (rng.random(n) < 0.4).tolist()
+        y_preds = (rng.random((n_models, n)) < 0.5).tolist()
+    # Models not evaluated on some samples
+    for i, j in zip(rng.integers(n_models, size=100), rng.integers(n, size=100)):
+        y_preds[i][j] = None
+
+    bank = make_metric_bank(metric, n_models)
+    batched = make_metric_bank(metric, n_models)
+    river_bank = RiverMetricBank(metric, n_models)
+    assert isinstance(bank, MetricBank)
+    for j, yj in enumerate(y):
+        bank.update(yj, [preds[j] for preds in y_preds])
+        river_bank.update(yj, [preds[j] for preds in y_preds])
+    batched.update_many(y[:100], [preds[:100] for preds in y_preds])
+    batched.update_many(y[100:], [preds[100:] for preds in y_preds])
+
+    np.testing.assert_allclose(bank.get(), river_bank.get())
+    np.testing.assert_array_equal(bank.get(), batched.get())
+    assert bank.best() == river_bank.best()
+    assert [m.get() for m in bank] == bank.get().tolist()
+
+    # Each model is a River metric, updated and reverted in the bank
+    view, expected = bank[1], river_bank[1].clone()
+    for yj, pred in zip(y, y_preds[1]):
+        if pred is not None:
+            expected.update(yj, pred)
+    assert isinstance(view, metrics.base.Metric)
+    assert repr(view) == repr(river_bank[1])
+    assert view.works_with(linear_model.LinearRegression()) == metric.works_with(
+        linear_model.LinearRegression()
+    )
+    view.update(y[0], y[1])
+    expected.update(y[0], y[1])
+    assert view.get() == pytest.approx(expected.get())
+    view.revert(y[0], y[1])
+    assert bank.get()[1] == pytest.approx(river_bank[1].get())
+
+    # Models not evaluated have no value and are not picked as the best
+    for b in (bank, river_bank):
+        b.reset()
+        assert np.isnan(b.get()).all()
+        # Falls back to the first model
+        assert b.best() == 0
+        b.update(y[0], [None, None, y[0], None])
+        assert b.best() == 2 and b.best(mask=[True, True, False, False]) == 0
+
+
+def test_metric_bank_fallback():
+    assert isinstance(make_metric_bank(metrics.MAPE(), 3), RiverMetricBank)
+    model = MetaRegressor(models=make_models(), metric=metrics.R2(), window_size=50)
+    for x, y in stream(200):
+        model.learn_one(x, y)
+    assert isinstance(model.window_metrics, RiverMetricBank)
+    assert len(model.metrics) == 3
+
+
+def make_pruned_model(models=None):
+    return MetaRegressor(
+        models=(models or make_models((0.01, 0.05)))
+        + [dummy.StatisticRegressor(stats.Mean()) for _ in range(2)],
+        window_size=50,
+        mfe_backend="streaming",
+        pruner=SuccessiveHalvingPruner(rung_size=100, min_active=2, revive_every=500),
+    )
+
+
+def test_successive_halving_pruner():
+    """Dominated models are suspended, then revived"""
+    model = make_pruned_model()
+    for x, y in stream(1000):
+        model.learn_one(x, y)
+
+    pruner = model.pruner
+    assert pruner.n_suspended > 0
+    assert pruner.n_revived > 0
+    # The constant models were trained on fewer samples
+    assert all(m.statistic.n < 1000 for m in model.models[2:])
+    assert model._best_index in (0, 1)
+
+    with pytest.raises(ValueError):
+        SuccessiveHalvingPruner(keep_ratio=0)
+
+
+def test_revived_models_are_not_labelled_best():
+    """A meta-update on a revival step ignores the unevaluated revived models"""
+    model = MetaRegressor(
+        models=[dummy.StatisticRegressor(stats.Count())] + make_models((0.01,)),
+        window_size=50,
+        pruner=SuccessiveHalvingPruner(rung_size=200, min_active=1, revive_every=1000),
+    )
+    labels = {}
+    learn_one = model.meta_learner.learn_one
+
+    def spy(meta_features, best_index):
+        labels[model._n_seen] = best_index, model.window_metrics.get()
+        learn_one(meta_features, best_index)
+
+    model.meta_learner.learn_one = spy
+    for x, y in stream(2050):
+        model.learn_one(x, y)
+
+    for step in (1000, 2000):
+        label, window_metrics = labels[step]
+        assert label == 1 and np.isnan(window_metrics[0])
+    # Evaluated again after the revival, the counter is far off
+    label, window_metrics = labels[1050]
+    assert label == 1 and window_metrics[0] > 100
+
+
+def test_pruned_learn_many_matches_learn_one_replay():
+    data = stream(700)
+    X = pd.DataFrame([x for x, _ in data])
+    y = pd.Series([y for _, y in data])
+
+    def make():
+        return make_pruned_model(
+            [tree.HoeffdingTreeRegressor(grace_period=g) for g in (20, 50)]
+        )
+
+    replay = make()
+    for x, yi in data:
+        replay.learn_one(x, yi)
+
+    batched = make()
+    for start in range(0, len(X), 64):
+        batched.learn_many(X[start : start + 64], y[start : start + 64])
+
+    np.testing.assert_array_equal(batched.pruner.active, replay.pruner.active)
+    assert batched.pruner.n_suspended == replay.pruner.n_suspended
+    assert batched._best_index == replay._best_index
+    assert [m.get() for m in batched.metrics] == [m.get() for m in replay.metrics]
+
+
+def test_split_shared_prefix():
+    prefix, models = split_shared_prefix(make_models())
+    assert isinstance(prefix, preprocessing.StandardScaler)
+    assert all(isinstance(m, linear_model.LinearRegression) for m in models)
+
+    models = make_models() + [
+        preprocessing.MinMaxScaler() | tree.HoeffdingTreeRegressor()
+    ]
+    assert split_shared_prefix(models)[0] is None
+    assert split_shared_prefix([tree.HoeffdingTreeRegressor()])[0] is None
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_shared_preprocessor_matches_pipelines(batched):
+    """Sharing the scaler gives the same results as one scaler per pipeline"""
+    # River mini-batches need string feature names
+    data = [({f"x{k}": v for k, v in x.items()}, y) for x, y in stream(300)]
+    X = pd.DataFrame([x for x, _ in data])
+    y = pd.Series([y for _, y in data])
+
+    def make(models, preprocessor=None):
+        return MetaRegressor(
+            models=models,
+            window_size=50,
+            meta_update_frequency=25,
+            preprocessor=preprocessor,
+        )
+
+    pipelines = make(make_models())
+    shared = make(*split_shared_prefix(make_models())[::-1])
+    for model in (pipelines, shared):
+        if batched:
+            for start in range(0, len(X), 64):
+                model.learn_many(X[start : start + 64], y[start : start + 64])
+        else:
+            for x, yi in data:
+                model.learn_one(x, yi)
+
+    assert shared._best_index == pipelines._best_index
+    np.testing.assert_allclose(
+        [m.get() for m in shared.metrics], [m.get() for m in pipelines.metrics]
+    )
+    np.testing.assert_allclose(
+        shared.predict_many(X[:20]), pipelines.predict_many(X[:20])
+    )
+    assert shared.predict_one(data[0][0]) == pytest.approx(
+        pipelines.predict_one(data[0][0])
+    )
+
+
+@pytest.mark.parametrize("mfe_backend", ["pymfe", "streaming"])
+def test_memory_budget(mfe_backend):
+    """Models are evicted and the window shrunk to stay within the budget"""
+
+    def make(max_bytes):
+        return MetaRegressor(
+            models=[tree.HoeffdingTreeRegressor(grace_period=g) for g in (20, 50, 100)],
+            window_size=200,
+            mfe_backend=mfe_backend,
+            memory_budget=MemoryBudget(max_bytes, check_every=200),
+        )
+
+    data = stream(600)
+    unbounded, bounded = make(10**9), make(200_000)
+    for x, y in data:
+        unbounded.learn_one(x, y)
+        bounded.learn_one(x, y)
+
+    footprint = unbounded.memory_footprint()
+    assert len(footprint["models"]) == 3
+    assert footprint["total"] == sum(footprint["models"]) + sum(
+        footprint[k] for k in ("window", "meta_learner", "metrics", "meta_features")
+    )
+    assert unbounded.memory_budget.n_evicted == 0
+    assert unbounded.window.size == 200
+
+    budget = bounded.memory_budget
+    assert budget.n_evicted > 0
+    assert budget.n_window_shrinks == 2
+    assert bounded.window.size == 50
+    assert budget.footprint["total"] < footprint["total"]
+    assert isinstance(bounded.predict_one(data[0][0]), float)
+
+
+def test_memory_budget_eviction():
+    """Evicted models start afresh, and their clones count towards the budget"""
+    model = MetaRegressor(
+        models=[tree.HoeffdingTreeRegressor(grace_period=g) for g in (20, 50, 100)],
+        window_size=200,
+        pruner=SuccessiveHalvingPruner(rung_size=1000),
+        memory_budget=MemoryBudget(10**9, check_every=10**6),
+    )
+    for x, y in stream(300):
+        model.learn_one(x, y)
+
+    footprint = model.memory_footprint()
+    evicted = [i for i in range(3) if i != model._best_index]
+    models = model._executor.fetch_models()
+    freed = sum(footprint["models"][i] for i in evicted)
+    clones = sum(deep_sizeof(models[i].clone()) for i in evicted)
+    # Within budget only if the clones took no memory
+    model.memory_budget.max_bytes = footprint["total"] - freed + clones // 2
+    model._enforce_memory_budget()
+
+    assert model.memory_budget.n_evicted == 2
+    assert model.window.size < 200
+    assert model.memory_budget.footprint["total"] <= model.memory_budget.max_bytes
+    for i in evicted:
+        assert np.isnan([model.metrics[i].get(), model.window_metrics[i].get()]).all()
+        assert model.pruner._counts[i] == 0
+    best = model._best_index
+    assert model.metrics[best].get() > 0 and model.pruner._counts[best] == 300
+
+
+def test_evicted_models_are_not_labelled_best():
+    """A meta-update right after an eviction ignores the untrained clones"""
+    model = MetaRegressor(
+        models=[tree.HoeffdingTreeRegressor(grace_period=g) for g in (20, 50, 100)],
+        window_size=50,
+        eval_every=7,
+        memory_budget=MemoryBudget(10**9, check_every=10**6),
+    )
+    data = stream(120)
+    for x, y in data[:99]:
+        model.learn_one(x, y)
+    best = model._best_index
+    model.memory_budget.max_bytes = 1
+    model._enforce_memory_budget()
+    assert model.memory_budget.n_evicted == 2
+
+    labels = []
+    learn_one = model.meta_learner.learn_one
+    model.meta_learner.learn_one = lambda x, y: labels.append(y) or learn_one(x, y)
+    # The 100th sample triggers a meta-update, and only the selected model is
+    # evaluated on it, so the clones of the evicted models have no evaluations
+    model.learn_one(*data[99])
+    assert labels == [best]
+
+
+def test_soft_ensemble_regressor():
+    """Predictions blend the most likely models, weighted by their probability"""
+    # River mini-batches need string feature names
+    data = [
+        ({f"x{k}": v for k, v in x.items()}, y + (50 if i >= 500 else 0))
+        for i, (x, y) in enumerate(stream(1000))
+    ]
+    model = MetaRegressor(
+        models=make_models((0.005, 0.05)) + [tree.HoeffdingTreeRegressor()],
+        window_size=50,
+        meta_update_frequency=25,
+        mfe_backend="streaming",
+        top_k=3,
+    )
+    for x, y in data:
+        model.learn_one(x, y)
+
+    weights = model._weights
+    assert 1 < len(weights) <= 3
+    assert sum(weights.values()) == pytest.approx(1)
+    assert all(w >= model.min_weight for w in weights.values())
+    x = data[0][0]
+    assert model.predict_one(x) == pytest.approx(
+        sum(w * model.models[i].predict_one(x) for i, w in weights.items())
+    )
+    X = pd.DataFrame([x for x, _ in data[:20]])
+    np.testing.assert_allclose(
+        model.predict_many(X), [model.predict_one(x) for x, _ in data[:20]]
+    )
+
+
+def test_soft_ensemble_classifier():
+    data = list(datasets.Phishing())
+    model = MetaClassifier(
+        models=[tree.HoeffdingTreeClassifier(max_depth=d) for d in (1, 2, 4)],
+        window_size=50,
+        meta_update_frequency=25,
+        mfe_backend="streaming",
+        top_k=2,
+    )
+    for x, y in data:
+        model.learn_one(x, y)
+
+    weights = model._weights
+    assert len(weights) == 2
+    x = data[0][0]
+    proba = model.predict_proba_one(x)
+    assert sum(proba.values()) == pytest.approx(1)
+    for label in (False, True):
+        assert proba[label] == pytest.approx(
+            sum(
+                w * model.models[i].predict_proba_one(x).get(label, 0.0)
+                for i, w in weights.items()
+            )
+        )
+    assert model.predict_one(x) == max(proba, key=proba.get)
+
+
+def test_knowledge_base_warm_start(tmp_path):
+    """Recorded meta-updates survive a roundtrip and pretrain new estimators"""
+    data = [(x, y + (50 if i >= 500 else 0)) for i, (x, y) in enumerate(stream(1000))]
+
+    def make(knowledge_base):
+        return MetaRegressor(
+            models=make_models((0.005, 0.05)) + [tree.HoeffdingTreeRegressor()],
+            window_size=50,
+            meta_update_frequency=25,
+            mfe_backend="streaming",
+            knowledge_base=knowledge_base,
+        )
+
+    knowledge_base = KnowledgeBase(source="friedman")
+    model = make(knowledge_base)
+    for x, y in data:
+        model.learn_one(x, y)
+    assert len(knowledge_base) == (len(data) - 50) // 25 + 1
+
+    knowledge_base.save(tmp_path / "kb")
+    loaded = KnowledgeBase.load(tmp_path / "kb", source="new")
+    assert loaded.n_models == 3
+    assert loaded.sources == ["friedman"]
+    assert list(loaded.records()) == list(knowledge_base.records())
+    assert list(loaded.records(sources=["other"])) == []
+
+    warm = make(loaded)
+    cold = make(None)
+    assert warm.meta_learner is not cold.meta_learner
+    assert warm._best_index == knowledge_base.most_frequent()
+    meta_features, _ = next(loaded.records())
+    assert warm.meta_learner.predict_proba_one(meta_features)
+    assert not cold.meta_learner.predict_proba_one(meta_features)
+
+    # New meta-updates are recorded under the new source
+    for x, y in data[:100]:
+        warm.learn_one(x, y)
+    assert loaded.sources == ["friedman", "new"]
+
+    with pytest.raises(ValueError, match="3 models"):
+        MetaRegressor(models=make_models((0.01, 0.05)), knowledge_base=loaded)
+
+
+def test_knowledge_base_nan_and_max_records(tmp_path):
+    """NaN meta-features are dropped alike in memory and on disk"""
+    knowledge_base = KnowledgeBase(max_records=50)
+    for i in range(1000):
+        knowledge_base.add({"a": float(i), "b": np.nan if i % 2 else 1.0}, i % 3)
+    assert len(knowledge_base) == 50 and knowledge_base.n_seen == 1000
+    # A uniform sample of the whole stream, not only its end
+    kept = sorted(mf["a"] for mf, _ in knowledge_base.records())
+    assert kept[0] < 250 and kept[-1] >= 750
+    assert all(("b" in mf) == (mf["a"] % 2 == 0) for mf, _ in knowledge_base.records())
+
+    knowledge_base.save(tmp_path)
+    loaded = KnowledgeBase.load(tmp_path)
+    assert list(loaded.records()) == list(knowledge_base.records())
+    assert len(KnowledgeBase.load(tmp_path, max_records=10)) == 10
+
+
+def test_nearest_neighbor_meta_learner():
+    """Votes of the nearest standardized entries, oldest entries evicted"""
+    rng = np.random.default_rng(0)
+    learner = NearestNeighborMetaLearner(n_neighbors=3, max_size=100)
+    assert learner.predict_one({"a": 0.0}) is None
+    for i in range(100):
+        label = i % 2
+        # Only "a" is informative, "b" is noise on a much larger scale
+        learner.learn_one(
+            {"a": label + 0.1 * rng.normal(), "b": 1e6 * rng.normal()}, label
+        )
+    assert len(learner) == 100
+    assert learner.predict_one({"a": 0.05, "b": 1e6}) == 0
+    assert learner.predict_one({"a": 0.95, "b": -1e6}) == 1
+    # Missing meta-features are ignored, unknown ones too
+    assert learner.predict_one({"a": 1.0, "c": 3.0}) == 1
+    proba = learner.predict_proba_one({"a": 0.5})
+    assert sum(proba.values()) == pytest.approx(1)
+
+    # New entries evict the oldest ones
+    for _ in range(100):
+        learner.learn_one({"a": 0.0, "b": 0.0, "c": 1.0}, 2)
+    assert len(learner) == 100
+    assert learner.predict_one({"a": 1.0, "b": 0.0}) == 2
+    np.testing.assert_allclose(learner._sum, [0.0, 0.0, 100.0], atol=1e-6)
+
+    model = MetaRegressor(
+        models=make_models(),
+        meta_learner=NearestNeighborMetaLearner(),
+        window_size=50,
+        meta_update_frequency=25,
+    )
+    for x, y in stream(300):
+        model.learn_one(x, y)
+    assert len(model.meta_learner) == (300 - 50) // 25 + 1
+    assert 0 <= model._best_index < 3
+
+
+def test_tenant_manager(tmp_path):
+    """Tenants learn as independent clones sharing one meta-learner"""
+    template = MetaRegressor(
+        models=make_models(), window_size=50, meta_update_frequency=25
+    )
+    tenants = TenantManager(template, max_resident=2, offload_dir=str(tmp_path))
+    clones = {t: template.clone() for t in "abc"}
+    data = stream(300)
+    for i, (x, y) in enumerate(data):
+        t = "abc"[i % 3]
+        # One offset per tenant, so that the streams differ
+        tenants.learn_one(t, x, y + 10 * (i % 3))
+        clones[t].learn_one(x, y + 10 * (i % 3))
+    assert len(tenants) == 3
+    assert tenants.n_offloaded > 0 and tenants.n_restored > 0
+    assert len(tenants.resident) == 2
+
+    for t, clone in clones.items():
+        model = tenants.get(t)
+        assert model.meta_learner is tenants.get("a").meta_learner
+        np.testing.assert_array_equal(model.window.X, clone.window.X)
+        np.testing.assert_array_equal(model.metrics._sum, clone.metrics._sum)
+        assert model._extract_meta_features() == clone._extract_meta_features()
+    # Metrics and windows of resident tenants are views of shared arrays
+    model = tenants.get("c")
+    assert np.shares_memory(model.metrics._sum, tenants._bank_state["_sum"])
+    assert np.shares_memory(model.window._X, tenants._window_X)
+    assert tenants.predict_one("c", data[0][0]) == model.predict_one(data[0][0])
+
+    footprint = tenants.memory_footprint()
+    assert footprint["shared"] > 0
+    assert set(footprint["tenants"]) == set(tenants.resident)
+    resident = tenants.resident
+    assert tenants.offload_idle(0.0) == resident
+    assert tenants.resident == [] and "a" in tenants
+    tenants.close()
+    assert list(tmp_path.iterdir()) == []
+
+    with pytest.raises(ValueError, match="sync"):
+        TenantManager(MetaRegressor(models=make_models(), meta_update_mode="async"))
+
+
+def test_tenant_ids_are_escaped(tmp_path):
+    """Tenant ids name one checkpoint directory each, inside offload_dir"""
+    offload_dir = tmp_path / "tenants"
+    offload_dir.mkdir()
+    tenants = TenantManager(
+        MetaRegressor(models=make_models(), window_size=50),
+        max_resident=1,
+        offload_dir=str(offload_dir),
+    )
+    ids = ["../x", "a/b", "..", 1, "1"]
+    data = stream(50)
+    for i, (x, y) in enumerate(data):
+        tenants.learn_one(ids[i % len(ids)], x, y)
+    assert tenants.n_offloaded > 0 and tenants.n_restored > 0
+
+    assert [p.name for p in tmp_path.iterdir()] == ["tenants"]
+    assert len(list(offload_dir.iterdir())) == len(ids) - 1
+    for tenant_id in ids:
+        assert len(tenants.get(tenant_id).window) == 10
+    tenants.close()
+    assert list(offload_dir.iterdir()) == []
+
+
+def test_lazy_exports():
+    """Public names resolve to the classes of their submodules"""
+    from kappaml_core import meta
+    from kappaml_core.meta.tenants import TenantManager as Manager
+
+    assert meta.TenantManager is Manager
+    assert set(meta.__all__) <= set(dir(meta))
+    with pytest.raises(AttributeError):
+        meta.NotAName
+
+
+@pytest.mark.parametrize("mfe_backend", ["pymfe", "streaming"])
+def test_checkpoint_roundtrip(tmp_path, mfe_backend):
+    """A loaded checkpoint resumes exactly where the estimator stopped"""
+    data = stream(400)
+    model = MetaRegressor(
+        models=make_models(),
+        window_size=50,
+        meta_update_frequency=25,
+        mfe_backend=mfe_backend,
+    )
+    for x, y in data[:200]:
+        model.learn_one(x, y)
+
+    model.save(tmp_path / "checkpoint")
+    restored = MetaRegressor.load(tmp_path / "checkpoint")
+    # The window is mapped, and can be saved over its own checkpoint
+    assert isinstance(restored.window.X, np.memmap)
+    restored.save(tmp_path / "checkpoint")
+    np.testing.assert_array_equal(restored.window.y, model.window.y)
+
+    for x, y in data[200:]:
+        assert restored.predict_one(x) == model.predict_one(x)
+        model.learn_one(x, y)
+        restored.learn_one(x, y)
+    assert not isinstance(restored.window.X, np.memmap)
+    assert restored._extract_meta_features() == model._extract_meta_features()
+
+    restored = MetaRegressor.load(tmp_path / "checkpoint", mmap=False)
+    assert not isinstance(restored.window.X, np.memmap)
+
+
+def test_checkpoint_is_smaller_than_pickle(tmp_path):
+    """The window is stored once and the streaming buffers as arrays"""
+    model = MetaRegressor(
+        models=make_models(), window_size=200, mfe_backend="streaming"
+    )
+    for x, y in stream(300):
+        model.learn_one(x, y)
+
+    model.save(tmp_path)
+    size = sum(f.stat().st_size for f in tmp_path.iterdir())
+    assert size < 0.6 * len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def test_checkpoint_rejects_newer_versions(tmp_path):
+    model = MetaRegressor(models=make_models())
+    model.save(tmp_path)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["format_version"] += 1
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError):
+        MetaRegressor.load(tmp_path)
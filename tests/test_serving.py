@@ -0,0 +1,79 @@
+import asyncio
+from copy import deepcopy
+
+import pytest
+from river import datasets, linear_model, optim, preprocessing
+
+from kappaml_core.meta import MetaRegressor
+from kappaml_core.serving import ModelClient, ModelServer, load_model
+
+__author__ = "Alex Imbrea"
+__copyright__ = "Alex Imbrea"
+__license__ = "Apache-2.0"
+
+
+def make_model():
+    return MetaRegressor(
+        models=[
+            preprocessing.StandardScaler()
+            | linear_model.LinearRegression(optimizer=optim.SGD(lr=lr))
+            for lr in (0.01, 0.05)
+        ],
+        mfe_backend="streaming",
+    )
+
+
+def test_server_predict_and_learn(tmp_path):
+    # Feature names are strings once sent as JSON
+    data = [
+        ({f"x{k}": v for k, v in x.items()}, y)
+        for x, y in datasets.synth.Friedman(seed=42).take(400)
+    ]
+    model = make_model()
+    for x, y in data[:200]:
+        model.learn_one(x, y)
+    model.save(tmp_path / "checkpoint")
+    local = deepcopy(model)
+
+    async def scenario():
+        server = ModelServer(
+            load_model(str(tmp_path / "checkpoint")),
+            max_batch_size=16,
+            max_latency=0.05,
+            snapshot_every=50,
+        )
+        await server.start(port=0)
+        client = await ModelClient.connect(*server.address[:2])
+        try:
+            X = [x for x, _ in data[200:]]
+
+            # Concurrent predictions are micro-batched
+            y_preds = await asyncio.gather(*(client.predict(x) for x in X[:64]))
+            assert y_preds == pytest.approx([local.predict_one(x) for x in X[:64]])
+            stats = await client.stats()
+            assert stats["n_predicted"] == 64
+            assert stats["n_predict_batches"] < 64
+
+            # Updates are applied in order and published through snapshots
+            await client.learn_many(X[:120], [y for _, y in data[200:320]])
+            for x, y in data[200:320]:
+                local.learn_one(x, y)
+            stats = await client.stats()
+            assert stats["n_learned"] == 120
+            assert stats["snapshot_version"] == 2
+            assert server.model.predict_one(X[-1]) == local.predict_one(X[-1])
+
+            # The snapshot lags behind the live model by less than snapshot_every
+            snapshot = deepcopy(model)
+            for x, y in data[200:300]:
+                snapshot.learn_one(x, y)
+            y_preds = await client.predict_many(X[-10:])
+            assert y_preds == pytest.approx([snapshot.predict_one(x) for x in X[-10:]])
+
+            with pytest.raises(RuntimeError, match="Unknown op"):
+                await client.request("fit")
+        finally:
+            await client.close()
+            await server.stop()
+
+    asyncio.run(scenario())